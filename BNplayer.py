@@ -11,13 +11,19 @@ from scipy.stats import entropy
 
 
 class BNPlayer(Player):
-    def __init__(self, character, start_location):
-        super(BNPlayer, self).__init__(character, start_location)
+    def __init__(self, character, start_location, rng=None, config=NO_LIBRARY_BOARD,
+                 accusation_entropy_threshold=0.0):
+        """
+        :param accusation_entropy_threshold: The player accuses once the entropies of the murder's character, weapon
+        and room are all at most this threshold
+        """
+        super(BNPlayer, self).__init__(character, start_location, rng, config)
+        self._stats["inference_calls"] = 0
         self._suspected_characters = set(CHARACTERS)
         self._suspected_weapons = set(WEAPONS)
-        self._suspected_rooms = set(ROOMS)
+        self._suspected_rooms = set(config.rooms)
         self._accusation = None
-        self._accusation_entropy_threshold = 0
+        self._accusation_entropy_threshold = accusation_entropy_threshold
         self._suspects_model = None
         self._weapons_model = None
         self._rooms_model = None
@@ -103,7 +109,7 @@ class BNPlayer(Player):
     def make_move_suggestion(self, possible_locations):
         loc = self.closest_most_probable_location(possible_locations)
         self._location = loc
-        if loc not in ROOMS_LOC:
+        if loc not in self._config.rooms_loc:
             return loc, None
         most_probable_suspect = self.get_most_probable_suspect()
         most_probable_weapon = self.get_most_probable_weapon()
@@ -115,10 +121,13 @@ class BNPlayer(Player):
         if self._accusation:
             return self._accusation
 
+        self._stats["inference_calls"] += 1
         s_infer = VariableElimination(self._suspects_model)
         s_dis = s_infer.query(variables=['s'], show_progress=False)
+        self._stats["inference_calls"] += 1
         w_infer = VariableElimination(self._weapons_model)
         w_dis = w_infer.query(variables=['w'], show_progress=False)
+        self._stats["inference_calls"] += 1
         r_infer = VariableElimination(self._rooms_model)
         r_dis = r_infer.query(variables=['r'], show_progress=False)
 
@@ -161,6 +170,7 @@ class BNPlayer(Player):
             if not node:
                 return
             # Make query about source:
+            self._stats["inference_calls"] += 1
             s_infer = VariableElimination(self._suspects_model)
             s_dis = s_infer.query(variables=['s'], evidence={node: i}, show_progress=False)
             s_cpd = self._suspects_model.get_cpds('s')
@@ -182,6 +192,7 @@ class BNPlayer(Player):
                 return
 
             # Make query about source:
+            self._stats["inference_calls"] += 1
             w_infer = VariableElimination(self._weapons_model)
             w_dis = w_infer.query(variables=['w'], evidence={node: i}, show_progress=False)
             w_cpd = self._weapons_model.get_cpds('w')
@@ -202,6 +213,7 @@ class BNPlayer(Player):
                 return
 
             # Make query about source:
+            self._stats["inference_calls"] += 1
             r_infer = VariableElimination(self._rooms_model)
             r_dis = r_infer.query(variables=['r'], evidence={node: i}, show_progress=False)
             r_cpd = self._rooms_model.get_cpds('r')
@@ -273,13 +285,13 @@ class BNPlayer(Player):
         The code explain itself better then I could ever do.
         """
         most_probable_room = self.get_closest_most_probable_room()
-        return min(possible_locations,
-                   key=lambda y: manhattan_distance_with_block(LOCATIONS_OF_ROOMS[most_probable_room], y))
+        return closest_location(self._config.locations_of_rooms[most_probable_room], possible_locations, self._config)
 
     def get_most_probable_suspect(self):
         """
         The code explain itself better then I could ever do.
         """
+        self._stats["inference_calls"] += 1
         s_infer = VariableElimination(self._suspects_model)
         s_dis = s_infer.query(variables=['s'], show_progress=False).values
         return self._suspects_in_order[list(s_dis).index(max(s_dis))]
@@ -288,6 +300,7 @@ class BNPlayer(Player):
         """
         The code explain itself better then I could ever do.
         """
+        self._stats["inference_calls"] += 1
         w_infer = VariableElimination(self._weapons_model)
         w_dis = w_infer.query(variables=['w'], show_progress=False).values
         return self._weapons_in_order[list(w_dis).index(max(w_dis))]
@@ -296,6 +309,7 @@ class BNPlayer(Player):
         """
         Return the most probable room. If there are many, return the closest of course
         """
+        self._stats["inference_calls"] += 1
         r_infer = VariableElimination(self._rooms_model)
         r_dis = list(r_infer.query(variables=['r'], show_progress=False).values)
         m = max(r_dis)
@@ -303,8 +317,9 @@ class BNPlayer(Player):
         for i in range(len(r_dis)):
             if r_dis[i] == m:
                 most_probable_rooms.append(self._rooms_in_order[i])
-        return min(most_probable_rooms, key=lambda x: manhattan_distance_with_block(self._location,
-                                                                                    LOCATIONS_OF_ROOMS[x]))
+        distances = distances_from(self._location,
+                                   [self._config.locations_of_rooms[room] for room in most_probable_rooms], self._config)
+        return most_probable_rooms[int(np.argmin(distances))]
 
 
 def normalized(a):
@@ -3,12 +3,19 @@ from pgmpy.models import BayesianModel
 from pgmpy.factors.discrete import TabularCPD
 from pgmpy.inference import VariableElimination, Inference
 import itertools
+from collections import deque
 
 
 class BNPlayer2(Player):
 
-    def __init__(self, character, start_location, players_n):
-        super().__init__(character, start_location)
+    def __init__(self, character, start_location, players_n, rng=None, config=DEFAULT_BOARD,
+                 accusation_threshold=0.97):
+        """
+        :param accusation_threshold: A card is taken as a murder card once its probability reaches this threshold
+        """
+        super().__init__(character, start_location, rng, config)
+        self._stats["inference_calls"] = 0
+        self._accusation_threshold = accusation_threshold
         self.model = None
         self.my_index = CHARACTERS.index(character)  # I'm player number -
         #  dictionaries name: cpd
@@ -22,6 +29,10 @@ class BNPlayer2(Player):
 
         self.murder_card_ind = players_n  # is the number of players
         self.card_vals_range = self.murder_card_ind + 1  # The last is Murder-card
+        # Evidence that was not applied to the model yet, in the order it was received - a list per observed
+        # suggestion of (parents, player index, value) of an answer on a triplet, or (card, player index, None) of a
+        # card that was shown
+        self._pending_evidence = deque()
 
     def update_on_other_player_suggestion(self, suggestion, was_showed, responders):
         if not self.model:
@@ -29,62 +40,80 @@ class BNPlayer2(Player):
         parents = [suggestion[0].name, suggestion[1].name, suggestion[2].name]
         # For players that didn't answer update that they answered False (0) on the triplet
         players_didnt_answer = responders[:-1]
-        for p in players_didnt_answer:
-            name, cpd = self.three_cards_q(parents[0], parents[1], parents[2], CHARACTERS.index(p))
-            self.update_p_of_parents_given_child(parents, name, 0)
-            self.model.remove_node(name)
+        evidence = [(parents, CHARACTERS.index(p), 0) for p in players_didnt_answer]
         if was_showed:
             # For player that showed card update that one of them may be his
             player_answered = responders[-1]
-            name, cpd = self.three_cards_q(parents[0], parents[1], parents[2], CHARACTERS.index(player_answered))
-            self.update_p_of_parents_given_child(parents, name, 1)
-            self.model.remove_node(name)
+            evidence.append((parents, CHARACTERS.index(player_answered), 1))
+        self._pending_evidence.append(evidence)
+        self.apply_evidence()
+
+    def apply_evidence(self):
+        """
+        Applies the pending evidence to the model, until the deadline passes - the evidence of at least one
+        observed suggestion per call. A hook observes at most one suggestion, and make_move_suggestion observes
+        none, so the pending evidence shrinks every turn of the player. The rest is applied by the next hooks
+        """
+        applied = False
+        while self._pending_evidence and not (applied and self.out_of_time()):
+            for parents, player_ind, value in self._pending_evidence.popleft():
+                if value is None:
+                    # The card is parents, and the player showed it
+                    self.update_p_of_parents_given_child([parents], parents.name + "P" + str(player_ind), 1)
+                else:
+                    name, cpd = self.three_cards_q(parents[0], parents[1], parents[2], player_ind)
+                    self.update_p_of_parents_given_child(parents, name, value)
+                    self.model.remove_node(name)
+            applied = True
 
     def see_card(self, responders, card=None):
         # If card wasn't shown - it's the result
-        if not card:
+        if card is None:
             self.murder_char, self.murder_weapon, self.murder_room = self._last_suggestion
             return
+        if not self.model:
+            self.create_model()
 
         parents = [self._last_suggestion[0].name, self._last_suggestion[1].name, self._last_suggestion[2].name]
         # For players that didn't answer update that they answered False (0) on the triplet
         players_didnt_answer = responders[:-1]
-        for p in players_didnt_answer:
-            name, cpd = self.three_cards_q(parents[0], parents[1], parents[2], CHARACTERS.index(p))
-            self.update_p_of_parents_given_child(parents, name, 0)
-            self.model.remove_node(name)
+        evidence = [(parents, CHARACTERS.index(p), 0) for p in players_didnt_answer]
         # For player that showed card update player-exactly-this-card
         player_answered = responders[-1]
-        name = card.name + "P" + str(CHARACTERS.index(player_answered))
-        self.update_p_of_parents_given_child([card], name, 1)
+        evidence.append((card, CHARACTERS.index(player_answered), None))
+        self._pending_evidence.append(evidence)
+        self.apply_evidence()
 
     def make_move_suggestion(self, possible_locations):
         if not self.model:
             self.create_model()
+        # Decide by the evidence there is time to apply
+        self.apply_evidence()
         # weapon is assumed murder weapon, otherwise - high % one
-        weapon = self.murder_weapon if self.murder_weapon else Weapon[
+        weapon = self.murder_weapon if self.murder_weapon is not None else CARDS_BY_NAME[
             self.most_probable_murder_card(self.weapons_cpds)[0]]
         # character is assumed culprit, otherwise - high % one
-        character = self.murder_char if self.murder_char else Character[
+        character = self.murder_char if self.murder_char is not None else CARDS_BY_NAME[
             self.most_probable_murder_card(self.character_cpds)[0]]
         # weapon is assumed murder weapon, otherwise - None if all are unreachable and room.name if reachable
-        if self.murder_room:
+        locations_of_rooms = self._config.locations_of_rooms
+        if self.murder_room is not None:
             room = self.murder_room
-            if LOCATIONS_OF_ROOMS[room] in possible_locations:
+            if locations_of_rooms[room] in possible_locations:
                 self._last_suggestion = (character, weapon, room)
-                return LOCATIONS_OF_ROOMS[room], self._last_suggestion
+                return locations_of_rooms[room], self._last_suggestion
         probable_rooms = self.most_probable_murder_card(self.room_cpds)
         room = None
         for p_room in probable_rooms:
-            if LOCATIONS_OF_ROOMS[Room[p_room]] in possible_locations:
-                room = Room[p_room]
+            if locations_of_rooms[CARDS_BY_NAME[p_room]] in possible_locations:
+                room = CARDS_BY_NAME[p_room]
                 break
         if room is None:
             # all probable rooms are unreachable, move towards highest P room
             self._last_suggestion = None
-            return find_location_closest_to_m_room(possible_locations, probable_rooms[0]), None
+            return find_location_closest_to_m_room(possible_locations, probable_rooms[0], self._config), None
         self._last_suggestion = (character, weapon, room)
-        return LOCATIONS_OF_ROOMS[room], self._last_suggestion
+        return locations_of_rooms[room], self._last_suggestion
 
     def most_probable_murder_card(self, cpds):
         """
@@ -101,17 +130,18 @@ class BNPlayer2(Player):
         # print(card_prob_dict)
         ordered_l = [v for v in card_prob_dict if card_prob_dict[v] != 0]  # what was returned before
 
-        if card_prob_dict[ordered_l[0]] >= 0.97 or len(ordered_l) == 1:  # probability for accusation
-            if ordered_l[0] in Room.__members__:
-                self.murder_room = Room[ordered_l[0]]
-            elif ordered_l[0] in Character.__members__:
-                self.murder_char = Character[ordered_l[0]]
+        if card_prob_dict[ordered_l[0]] >= self._accusation_threshold or len(ordered_l) == 1:  # probability for accusation
+            card = CARDS_BY_NAME[ordered_l[0]]
+            if is_room(card):
+                self.murder_room = card
+            elif is_character(card):
+                self.murder_char = card
             else:
-                self.murder_weapon = Weapon[ordered_l[0]]
+                self.murder_weapon = card
         return ordered_l
 
     def make_accusation(self):
-        if self.murder_char and self.murder_weapon and self.murder_room:
+        if self.murder_char is not None and self.murder_weapon is not None and self.murder_room is not None:
             return self.murder_char, self.murder_weapon, self.murder_room
         return None
 
@@ -123,7 +153,7 @@ class BNPlayer2(Player):
         # Create weapons
         self.model_group(util.WEAPONS, self.weapons_cpds)
         # Create rooms
-        self.model_group(util.ROOMS, self.room_cpds)
+        self.model_group(self._config.rooms, self.room_cpds)
         # Create chars
         self.model_group(util.CHARACTERS, self.character_cpds)
         # Answer one card one player
@@ -206,24 +236,19 @@ class BNPlayer2(Player):
         for v in parents:
             if type(v) != str:
                 v = v.name
+            self._stats["inference_calls"] += 1
             new_vals = var_elim.query(variables=[v], evidence={card_type: value},
                                       show_progress=False)
             original_vals = self.model.get_cpds(v)
             original_vals.values = new_vals.values
 
 
-def find_location_closest_to_m_room(possible_locations, goal_room):
+def find_location_closest_to_m_room(possible_locations, goal_room, config=DEFAULT_BOARD):
     """
     Finds reachable location closest to given room
     :param possible_locations: list of reachable coordinates
     :param goal_room: room name
+    :param config: The BoardConfig of the board
     :return: location closest to the goal
     """
-    location = possible_locations[0]
-    distance = float('inf')
-    for p_location in possible_locations:
-        this_dist = util.manhattan_distance_with_block(p_location, LOCATIONS_OF_ROOMS[Room[goal_room]])
-        if this_dist < distance:
-            distance = this_dist
-            location = p_location
-    return location
+    return util.closest_location(config.locations_of_rooms[CARDS_BY_NAME[goal_room]], possible_locations, config)
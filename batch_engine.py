@@ -0,0 +1,235 @@
+"""
+Lockstep vectorized Clue engine for random players. Instead of running one game of Player objects,
+it advances a whole batch of games together, one seat at a time, with the state of all the games
+held in NumPy arrays. It follows the rules of ClueGame and the logic of RandomPlayer.
+"""
+import argparse
+import time
+
+import numpy as np
+from util import *
+from board import get_reachability_index
+
+MAX_ROUNDS = 1000
+
+
+def choose_in_rows(rng, mask):
+    """
+    :param mask: Boolean array of shape (games, options), with at least one True in every row
+    :return: For every row, the index of a uniformly random True entry
+    """
+    keys = rng.random(mask.shape)
+    keys[~mask] = -1
+    return keys.argmax(axis=1)
+
+
+class BatchClueEngine:
+    """
+    Plays a batch of games of random players in lockstep.
+    Cards are their ids - characters, then weapons, then rooms.
+    """
+
+    def __init__(self, players_n, batch_size, rng, config=DEFAULT_BOARD):
+        """
+        :param players_n: Number of (random) players in every game
+        :param batch_size: Number of games played together
+        :param rng: np.random.Generator the games draw from
+        :param config: The BoardConfig of the board
+        """
+        self._players_n = players_n
+        self._batch_size = batch_size
+        self._rng = rng
+
+        self._rooms = list(config.rooms)
+        # The cards of the game, by their ids
+        self._cards = CHARACTERS + WEAPONS + self._rooms
+
+        reachability = get_reachability_index(config)
+        self._order = reachability.order
+        self._counts = reachability.counts
+        self._max_roll = self._counts.shape[1] - 1
+        self._rooms_locations = location_indexes([config.locations_of_rooms[room] for room in self._rooms], config)
+        # _rooms_distances[i][r] - distance from location i to room r
+        self._rooms_distances = config.distances[:, self._rooms_locations]
+        self._open_locations = location_indexes([config.open_loc[character] for character in CHARACTERS[:players_n]],
+                                                config)
+
+    def deal(self):
+        """
+        Starts a new batch of games - draws the murder cards and deals the rest of the cards
+        """
+        games, players_n, cards_n = self._batch_size, self._players_n, len(self._cards)
+        rng = self._rng
+        self._solution = np.stack([rng.integers(0, len(CHARACTERS), games),
+                                   WEAPONS_OFFSET + rng.integers(0, len(WEAPONS), games),
+                                   ROOMS_OFFSET + rng.integers(0, len(self._rooms), games)], axis=1)
+        # Shuffle the deck with the murder cards at its bottom, then deal clockwise
+        keys = rng.random((games, cards_n))
+        keys[np.arange(games)[:, None], self._solution] = 2
+        deck = np.argsort(keys, axis=1)[:, :cards_n - 3]
+        owners = np.arange(cards_n - 3) % players_n
+        self._hands = np.zeros((games, players_n, cards_n), dtype=bool)
+        self._hands[np.arange(games)[:, None], owners[None, :], deck] = True
+
+        # Every player suspects every card it doesn't hold
+        self._suspected = ~self._hands
+        self._suspects_count = np.stack([self._suspected[..., :WEAPONS_OFFSET].sum(axis=2),
+                                         self._suspected[..., WEAPONS_OFFSET:ROOMS_OFFSET].sum(axis=2),
+                                         self._suspected[..., ROOMS_OFFSET:].sum(axis=2)], axis=2)
+        self._positions = np.tile(self._open_locations, (games, 1))
+        self._active = np.ones((games, players_n), dtype=bool)
+        # Accusations the players have decided on after no one could answer their suggestion
+        self._pending = np.zeros((games, players_n), dtype=bool)
+        self._pending_accusation = np.zeros((games, players_n, 3), dtype=np.intp)
+        self._winners = np.full(games, -1)
+        self._rounds = np.zeros(games, dtype=np.int64)
+        self._turn_index = 0
+
+    def run(self, max_rounds=MAX_ROUNDS):
+        """
+        Plays the batch of games to their end
+        :return: a tuple (winner seat of every game, rounds of every game). Games that didn't end within
+        max_rounds have winner -1
+        """
+        self.deal()
+        while True:
+            live = np.flatnonzero(self._winners == -1)
+            if len(live) == 0 or self._rounds[live[0]] >= max_rounds:
+                break
+            self.run_single_turn(live)
+        return self._winners, self._rounds
+
+    def run_single_turn(self, games):
+        """
+        Runs the turn of the current seat in the given (unfinished) games
+        """
+        t = self._turn_index
+        rng = self._rng
+
+        # Players that made a false accusation skip their turn, the last active player wins
+        games = games[self._active[games, t]]
+        lone = self._active[games].sum(axis=1) == 1
+        self._winners[games[lone]] = t
+        games = games[~lone]
+
+        cube_result = rng.integers(1, 6, len(games)) + rng.integers(1, 6, len(games))
+        roll = np.minimum(cube_result, self._max_roll)
+        positions = self._positions[games, t]
+
+        # Walk into a reachable suspected room if there is one, otherwise walk randomly
+        relevant_rooms = (self._rooms_distances[positions] <= cube_result[:, None]) & \
+                         self._suspected[games, t, ROOMS_OFFSET:]
+        suggesting = relevant_rooms.any(axis=1)
+        walk_choice = (rng.random(len(games)) * self._counts[positions, roll]).astype(np.intp)
+        new_positions = self._order[positions, walk_choice]
+        room = np.zeros(len(games), dtype=np.intp)
+        if suggesting.any():
+            room[suggesting] = choose_in_rows(rng, relevant_rooms[suggesting])
+            new_positions[suggesting] = self._rooms_locations[room[suggesting]]
+        self._positions[games, t] = new_positions
+
+        suggesting_games = games[suggesting]
+        if len(suggesting_games):
+            self.resolve_suggestions(suggesting_games, room[suggesting])
+        self.make_accusations(games)
+
+        self._turn_index = (t + 1) % self._players_n
+        if self._turn_index == 0:
+            self._rounds[self._winners == -1] += 1
+
+    def resolve_suggestions(self, games, room):
+        """
+        Random suggestions of the current seat in the given games (in the room it walked into), answered clockwise
+        """
+        t, rng, players_n = self._turn_index, self._rng, self._players_n
+        suspected = self._suspected[games, t, :ROOMS_OFFSET]
+        suggestion = np.stack([choose_in_rows(rng, suspected[:, :WEAPONS_OFFSET]),
+                               WEAPONS_OFFSET + choose_in_rows(rng, suspected[:, WEAPONS_OFFSET:]),
+                               ROOMS_OFFSET + room], axis=1)
+
+        answered = np.zeros(len(games), dtype=bool)
+        for offset in range(1, players_n):
+            responder = (t + offset) % players_n
+            held = self._hands[games[:, None], responder, suggestion]
+            responding = ~answered & held.any(axis=1)
+            if responding.any():
+                # The responder shows one of its cards from the suggestion at random
+                shown = suggestion[responding, choose_in_rows(rng, held[responding])]
+                self._suspected[games[responding], t, shown] = False
+                category = (shown >= WEAPONS_OFFSET).astype(np.intp) + (shown >= ROOMS_OFFSET)
+                self._suspects_count[games[responding], t, category] -= 1
+                answered |= responding
+
+        # If no one could answer, the suggestion is the murder
+        unanswered = ~answered
+        self._pending[games[unanswered], t] = True
+        self._pending_accusation[games[unanswered], t] = suggestion[unanswered]
+
+        # The suggested character is moved to the suggested room
+        moved = suggestion[:, 0] < players_n
+        self._positions[games[moved], suggestion[moved, 0]] = self._rooms_locations[room[moved]]
+
+    def make_accusations(self, games):
+        """
+        The current seat accuses when no one answered its suggestion, or when a single suspect is left in
+        each category
+        """
+        t = self._turn_index
+        certain = np.all(self._suspects_count[games, t] == 1, axis=1)
+        pending = self._pending[games, t]
+        accusing = pending | certain
+        if not accusing.any():
+            return
+        games, pending = games[accusing], pending[accusing]
+        suspected = self._suspected[games, t]
+        accusation = np.stack([suspected[:, :WEAPONS_OFFSET].argmax(axis=1),
+                               WEAPONS_OFFSET +
+                               suspected[:, WEAPONS_OFFSET:ROOMS_OFFSET].argmax(axis=1),
+                               ROOMS_OFFSET + suspected[:, ROOMS_OFFSET:].argmax(axis=1)], axis=1)
+        accusation[pending] = self._pending_accusation[games[pending], t]
+
+        correct = np.all(accusation == self._solution[games], axis=1)
+        self._winners[games[correct]] = t
+        self._active[games[~correct], t] = False
+
+
+def simulate(players_n, games_n, batch_size, seed=None, max_rounds=MAX_ROUNDS):
+    """
+    Plays games_n games of random players, batch_size games at a time
+    :return: a tuple (winner seat of every game, rounds of every game)
+    """
+    rng = np.random.default_rng(seed)
+    winners, rounds = [], []
+    while games_n > 0:
+        engine = BatchClueEngine(players_n, min(batch_size, games_n), rng)
+        batch_winners, batch_rounds = engine.run(max_rounds)
+        winners.append(batch_winners.copy())
+        rounds.append(batch_rounds.copy())
+        games_n -= batch_size
+    return np.concatenate(winners), np.concatenate(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulates many games of random players with the batch engine")
+    parser.add_argument("--games", type=int, default=100000, help="number of games to play")
+    parser.add_argument("--players", type=int, default=3, help="number of random players (3-6)")
+    parser.add_argument("--batch", type=int, default=100000, help="number of games played in lockstep")
+    parser.add_argument("--seed", type=int, help="seed of the simulation")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    winners, rounds = simulate(args.players, args.games, args.batch, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print("Played", args.games, "games of", args.players, "random players in %.2f seconds (%.0f games/sec)"
+          % (elapsed, args.games / elapsed))
+    wins = np.bincount(winners[winners >= 0], minlength=args.players)
+    for seat in range(args.players):
+        print("Seat", seat, "won %.2f%% of the games" % (100 * wins[seat] / args.games))
+    print("Unfinished games:", np.count_nonzero(winners < 0))
+    print("Rounds - mean: %.2f, percentiles 10/50/90/99: %s" %
+          (rounds.mean(), np.percentile(rounds, [10, 50, 90, 99]).tolist()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Benchmarks of the engine and the agents.
+Board scaling: how the cost of building a board and the per-turn cost of the engine and of each agent grow with
+the size of the board.
+Suite: the decision throughput and the memory of every agent type, on 3-6 player tables and on the BN player's
+Library-less table, with fixed seeds and fixed event traces. The results can be stored as a baseline, and later
+runs compared to it.
+Planning: the nodes the planning player's search expands with and without its heuristic, on fixed-seed planning
+problems, and a check that the heuristic is admissible on every state of the problems.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import instrumentation
+from board import get_reachability_index, get_static_layer
+from clue import ClueGame, create_player, parse_player, parse_players
+from game_log import GameLogReader, GameLogWriter, GameReplayer
+from planning_problem import costs_to_goal, null_heuristic, question_count_heuristic, random_problem
+from search import a_star_search
+from tournament import create_pool
+from util import *
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows - the peak RSS isn't measured there
+    resource = None
+
+# Metrics of a suite case, and whether a higher value is better
+SUITE_METRICS = {"updates_per_sec": True,
+                 "decisions_per_sec": True,
+                 "games_per_sec": True,
+                 "peak_rss_mb": False,
+                 "blocks_per_turn": False}
+
+
+def build_board(board_size, edge_width):
+    """
+    Builds a board config and all the tables the engine uses
+    :return: a tuple (BoardConfig, seconds it took)
+    """
+    start = time.perf_counter()
+    config = BoardConfig(board_size, edge_width)
+    config.distances
+    get_reachability_index(config)
+    get_static_layer(config)
+    return config, time.perf_counter() - start
+
+
+def measure_turns(agent_types, config, turns_n, seed=None):
+    """
+    Plays turns_n turns on the board - a new game is started whenever a game ends
+    :return: a tuple (seconds per turn in the engine, dictionary of agent type -> seconds per turn in its agents)
+    """
+    turns_time = 0.0
+    agents_time = dict.fromkeys(agent_types, 0.0)
+    turns, games = 0, 0
+    while turns < turns_n:
+        game = ClueGame(agent_types, turn_delay=0, seed=(seed, games) if seed is not None else None,
+                        board_config=config)
+        games += 1
+        start = time.perf_counter()
+        while turns < turns_n:
+            turns += 1
+            if game.run_single_turn():
+                break
+        turns_time += time.perf_counter() - start
+        agents_wall_time, _ = game.get_agent_times()
+        for seat, agent_type in enumerate(agent_types):
+            agents_time[agent_type] += agents_wall_time[seat]
+    engine_time = turns_time - sum(agents_time.values())
+    return engine_time / turns, {agent_type: agent_time / turns for agent_type, agent_time in agents_time.items()}
+
+
+def suite_cases(agent_types, tables):
+    """
+    :param agent_types: The agent specs to measure
+    :param tables: The numbers of players of the tables to measure them on
+    :return: List of (case name, agent spec, number of players) - the first BN player only plays its own table:
+    seat 0 of 3, without the Library
+    """
+    cases = []
+    for agent_type in agent_types:
+        if parse_agent_spec(agent_type)[0] == BN:
+            cases.append(("%s/3p-no-library" % agent_type, agent_type, 3))
+        else:
+            cases.extend(("%s/%dp" % (agent_type, players_n), agent_type, players_n) for players_n in tables)
+    return cases
+
+
+def measure_case(agent_type, players_n, games_n, seed):
+    """
+    Measures an agent at seat 0 of a table of random players, in games_n fixed-seed games:
+    - decisions_per_sec: make_move_suggestion calls per second
+    - games_per_sec: games per second, end to end
+    - updates_per_sec: update_on_other_player_suggestion calls per second, replaying the games' recorded event
+    trace into a new agent at seat 0 (only the update hooks run, so the agent's cost is measured alone)
+    - peak_rss_mb: peak resident memory of the process (runs in a fresh process)
+    - blocks_per_turn: growth of the allocated memory blocks (net allocations) per turn, during the games
+    :return: Dictionary of metric -> value
+    """
+    config = NO_LIBRARY_BOARD if parse_agent_spec(agent_type)[0] == BN else DEFAULT_BOARD
+    agent_types = [agent_type] + [RANDOM] * (players_n - 1)
+    agent_class = type(create_player(agent_type, CHARACTERS[0], players_n, config=config)).__name__
+    with tempfile.TemporaryDirectory() as directory:
+        trace = os.path.join(directory, "trace.bin")
+        instrumentation.enable()
+        instrumentation.reset()
+        games_time, turns, blocks = 0.0, 0, 0
+        with GameLogWriter(trace) as event_log:
+            for i in range(games_n):
+                blocks_start = sys.getallocatedblocks()
+                start = time.perf_counter()
+                game = ClueGame(agent_types, turn_delay=0, seed=(seed, i), event_log=event_log, board_config=config)
+                game.run()
+                games_time += time.perf_counter() - start
+                blocks += sys.getallocatedblocks() - blocks_start
+                turns += sum(stats["decisions"] for stats in game.get_agent_stats())
+        decisions = instrumentation.histograms[agent_class + ".make_move_suggestion"]
+        instrumentation.disable()
+
+        replayer = GameReplayer(lambda seat, character, n: create_player(agent_type, character, n, config=config),
+                                seats=[0])
+        with GameLogReader(trace) as reader:
+            for game in reader.games():
+                replayer.replay(game)
+    update_calls, update_time = replayer.hook_stats.get("update_on_other_player_suggestion", (0, 0.0))
+
+    return {"updates_per_sec": update_calls / update_time if update_time else None,
+            "decisions_per_sec": decisions.calls / (decisions.total_ns / 1e9) if decisions.calls else None,
+            "games_per_sec": games_n / games_time,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+            "blocks_per_turn": blocks / turns}
+
+
+def run_suite(cases, games_n, seed):
+    """
+    Measures every case in a fresh process, so that the peak RSS is the case's own
+    :return: Dictionary of case name -> dictionary of metric -> value
+    """
+    results = dict()
+    for name, agent_type, players_n in cases:
+        with create_pool(1) as pool:
+            results[name] = pool.apply(measure_case, (agent_type, players_n, games_n, seed))
+        print(format_case(name, results[name]), flush=True)
+    return results
+
+
+def format_case(name, metrics):
+    return "%-28s" % name + "".join("%18s" % ("-" if metrics.get(metric) is None else "%.2f" % metrics[metric])
+                                    for metric in SUITE_METRICS)
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares the results of a suite to a baseline
+    :param tolerance: The relative change that is not a regression (e.g. 0.2 - 20%)
+    :return: Lines describing the metrics that are worse than the baseline by more than the tolerance
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, higher_is_better in SUITE_METRICS.items():
+            value, base = metrics.get(metric), baseline.get(name, {}).get(metric)
+            if value is None or base is None:
+                continue
+            # A baseline of (almost) zero gets an absolute tolerance instead
+            slack = tolerance * max(abs(base), 1.0)
+            if (value < base - slack) if higher_is_better else (value > base + slack):
+                regressions.append("%s %s: %.2f (baseline %.2f)" % (name, metric, value, base))
+    return regressions
+
+
+def suite_main(args):
+    try:
+        agents = [parse_player(agent) for agent in args.agents.split(",")]
+    except ValueError as error:
+        print(error)
+        sys.exit(2)
+    if None in agents:
+        print("Unknown agent type in --agents", args.agents)
+        sys.exit(2)
+    cases = suite_cases(agents, [int(players_n) for players_n in args.tables.split(",")])
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline["games"], baseline["seed"]) != (args.games, args.seed):
+            print("The baseline was measured with --games %d --seed %d" % (baseline["games"], baseline["seed"]))
+            sys.exit(2)
+    print("%-28s" % "case" + "".join("%18s" % metric for metric in SUITE_METRICS))
+    results = run_suite(cases, args.games, args.seed)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({"games": args.games, "seed": args.seed, "cases": results}, baseline_file, indent=1)
+    if baseline:
+        regressions = find_regressions(results, baseline["cases"], args.tolerance)
+        if regressions:
+            print("Regressions beyond %.0f%%:" % (100 * args.tolerance))
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("No regressions beyond %.0f%%" % (100 * args.tolerance))
+
+
+def measure_planning(known_n, seed):
+    """
+    Searches a planning problem with and without the planning player's heuristic, and checks the heuristic against
+    the exact cost to the goal of every state of the problem
+    :return: Dictionary of the problem's states, the states the heuristic overestimates and the states it is exact
+    on, and for every heuristic, the nodes its search expanded, the seconds it took and the length of its plan
+    """
+    problem = random_problem(known_n, seed)
+    costs = costs_to_goal(problem)
+    estimates = {state: problem.min_actions_to_goal(state) for state in costs}
+    results = {"states": len(costs),
+               "overestimated": sum(1 for state, cost in costs.items() if estimates[state] > cost),
+               "exact": sum(1 for state, cost in costs.items() if estimates[state] == cost)}
+    for heuristic in (null_heuristic, question_count_heuristic):
+        problem = random_problem(known_n, seed)
+        start = time.perf_counter()
+        plan = a_star_search(problem, heuristic, DEFAULT_BOARD.open_loc[CHARACTERS[0]])
+        results[heuristic.__name__] = (problem.expanded, time.perf_counter() - start, len(plan))
+    return results
+
+
+def planning_main(args):
+    print("known\tproblem\tstates\texact\t" +
+          "\t".join("%s (expanded, s, length)" % heuristic for heuristic in ("null", "question count")))
+    expanded = {null_heuristic.__name__: 0, question_count_heuristic.__name__: 0}
+    failed = False
+    for known_n in map(int, args.known.split(",")):
+        for i in range(args.games):
+            results = measure_planning(known_n, (args.seed, known_n, i))
+            print("%d\t%d\t%d\t%d\t" % (known_n, i, results["states"], results["exact"]) +
+                  "\t\t".join("%d, %.3f, %d" % results[name] for name in expanded))
+            for name in expanded:
+                expanded[name] += results[name][0]
+            if results["overestimated"]:
+                print("The heuristic overestimates the cost to the goal of %d states" % results["overestimated"])
+                failed = True
+            if results[null_heuristic.__name__][2] != results[question_count_heuristic.__name__][2]:
+                print("The heuristic's plan isn't the shortest")
+                failed = True
+    print("Expanded nodes: %d without the heuristic, %d with it" % tuple(expanded.values()))
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the engine and the agents on growing boards, or runs "
+                                                 "the benchmark suite of the agents")
+    parser.add_argument("--sizes", default="25,50,75,100", help="board sizes separated by comma")
+    parser.add_argument("--edge", type=int, default=9, help="width of the walkable edge of the boards")
+    parser.add_argument("--players", default="r,r,r", help="player types separated by comma, e.g. p,bn2,r")
+    parser.add_argument("--turns", type=int, default=300, help="number of turns to play on each board")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the games")
+    parser.add_argument("--suite", action="store_true", help="run the benchmark suite of the agents")
+    parser.add_argument("--agents", default="r,p,bn2,bn",
+                        help="suite: player types to measure, separated by comma (bn is measured on its own table)")
+    parser.add_argument("--tables", default="3,4,5,6", help="suite: numbers of players of the tables")
+    parser.add_argument("--games", type=int, default=2,
+                        help="suite: number of games (and traced games) per case; planning: number of problems "
+                             "per number of known cards")
+    parser.add_argument("--baseline", metavar="FILE", help="suite: compare the results to a stored baseline")
+    parser.add_argument("--save-baseline", metavar="FILE", help="suite: store the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="suite: relative change of a metric that is not a regression (default: 0.2)")
+    parser.add_argument("--planning", action="store_true",
+                        help="benchmark the planning player's search heuristic, and check it is admissible")
+    parser.add_argument("--known", default="6,8,10",
+                        help="planning: numbers of cards the planning player knows, separated by comma")
+    args = parser.parse_args()
+    if args.suite:
+        suite_main(args)
+        return
+    if args.planning:
+        planning_main(args)
+        return
+
+    agent_types = parse_players(args.players)
+    agents = list(dict.fromkeys(agent_types))
+    print("size\tlocations\tbuild (s)\tengine (ms/turn)\t" + "\t".join(agent + " (ms/turn)" for agent in agents))
+    for board_size in map(int, args.sizes.split(",")):
+        config, build_time = build_board(board_size, args.edge)
+        engine_time, agents_time = measure_turns(agent_types, config, args.turns, args.seed)
+        print("%d\t%d\t\t%.3f\t\t%.3f\t\t\t" % (board_size, len(config.locations), build_time, 1000 * engine_time) +
+              "\t".join("%.3f" % (1000 * agents_time[agent]) for agent in agents))
+
+
+if __name__ == '__main__':
+    main()
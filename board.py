@@ -2,61 +2,260 @@ import numpy as np
 from util import *
 
 
+class ReachabilityIndex:
+    """
+    Precomputed answers to "where can a player get from a location with a given cube result".
+    For every location, the board's locations are sorted by their distance from it, so the locations
+    reachable with a cube result are a prefix of that order. Cube results are at most CUBE_SIZE.
+    """
+
+    def __init__(self, config):
+        """
+        :param config: The BoardConfig of the board
+        """
+        self._config = config
+        distances = config.distances
+        self._max_roll = min(int(distances.max()), CUBE_SIZE)
+        self._order = np.argsort(distances, axis=1, kind='stable').astype(np.int16)
+        sorted_distances = np.take_along_axis(distances, self._order.astype(np.intp), axis=1)
+        # _counts[i][k] is the number of locations at most k steps away from location i
+        self._counts = np.stack([np.count_nonzero(sorted_distances <= k, axis=1)
+                                 for k in range(self._max_roll + 1)], axis=1)
+
+        # _rooms[i][k] is the rooms at most k steps away from location i
+        rooms = config.rooms
+        rooms_distances = distances_between(config.locations, [config.locations_of_rooms[room] for room in rooms],
+                                            config)
+        self._rooms = [[tuple(room for room, distance in zip(rooms, location_distances) if distance <= k)
+                        for k in range(self._max_roll + 1)]
+                       for location_distances in rooms_distances.tolist()]
+
+    @property
+    def order(self):
+        """
+        order[i] is the indexes of all the locations, sorted by their distance from location i
+        """
+        return self._order
+
+    @property
+    def counts(self):
+        """
+        counts[i][k] is the number of locations at most k steps away from location i
+        """
+        return self._counts
+
+    def reachable_indexes(self, loc, cube_result):
+        """
+        :return: A view of the indexes (in the board's locations) of the locations reachable from loc,
+        closest first
+        """
+        i = self._config.location_index[loc]
+        return self._order[i, :self._counts[i, min(cube_result, self._max_roll)]]
+
+    def reachable_locations(self, loc, cube_result):
+        return ReachableLocations(self._config, loc, cube_result, self.reachable_indexes(loc, cube_result))
+
+    def reachable_rooms(self, loc, cube_result):
+        """
+        :return: Tuple of the rooms reachable from loc with the cube result
+        """
+        return self._rooms[self._config.location_index[loc]][min(cube_result, self._max_roll)]
+
+
+class ReachableLocations:
+    """
+    A read-only sequence of the locations a player can move to - a view into the ReachabilityIndex
+    """
+
+    def __init__(self, config, origin, cube_result, indexes):
+        self._config = config
+        self._origin_index = config.location_index[origin]
+        self._cube_result = cube_result
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._config.locations[j] for j in self.indexes[i].tolist()]
+        return self._config.locations[self.indexes[i]]
+
+    def __iter__(self):
+        locations = self._config.locations
+        return (locations[j] for j in self.indexes.tolist())
+
+    def __contains__(self, loc):
+        """
+        O(1) - a location is reachable iff it is close enough to the origin
+        """
+        i = self._config.location_index.get(loc)
+        return i is not None and self._config.distances[self._origin_index, i] <= self._cube_result
+
+
+# One index per board config
+_REACHABILITY_INDEXES = dict()
+
+
+def get_reachability_index(config=DEFAULT_BOARD):
+    """
+    :return: The ReachabilityIndex of the board
+    """
+    if config not in _REACHABILITY_INDEXES:
+        _REACHABILITY_INDEXES[config] = ReachabilityIndex(config)
+    return _REACHABILITY_INDEXES[config]
+
+
+class StaticLayer:
+    """
+    The part of the board's text that doesn't change during a game - the rooms, the corridors and the legend
+    """
+
+    def __init__(self, config):
+        """
+        :param config: The BoardConfig of the board
+        """
+        rooms = config.rooms
+        # cells[y][x] is the character of the cell: the number of a room, '_' for a corridor, 'X' for a wall
+        self.cells = [['X'] * config.board_size for _ in range(config.board_size)]
+        for loc in config.locations:
+            if loc in config.rooms_loc:
+                self.cells[loc[0]][loc[1]] = str(rooms.index(config.rooms_loc[loc]) + 1)
+            else:
+                self.cells[loc[0]][loc[1]] = '_'
+        legend = "Where: "
+        for room in Room:
+            if room in rooms:  # not if BN is used and Library is discarded
+                legend += str(rooms.index(room) + 1) + " - " + room.name + "; "
+        self.lines = ["_" * (2 * config.board_size + 1)] + [row_line(row) for row in self.cells] + [legend]
+
+
+def row_line(cells):
+    return "|" + "|".join(cells) + "|"
+
+
+# One static layer per board config
+_STATIC_LAYERS = dict()
+
+
+def get_static_layer(config=DEFAULT_BOARD):
+    """
+    :return: The StaticLayer of the board
+    """
+    if config not in _STATIC_LAYERS:
+        _STATIC_LAYERS[config] = StaticLayer(config)
+    return _STATIC_LAYERS[config]
+
+
+class BoardRenderer:
+    """
+    Draws the players over the board's static layer. Only the rows that have players on them are rebuilt
+    in every frame
+    """
+
+    def __init__(self, config=DEFAULT_BOARD):
+        self._static = get_static_layer(config)
+        # The players' cells drawn by the previous call to render_changes (None - nothing is drawn yet)
+        self._drawn = None
+
+    def overlay(self, locations):
+        """
+        :param locations: Dictionary of player -> location
+        :return: Dictionary of (y, x) -> the character drawn in the cell. If several players share a cell,
+        the first of them is drawn
+        """
+        overlay = dict()
+        for player, loc in locations.items():
+            if loc not in overlay:
+                overlay[loc] = PLAYERS_SHORT[player.get_character()]
+        return overlay
+
+    def render(self, locations):
+        """
+        :return: The board with the players on it, as text
+        """
+        lines = list(self._static.lines)
+        rows = dict()
+        for (y, x), short in self.overlay(locations).items():
+            if y not in rows:
+                rows[y] = list(self._static.cells[y])
+            rows[y][x] = short
+        for y, cells in rows.items():
+            lines[y + 1] = row_line(cells)
+        return "\n".join(lines)
+
+    def render_changes(self, locations):
+        """
+        :return: ANSI escape codes that draw the board - the whole board (after clearing the screen) on the
+        first call, and afterwards only the cells that changed since the previous call
+        """
+        overlay = self.overlay(locations)
+        if self._drawn is None:
+            self._drawn = overlay
+            return "\x1b[H\x1b[2J" + self.render(locations) + "\n"
+        changes = []
+        for y, x in self._drawn.keys() | overlay.keys():
+            short = overlay.get((y, x), self._static.cells[y][x])
+            if short != self._drawn.get((y, x), self._static.cells[y][x]):
+                # The board starts at the top-left of the screen, below its top border
+                changes.append("\x1b[%d;%dH%s" % (y + 2, 2 * x + 2, short))
+        self._drawn = overlay
+        # Leave the cursor below the board
+        changes.append("\x1b[%d;1H" % (len(self._static.lines) + 1))
+        return "".join(changes)
+
+    def reset(self):
+        """
+        The next call to render_changes draws the whole board
+        """
+        self._drawn = None
+
+
 class Board:
     """
     A simplified board for Clue game
     """
 
-    def __init__(self, players):
-        self._locations = {player: OPEN_LOC[player.get_character()] for player in players}
+    def __init__(self, players, config=DEFAULT_BOARD):
+        """
+        :param config: The BoardConfig of the board
+        """
+        self._config = config
+        self._locations = {player: config.open_loc[player.get_character()] for player in players}
         self._players = players
+        self._reachability = get_reachability_index(config)
+        self._renderer = BoardRenderer(config)
+
+    def render(self):
+        """
+        Returns the board as text
+        """
+        return self._renderer.render(self._locations)
+
+    def render_changes(self):
+        """
+        Returns ANSI escape codes that redraw only the cells changed since the previous call
+        """
+        return self._renderer.render_changes(self._locations)
 
     def print_board(self):
         """
         Prints the board
         """
-        board_to_print = np.zeros((BOARD_SIZE, BOARD_SIZE), dtype=int)
-        for loc in LOCATIONS:
-            if loc in ROOMS_LOC:
-                board_to_print[loc[0]][loc[1]] = ROOMS.index(ROOMS_LOC[loc]) + 1
-            else:
-                board_to_print[loc[0]][loc[1]] = -1
-
-        print("_" * (2 * BOARD_SIZE + 1))
-        for y in range(BOARD_SIZE):
-            line = "|"
-            for x in range(BOARD_SIZE):
-                if (y, x) in self._locations.values():
-                    for player, loc in self._locations.items():
-                        if loc == (y, x):
-                            line += PLAYERS_SHORT[player.get_character()]
-                            break
-                else:
-                    if board_to_print[y][x] == -1:
-                        line += '_'
-                    elif board_to_print[y][x] == 0:
-                        line += 'X'
-                    else:
-                        line += board_to_print[y][x].__str__()
-                line += "|"
-            print(line)
-        print("Where: ", end="")
-        for room in Room:
-            if room in ROOMS:  # not if BN is used and Library is discarded
-                print(ROOMS.index(room) + 1, "-", room.name, end="; ")
-        print()
+        print(self.render())
 
     def get_possible_locations(self, player, cube_result):
         """
         Returns the possible locations that a player can move to, based on cube result
         and player's location
         """
-        cur_loc = self._locations[player]
-        possible_locations = []
-        for loc in LOCATIONS:
-            if manhattan_distance_with_block(cur_loc, loc) <= cube_result:
-                possible_locations.append(loc)
-        return possible_locations
+        return self._reachability.reachable_locations(self._locations[player], cube_result)
+
+    def get_reachable_rooms(self, player, cube_result):
+        """
+        Returns the rooms that a player can move to, based on cube result and player's location
+        """
+        return self._reachability.reachable_rooms(self._locations[player], cube_result)
 
     def update_player_location(self, player, new_loc):
         self._locations[player] = new_loc
@@ -64,3 +263,12 @@ class Board:
     def get_player_location(self, player):
         return self._locations[player]
 
+    def get_config(self):
+        return self._config
+
+    def get_locations(self):
+        """
+        Returns a dictionary of the location of each character
+        """
+        return {player.get_character(): loc for player, loc in self._locations.items()}
+
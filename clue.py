@@ -1,6 +1,10 @@
 from board import *
 from BNplayer import *
 from BNplayer2 import *
+from events import *
+import inspect
+import numpy as np
+import sys
 import time
 
 
@@ -9,93 +13,145 @@ class ClueGame:
     A class for one single Clue game
     """
 
-    def __init__(self, agent_types):
+    def __init__(self, agent_types, events=None, turn_delay=10, seed=None, event_log=None, board_config=None,
+                 decision_time=None, memory_profiler=None):
+        """
+        :param agent_types: The type of the agent sitting at each seat
+        :param events: The EventBus the game and its players publish their events to (default: a bus
+        without sinks - nothing is printed during the game)
+        :param turn_delay: Seconds to wait at the end of every turn (pacing for watching the game)
+        :param seed: Seed of the game's random generators - an int or a sequence of ints, such as
+        (tournament seed, game index). The same seed replays the same game
+        :param event_log: A game_log.GameLogWriter to record the game's events to (optional)
+        :param board_config: The BoardConfig of the board (default: the default board, without the Library if
+        the first BN player plays)
+        :param decision_time: Seconds an agent has for each call of its hooks - the agent gets the deadline
+        before the call, and a call that returns after it is counted as a deadline miss (default: no deadlines)
+        :param memory_profiler: A memory_profile.MemoryProfiler to charge the memory of the agents' construction
+        and hook calls to (optional). The game starts it, and stops it when run() returns
+        """
+        self._events = events if events is not None else EventBus()
+        self._turn_delay = turn_delay
+        self._event_log = event_log
+        # The dealer, the dice and every player draw from the game's own generators
+        self._rng, self._np_rng = create_game_rngs(seed)
         self._rounds_counter = 0
-        self._players = [self.__create_player(agent_types[i], CHARACTERS[i], len(agent_types))
-                         for i in range(len(agent_types))]
+        # The agent types without the parameters of their variants
+        agent_names = [parse_agent_spec(spec)[0] for spec in agent_types]
+        if board_config is None:
+            board_config = NO_LIBRARY_BOARD if BN in agent_names else DEFAULT_BOARD
+        self._board_config = board_config
+        self._memory_profiler = memory_profiler
+        if memory_profiler is not None:
+            memory_profiler.start()
+        self._players = []
+        for i in range(len(agent_types)):
+            memory_before = memory_profiler.hook_started() if memory_profiler is not None else None
+            self._players.append(create_player(agent_types[i], CHARACTERS[i], len(agent_types), self._rng,
+                                               board_config))
+            if memory_profiler is not None:
+                memory_profiler.hook_ended(i, memory_before)
+        for player in self._players:
+            player.set_event_bus(self._events)
+        # Time spent inside each agent's hooks, by seat
+        self._agent_wall_time = [0.0] * len(self._players)
+        self._agent_cpu_time = [0.0] * len(self._players)
+        # Number of turns (move and suggestion decisions) each seat played
+        self._agent_decisions = [0] * len(self._players)
+        self._decision_time = decision_time
+        # Hook calls, hook calls that missed their deadline and the slowest hook call (seconds), by seat
+        self._agent_calls = [0] * len(self._players)
+        self._agent_deadline_misses = [0] * len(self._players)
+        self._agent_slowest_call = [0.0] * len(self._players)
         self._turn_index = 0
-        self._board = Board(self._players)
+        self._board = Board(self._players, board_config)
+        # The hand of every seat, as a bit mask of card ids
+        self._hands = [0] * len(self._players)
         self._players_active = [True] * len(self._players)
 
-        characters, weapons, rooms = list(CHARACTERS), list(WEAPONS), list(ROOMS)
-        self._target_character = random.choice(characters)
+        characters, weapons, rooms = list(CHARACTERS), list(WEAPONS), list(board_config.rooms)
+        self._target_character = self._rng.choice(characters)
         characters.remove(self._target_character)
-        self._target_weapon = random.choice(weapons)
+        self._target_weapon = self._rng.choice(weapons)
         weapons.remove(self._target_weapon)
-        self._target_room = random.choice(rooms)
+        self._target_room = self._rng.choice(rooms)
         rooms.remove(self._target_room)
-        self._board.print_board()
+        if self._event_log:
+            self._event_log.game_started(len(self._players), self._target_character, self._target_weapon,
+                                         self._target_room)
+        self._events.publish(BoardChanged, self._board)
 
-        if BN in agent_types:
+        if BN in agent_names:
 
-            cur = random.choice(characters)
-            self._players[0].add_card(cur)
+            cur = self._rng.choice(characters)
+            self.__deal(0, cur)
             characters.remove(cur)
-            cur = random.choice(characters)
-            self._players[0].add_card(cur)
+            cur = self._rng.choice(characters)
+            self.__deal(0, cur)
             characters.remove(cur)
 
-            cur = random.choice(characters)
-            self._players[1].add_card(cur)
+            cur = self._rng.choice(characters)
+            self.__deal(1, cur)
             characters.remove(cur)
-            cur = random.choice(characters)
-            self._players[1].add_card(cur)
+            cur = self._rng.choice(characters)
+            self.__deal(1, cur)
             characters.remove(cur)
 
-            cur = random.choice(characters)
-            self._players[2].add_card(cur)
+            cur = self._rng.choice(characters)
+            self.__deal(2, cur)
             characters.remove(cur)
 
             # Deal weapons:
-            cur = random.choice(weapons)
-            self._players[0].add_card(cur)
+            cur = self._rng.choice(weapons)
+            self.__deal(0, cur)
             weapons.remove(cur)
 
-            cur = random.choice(weapons)
-            self._players[1].add_card(cur)
+            cur = self._rng.choice(weapons)
+            self.__deal(1, cur)
             weapons.remove(cur)
-            cur = random.choice(weapons)
-            self._players[1].add_card(cur)
+            cur = self._rng.choice(weapons)
+            self.__deal(1, cur)
             weapons.remove(cur)
 
-            cur = random.choice(weapons)
-            self._players[2].add_card(cur)
+            cur = self._rng.choice(weapons)
+            self.__deal(2, cur)
             weapons.remove(cur)
-            cur = random.choice(weapons)
-            self._players[2].add_card(cur)
+            cur = self._rng.choice(weapons)
+            self.__deal(2, cur)
             weapons.remove(cur)
 
             # Deal rooms:
-            cur = random.choice(rooms)
-            self._players[0].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(0, cur)
             rooms.remove(cur)
-            cur = random.choice(rooms)
-            self._players[0].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(0, cur)
             rooms.remove(cur)
-            cur = random.choice(rooms)
-            self._players[0].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(0, cur)
             rooms.remove(cur)
 
-            cur = random.choice(rooms)
-            self._players[1].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(1, cur)
             rooms.remove(cur)
-            cur = random.choice(rooms)
-            self._players[1].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(1, cur)
             rooms.remove(cur)
 
-            cur = random.choice(rooms)
-            self._players[2].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(2, cur)
             rooms.remove(cur)
-            cur = random.choice(rooms)
-            self._players[2].add_card(cur)
+            cur = self._rng.choice(rooms)
+            self.__deal(2, cur)
             rooms.remove(cur)
 
             if characters or weapons or rooms:
                 print("CARD DEALING PROBLEM")
                 sys.exit()
 
-            for player in self._players:
-                player.game_started()
+            self._first_responders = create_first_responders_table(self._hands)
+            for i in range(len(self._players)):
+                self.__timed(i, self._players[i].game_started)
         else:
             deck = characters
             deck.extend(weapons)
@@ -103,10 +159,11 @@ class ClueGame:
 
             i = 0
             while deck:
-                card_to_add = random.choice(deck)
+                card_to_add = self._rng.choice(deck)
                 deck.remove(card_to_add)
-                self._players[i].add_card(card_to_add)
+                self.__deal(i, card_to_add)
                 i = self.__advance_index_clockwise(i)
+            self._first_responders = create_first_responders_table(self._hands)
 
     def run(self):
         """
@@ -114,18 +171,42 @@ class ClueGame:
         """
         # use this to print what we're looking for
         # self.print_cards_state()
-        while True:
-            winner = self.run_single_turn()
-            if winner:
-                print("The winner is:", winner.get_character(), "of ", str(type(winner)) + ". Game was won after",
-                      self._rounds_counter, "rounds.")
-                break
+        if self._memory_profiler is not None:
+            self._memory_profiler.game_started()
+        try:
+            while True:
+                winner = self.run_single_turn()
+                if winner:
+                    if self._event_log:
+                        self._event_log.game_ended(self._players.index(winner), self._rounds_counter)
+                    self._events.publish(GameWon, winner.get_character(), type(winner).__name__,
+                                         self._rounds_counter)
+                    break
+        finally:
+            if self._memory_profiler is not None:
+                self._memory_profiler.stop()
         # print("Main game loop ended safely")
         return winner, self._rounds_counter
 
     def print_board(self):
         self._board.print_board()
 
+    def get_agent_times(self):
+        """
+        Returns a tuple (wall times, cpu times) - the seconds each seat spent inside its agent's hooks
+        """
+        return list(self._agent_wall_time), list(self._agent_cpu_time)
+
+    def get_agent_stats(self):
+        """
+        Returns the work counters of each seat's agent (decisions, replans, inference calls, hook calls,
+        deadline misses and the seconds of its slowest hook call), by seat
+        """
+        return [dict(player.get_stats(), decisions=self._agent_decisions[seat], calls=self._agent_calls[seat],
+                     deadline_misses=self._agent_deadline_misses[seat],
+                     slowest_call=self._agent_slowest_call[seat])
+                for seat, player in enumerate(self._players)]
+
     def print_cards_state(self):
         """
         Prints the actual targets and each player's cards
@@ -143,88 +224,116 @@ class ClueGame:
         Runs a single turn of the game
         """
         if not self._players_active[self._turn_index]:
+            # A player that made a false accusation only skips its turns
+            self.__pass_turn()
             return
         else:
             if self._players_active.count(True) == 1:
                 return self._players[self._turn_index]
         cur_player = self._players[self._turn_index]
-        print(cur_player.get_character(), "'s Turn Started.")
-        print("Location:", self._board.get_player_location(cur_player))
-        cube_1 = np.random.randint(1, 6)
-        cube_2 = np.random.randint(1, 6)
+        self._events.publish(TurnStarted, cur_player.get_character(), self._board.get_player_location(cur_player))
+        cube_1 = self._np_rng.integers(1, 6)
+        cube_2 = self._np_rng.integers(1, 6)
         cube_result = cube_1 + cube_2
-        print("Cube:", cube_result)
+        self._events.publish(DiceRolled, cur_player.get_character(), cube_result)
+        if self._event_log:
+            self._event_log.roll(self._turn_index, cube_result)
         possible_locations = self._board.get_possible_locations(cur_player, cube_result)
 
         # Get move and suggestion from current player:
-        move, suggestion = cur_player.make_move_suggestion(possible_locations)
+        self._agent_decisions[self._turn_index] += 1
+        move, suggestion = self.__timed(self._turn_index, cur_player.make_move_suggestion, possible_locations)
 
         self._board.update_player_location(cur_player, move)
-        print("Moves to:", move)
+        self._events.publish(PlayerMoved, cur_player.get_character(), move)
+        if self._event_log:
+            self._event_log.move(self._turn_index, move)
         if suggestion:
+            if self._event_log:
+                self._event_log.suggestion(self._turn_index, suggestion)
             # Run the suggestion process:
             # For now, if a player has more then one card to show, the choice is made for him randomly
             suggestion_in_order = suggestion
             suggestion = list(suggestion)
-            random.shuffle(suggestion)
-            cur_responder_index = self.__advance_index_clockwise(self._turn_index)
-            has_responded = False
+            self._rng.shuffle(suggestion)
+            responder_index = int(self._first_responders[self._turn_index, suggestion_index(suggestion_in_order)])
+            # The players are asked clockwise, up to the first one that can respond
             were_asked = []
-            while not has_responded and cur_responder_index != self._turn_index:
+            asked_seats = []
+            cur_responder_index = self.__advance_index_clockwise(self._turn_index)
+            while cur_responder_index != self._turn_index:
                 cur_responder = self._players[cur_responder_index]
-                print("Player", cur_player.get_character(), "asks", cur_responder.get_character(),
-                      "if he has", suggestion)
+                self._events.publish(PlayerAsked, cur_player.get_character(), cur_responder.get_character(),
+                                     suggestion)
                 were_asked.append(cur_responder.get_character())
-                for card in suggestion:
-                    # print("Card:", card)
-                    if cur_responder.has_card(card):
-                        print(cur_responder.get_character(), "has responded")
-                        cur_player.see_card(were_asked, card)
-                        has_responded = True
-                        for player in self._players:
-                            if player is not cur_player:
-                                player.update_on_other_player_suggestion(suggestion_in_order, True, were_asked)
-                        break
-                # print("###FINISH###")
+                asked_seats.append(cur_responder_index)
+                if cur_responder_index == responder_index:
+                    break
                 cur_responder_index = self.__advance_index_clockwise(cur_responder_index)
 
-            # If no one could respond - inform the player:
-            if not has_responded:
-                cur_player.see_card(None)
-                for player in self._players:
-                    if player is not cur_player:
-                        player.update_on_other_player_suggestion(suggestion_in_order,
-                                                                 False,
-                                                                 were_asked)
+            if responder_index >= 0:
+                # The responder shows the first of its cards in the (shuffled) suggestion
+                hand = self._hands[responder_index]
+                card = next(card for card in suggestion if hand >> card & 1)
+                self._events.publish(PlayerResponded, cur_player.get_character(),
+                                     self._players[responder_index].get_character())
+                if self._event_log:
+                    self._event_log.response(self._turn_index, asked_seats, responder_index, card)
+                self.__timed(self._turn_index, cur_player.see_card, were_asked, card)
+                for i in range(len(self._players)):
+                    if i != self._turn_index:
+                        self.__timed(i, self._players[i].update_on_other_player_suggestion,
+                                     suggestion_in_order, True, were_asked)
+            else:
+                # If no one could respond - inform the player:
+                if self._event_log:
+                    self._event_log.response(self._turn_index, asked_seats)
+                self.__timed(self._turn_index, cur_player.see_card, None)
+                for i in range(len(self._players)):
+                    if i != self._turn_index:
+                        self.__timed(i, self._players[i].update_on_other_player_suggestion,
+                                     suggestion_in_order, False, were_asked)
 
             # Move player that has been suggested to the suggested room
             suggested_character = suggestion_in_order[0]
             suggested_room = suggestion_in_order[2]
-            for player in self._players:
+            for i in range(len(self._players)):
+                player = self._players[i]
                 if player.get_character() == suggested_character:
-                    new_loc = LOCATIONS_OF_ROOMS[suggested_room]
+                    new_loc = self._board_config.locations_of_rooms[suggested_room]
                     player.set_location(new_loc)
                     self._board.update_player_location(player, new_loc)
+                    if self._event_log:
+                        self._event_log.move(i, new_loc)
                     break
 
         # Run the accusation process:
-        accusation = cur_player.make_accusation()
+        accusation = self.__timed(self._turn_index, cur_player.make_accusation)
         if accusation:
-            print(cur_player.get_character(), "Accused", accusation)
             accusation_character = accusation[0]
             accusation_weapon = accusation[1]
             accusation_room = accusation[2]
-            if accusation_character == self._target_character \
-                    and accusation_weapon == self._target_weapon \
-                    and accusation_room == self._target_room:
+            correct = accusation_character == self._target_character \
+                and accusation_weapon == self._target_weapon \
+                and accusation_room == self._target_room
+            self._events.publish(AccusationMade, cur_player.get_character(), accusation, correct)
+            if self._event_log:
+                self._event_log.accusation(self._turn_index, accusation, correct)
+            if correct:
                 return cur_player
             else:
                 self._players_active[self._turn_index] = False
 
-        time.sleep(10)
-        self.print_board()
+        if self._turn_delay:
+            time.sleep(self._turn_delay)
+        self._events.publish(BoardChanged, self._board)
+        if self._memory_profiler is not None:
+            self._memory_profiler.turn_ended()
 
         # Don't forget to pass the turn :)
+        self.__pass_turn()
+
+    def __pass_turn(self):
         self._turn_index = self.__advance_index_clockwise(self._turn_index)
         if self._turn_index == 0:
             self._rounds_counter += 1
@@ -232,52 +341,188 @@ class ClueGame:
     def __advance_index_clockwise(self, index):
         return (index + 1) % len(self._players)
 
-    def __create_player(self, agent_type, character, players_n):
-        if agent_type == RANDOM:
-            return RandomPlayer(character, OPEN_LOC[character])
-        if agent_type == HUMAN:
-            return HumanPlayer(character, OPEN_LOC[character])
-        if agent_type == PLANNING:
-            return PlanningPlayer(character, OPEN_LOC[character])
-        if agent_type == BN:
-            return BNPlayer(character, OPEN_LOC[character])
-        if agent_type == BN2:
-            return BNPlayer2(character, OPEN_LOC[character], players_n)
-
-        print("Unknown agent type:", agent_type)
-        sys.exit()
+    def __deal(self, seat, card):
+        """
+        Deals a card to the player in the seat
+        """
+        self._players[seat].add_card(card)
+        self._hands[seat] |= 1 << card
+        if self._event_log:
+            self._event_log.deal(seat, card)
 
+    def __timed(self, seat, hook, *args):
+        """
+        Calls one of the agent's hooks, with the deadline of the call, and charges the time it took to the agent's seat
+        """
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if self._decision_time is not None:
+            self._players[seat].set_deadline(wall_start + self._decision_time)
+        memory_before = self._memory_profiler.hook_started() if self._memory_profiler is not None else None
+        result = hook(*args)
+        if self._memory_profiler is not None:
+            self._memory_profiler.hook_ended(seat, memory_before)
+        wall_time = time.perf_counter() - wall_start
+        self._agent_wall_time[seat] += wall_time
+        self._agent_cpu_time[seat] += time.process_time() - cpu_start
+        self._agent_calls[seat] += 1
+        if self._decision_time is not None and wall_time > self._decision_time:
+            self._agent_deadline_misses[seat] += 1
+        if wall_time > self._agent_slowest_call[seat]:
+            self._agent_slowest_call[seat] = wall_time
+        return result
+
+
+def create_first_responders_table(hands):
+    """
+    Precomputes who answers every possible suggestion
+    :param hands: The hand of every seat, as a bit mask of card ids
+    :return: Array of shape (seats, SUGGESTIONS_N) - the seat of the first player clockwise from the suggesting
+    seat that holds one of the suggestion's cards, or -1 if no one holds any of them
+    """
+    seats_n = len(hands)
+    # in_hand[seat][card id] - the seat holds the card
+    in_hand = (np.array(hands)[:, None] >> np.arange(len(CARDS)) & 1).astype(bool)
+    characters, weapons, rooms = np.split(in_hand, [WEAPONS_OFFSET, ROOMS_OFFSET], axis=1)
+    # holds[seat][suggestion] - the seat holds at least one of the suggestion's cards
+    holds = (characters[:, :, None, None] | weapons[:, None, :, None] | rooms[:, None, None, :]).reshape(seats_n, -1)
+
+    # order[seat] - the other seats, clockwise from seat
+    order = (np.arange(seats_n)[:, None] + np.arange(1, seats_n)) % seats_n
+    order_holds = holds[order]
+    first = np.take_along_axis(order, order_holds.argmax(axis=1), axis=1)
+    return np.where(order_holds.any(axis=1), first, -1)
 
-def check_input(arguments):
-    usage_msg = "Usage: \n\tclue.py <player types separated by comma>\n" \
-                "h - human player;\tr - random player;\tp - planning player;\tbn - the first BN player;\t" \
-                "bn2 - the second BN player."
 
+def create_player(agent_type, character, players_n, rng=None, config=DEFAULT_BOARD):
+    """
+    Creates a player of the agent type, playing the character, starting at the character's opening location
+    :param agent_type: An agent spec - the agent type, optionally with the parameters of a variant
+    (see util.parse_agent_spec)
+    :param players_n: Number of players in the game
+    :param rng: The game's random.Random
+    :param config: The BoardConfig of the game's board
+    """
+    start_location = config.open_loc[character]
+    agent_type, params = parse_agent_spec(agent_type)
+    if agent_type in AGENT_CLASSES:
+        params = agent_parameters(agent_type, params)
+    if agent_type == RANDOM:
+        return RandomPlayer(character, start_location, rng, config, **params)
+    if agent_type == HUMAN:
+        return HumanPlayer(character, start_location, rng, config, **params)
+    if agent_type == PLANNING:
+        return PlanningPlayer(character, start_location, rng, config, **params)
+    if agent_type == BN:
+        return BNPlayer(character, start_location, rng, config, **params)
+    if agent_type == BN2:
+        return BNPlayer2(character, start_location, players_n, rng, config, **params)
+
+    print("Unknown agent type:", agent_type)
+    sys.exit()
+
+
+# The class of every agent type
+AGENT_CLASSES = {HUMAN: HumanPlayer, RANDOM: RandomPlayer, PLANNING: PlanningPlayer, BN: BNPlayer, BN2: BNPlayer2}
+
+# The parameters of the agents' constructors that the game gives them - a variant can't set these
+GAME_PARAMETERS = ("self", "character", "start_location", "players_n", "rng", "config")
+
+
+def agent_parameters(agent_type, params):
+    """
+    Checks the parameters of a variant against its agent's constructor, and converts their values to the types of
+    the parameters' defaults (a bool is given as 1, 0, true or false)
+    :param params: Dictionary of parameter name -> value, as a string
+    :return: Dictionary of parameter name -> value
+    :raise ValueError: If the agent has no such parameter, or a value isn't of the parameter's type
+    """
+    signature = inspect.signature(AGENT_CLASSES[agent_type].__init__)
+    names = [name for name, parameter in signature.parameters.items()
+             if name not in GAME_PARAMETERS and parameter.default is not inspect.Parameter.empty]
+    values = dict()
+    for name, value in params.items():
+        if name not in names:
+            raise ValueError("%s has no parameter %s (its parameters: %s)" %
+                             (agent_type, name, ", ".join(names) if names else "none"))
+        default = signature.parameters[name].default
+        if isinstance(default, bool):
+            if value.lower() not in ("1", "0", "true", "false"):
+                raise ValueError("%s of %s must be 1, 0, true or false, not %s" % (name, agent_type, value))
+            values[name] = value.lower() in ("1", "true")
+        elif isinstance(default, (int, float)):
+            try:
+                values[name] = type(default)(value)
+            except ValueError:
+                raise ValueError("%s of %s must be %s, not %s" % (name, agent_type,
+                                                                 "an int" if isinstance(default, int) else "a number",
+                                                                 value)) from None
+        else:
+            values[name] = value
+    return values
+
+
+USAGE_MSG = "Usage: \n\tclue.py <player types separated by comma>\n" \
+            "\tclue.py --tournament <number of games> --players <player types separated by comma>\n" \
+            "h - human player;\tr - random player;\tp - planning player;\tbn - the first BN player;\t" \
+            "bn2 - the second BN player."
+
+
+def check_input(arguments):
     if len(arguments) != 2:
-        print(usage_msg)
+        print(USAGE_MSG)
         exit()
-    players_args = arguments[1].split(",")
+    return parse_players(arguments[1])
+
+
+def parse_player(player_arg):
+    """
+    Parses a player type, optionally followed by the parameters of a variant (e.g. bn2:accusation_threshold=0.95),
+    into an agent spec
+    :return: The agent spec, or None if the player type is unknown
+    :raise ValueError: If the parameters don't fit the agent (see agent_parameters)
+    """
+    player, _, params = player_arg.partition(":")
+    if player == 'h':
+        agent_type = HUMAN
+    elif player == 'bn':
+        agent_type = BN
+    elif player == 'bn2':
+        agent_type = BN2
+    elif player == 'r':
+        agent_type = RANDOM
+    elif player == 'p':
+        agent_type = PLANNING
+    else:
+        return None
+    agent_spec = agent_type + ":" + params if params else agent_type
+    agent_parameters(agent_type, parse_agent_spec(agent_spec)[1])
+    return agent_spec
+
+
+def parse_players(players_arg):
+    """
+    Parses the player types separated by comma into a list of agent specs
+    """
+    players_args = players_arg.split(",")
     if len(players_args) < 3:
-        print(usage_msg)
+        print(USAGE_MSG)
         exit()
-    if "bn" in players_args and (players_args.index("bn") != 0 or players_args.count("bn") != 1):
+    players = [player_arg.partition(":")[0] for player_arg in players_args]
+    if "bn" in players and (players.index("bn") != 0 or players.count("bn") != 1):
         print("The first bn can only be a member of 3-players game and has to be the first one.")
         exit()
     agent_types = []
-    for player in players_args:
-        if player == 'h':
-            agent_types.append(HUMAN)
-        elif player == 'bn':
-            agent_types.append(BN)
-        elif player == 'bn2':
-            agent_types.append(BN2)
-        elif player == 'r':
-            agent_types.append(RANDOM)
-        elif player == 'p':
-            agent_types.append(PLANNING)
-        else:
-            print(usage_msg)
+    for player_arg in players_args:
+        try:
+            agent_type = parse_player(player_arg)
+        except ValueError as error:
+            print(error)
+            print(USAGE_MSG)
+            exit()
+        if agent_type is None:
+            print(USAGE_MSG)
             exit(0)
+        agent_types.append(agent_type)
     if len(agent_types) > 6:
         print("The number of players must be between 3 and 6 included!")
         exit()
@@ -285,20 +530,19 @@ def check_input(arguments):
 
 
 if __name__ == '__main__':
-    import sys
+    if '--tournament' in sys.argv[1:]:
+        import tournament
 
-    agent_types = check_input(sys.argv)
+        tournament.main(sys.argv[1:])
+        sys.exit()
 
-    if BN in agent_types:
-        ROOMS.remove(Room.Library)
-        ROOMS_LOC.pop(LOCATIONS_OF_ROOMS[Room.Library])
-        LOCATIONS_OF_ROOMS.pop(Room.Library)
+    agent_types = check_input(sys.argv)
 
     i = 1
     while True:
         print("\n", "RUN GAME #", i)
 
-        game = ClueGame(agent_types)
+        game = ClueGame(agent_types, EventBus(ConsoleSink()))
         game.run()
         if input("Wanna play again with the same characters? Press Y or y. "
                  "Otherwise, press other key: ") not in ['Y', 'y']:
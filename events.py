@@ -0,0 +1,263 @@
+"""
+Game events. The game and the players publish typed events to an EventBus, and the sinks subscribed to
+the bus (console, structured file, ...) handle them. An event is created only if a subscribed sink wants
+its level, and its text is formatted only by a sink that handles it - a bus without sinks does no
+formatting work at all.
+"""
+import json
+import sys
+from enum import Enum
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+
+def to_json(value):
+    """
+    Converts an event's value (cards, locations, suggestions...) into a JSON-serializable value
+    """
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, (tuple, list, set)):
+        return [to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {str(to_json(key)): to_json(item) for key, item in value.items()}
+    return value
+
+
+class Event:
+    """
+    Base class of the game events. An event keeps the values it was published with, by the names in fields
+    """
+    level = INFO
+    fields = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.fields, values):
+            setattr(self, name, value)
+
+    def message(self):
+        """
+        :return: The event as text, for people
+        """
+        return type(self).__name__
+
+    def to_dict(self):
+        """
+        :return: The event as a JSON-serializable dictionary, for tools
+        """
+        record = {"event": type(self).__name__, "level": LEVEL_NAMES[self.level]}
+        for name in self.fields:
+            record[name] = to_json(getattr(self, name))
+        return record
+
+
+class BoardChanged(Event):
+    fields = ("board",)
+
+    def message(self):
+        return self.board.render()
+
+    def to_dict(self):
+        return {"event": type(self).__name__, "level": LEVEL_NAMES[self.level],
+                "locations": to_json(self.board.get_locations())}
+
+
+class TurnStarted(Event):
+    fields = ("character", "location")
+
+    def message(self):
+        return "%s 's Turn Started.\nLocation: %s" % (self.character, self.location)
+
+
+class DiceRolled(Event):
+    fields = ("character", "cube_result")
+
+    def message(self):
+        return "Cube: %s" % self.cube_result
+
+    def to_dict(self):
+        return {"event": type(self).__name__, "level": LEVEL_NAMES[self.level],
+                "character": to_json(self.character), "cube_result": int(self.cube_result)}
+
+
+class PlayerMoved(Event):
+    fields = ("character", "location")
+
+    def message(self):
+        return "Moves to: %s" % (self.location,)
+
+
+class PlayerAsked(Event):
+    fields = ("character", "responder", "suggestion")
+
+    def message(self):
+        return "Player %s asks %s if he has %s" % (self.character, self.responder, self.suggestion)
+
+
+class PlayerResponded(Event):
+    fields = ("character", "responder")
+
+    def message(self):
+        return "%s has responded" % self.responder
+
+
+class AccusationMade(Event):
+    fields = ("character", "accusation", "correct")
+
+    def message(self):
+        return "%s Accused %s" % (self.character, self.accusation)
+
+
+class GameWon(Event):
+    fields = ("character", "agent_type", "rounds")
+
+    def message(self):
+        return "The winner is: %s of  %s. Game was won after %d rounds." % (self.character, self.agent_type,
+                                                                           self.rounds)
+
+
+class SuggestionChosen(Event):
+    level = DEBUG
+    fields = ("character", "suggestion")
+
+    def message(self):
+        return "Suggested character: %s\nSuggested weapon: %s\nSuggested room: %s" % self.suggestion
+
+
+class PlanningStarted(Event):
+    fields = ("character",)
+
+    def message(self):
+        return "Planning player %s certainly is planning something..." % self.character
+
+
+class SuspectsExhausted(Event):
+    level = WARNING
+    fields = ("character", "agent_type")
+
+    def message(self):
+        return "Player %s Of type %s has empty suspects set" % (self.character, self.agent_type)
+
+
+class Sink:
+    """
+    Base class of the event sinks. A sink handles the events of its level and above
+    """
+
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def handle(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink(Sink):
+    """
+    Prints the events' messages
+    """
+
+    def __init__(self, level=INFO, stream=None):
+        super(ConsoleSink, self).__init__(level)
+        self._stream = stream
+
+    def handle(self, event):
+        print(event.message(), file=self._stream or sys.stdout)
+
+
+class AnsiBoardSink(Sink):
+    """
+    Keeps the board drawn at the top of an ANSI terminal - every BoardChanged redraws only the cells
+    that changed. Other events are ignored, so the terminal should be dedicated to the board
+    """
+
+    def __init__(self, level=INFO, stream=None):
+        super(AnsiBoardSink, self).__init__(level)
+        self._stream = stream
+
+    def handle(self, event):
+        if isinstance(event, BoardChanged):
+            stream = self._stream or sys.stdout
+            stream.write(event.board.render_changes())
+            stream.flush()
+
+
+class FileSink(Sink):
+    """
+    Writes the events to a file as JSON lines
+    """
+
+    def __init__(self, path, level=INFO):
+        super(FileSink, self).__init__(level)
+        self._file = open(path, 'a')
+
+    def handle(self, event):
+        self._file.write(json.dumps(event.to_dict()))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class NullSink(Sink):
+    """
+    Takes every event and discards it - measures the cost of publishing events, without any formatting
+    """
+
+    def __init__(self, level=DEBUG):
+        super(NullSink, self).__init__(level)
+
+
+class EventBus:
+    """
+    Delivers the published events to the subscribed sinks
+    """
+
+    def __init__(self, *sinks):
+        self._sinks = []
+        # The lowest level any of the sinks handles (None - no sinks)
+        self._level = None
+        for sink in sinks:
+            self.subscribe(sink)
+
+    def subscribe(self, sink):
+        self._sinks.append(sink)
+        self._update_level()
+
+    def unsubscribe(self, sink):
+        self._sinks.remove(sink)
+        self._update_level()
+
+    def _update_level(self):
+        self._level = min(sink.level for sink in self._sinks) if self._sinks else None
+
+    def is_enabled(self, level):
+        """
+        :return: True iff a subscribed sink handles events of the level
+        """
+        return self._level is not None and level >= self._level
+
+    def publish(self, event_type, *values):
+        """
+        Publishes an event of event_type with the values - the event is only created if a sink handles it
+        """
+        if self._level is None or event_type.level < self._level:
+            return
+        event = event_type(*values)
+        for sink in self._sinks:
+            if event.level >= sink.level:
+                sink.handle(event)
+
+    def close(self):
+        for sink in self._sinks:
+            sink.close()
+
+
+# The bus of players that are not part of a game. It never has sinks, so publishing to it costs nothing
+NO_EVENTS = EventBus()
@@ -0,0 +1,244 @@
+"""
+Compact binary log of Clue games. Every event of a game is a fixed size record of small integers
+(cards are their ids, players are their seats), appended to the log by a buffered writer.
+The reader memory-maps the log, so iterating over it never loads the whole log.
+GameReplayer feeds recorded games back into players, without running the game engine.
+"""
+import mmap
+import struct
+import time
+from collections import namedtuple
+
+from util import CARDS, CHARACTERS
+
+# Event kinds and the meaning of their fields
+GAME_START = 0  # seat: number of players, a, b, c: the murder cards
+DEAL = 1  # seat: the player who got the card, a: the card
+ROLL = 2  # seat: the player, a: the cube result
+MOVE = 3  # seat: the player, a, b: the new location
+SUGGESTION = 4  # seat: the player, a, b, c: character, weapon, room
+RESPONSE = 5  # seat: the suggesting player, a: bit mask of the seats asked, b: the answering seat, c: the card shown
+ACCUSATION = 6  # seat: the player, a, b, c: character, weapon, room, d: 1 if correct
+GAME_END = 7  # seat: the winner, value: the number of rounds
+
+NONE = 255  # b and c of a RESPONSE no one answered
+
+RECORD = struct.Struct('<6BH')
+
+Event = namedtuple('Event', 'kind seat a b c d value')
+
+
+class GameLogWriter:
+    """
+    Appends events to a game log, through a buffer
+    """
+
+    def __init__(self, path, buffer_events=4096):
+        self._file = open(path, 'ab')
+        self._buffer = bytearray()
+        self._buffer_size = buffer_events * RECORD.size
+
+    def write(self, kind, seat, a=0, b=0, c=0, d=0, value=0):
+        self._buffer += RECORD.pack(kind, seat, a, b, c, d, value)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def game_started(self, players_n, target_character, target_weapon, target_room):
+        self.write(GAME_START, players_n, target_character, target_weapon, target_room)
+
+    def deal(self, seat, card):
+        self.write(DEAL, seat, card)
+
+    def roll(self, seat, cube_result):
+        self.write(ROLL, seat, cube_result)
+
+    def move(self, seat, location):
+        self.write(MOVE, seat, location[0], location[1])
+
+    def suggestion(self, seat, suggestion):
+        self.write(SUGGESTION, seat, suggestion[0], suggestion[1], suggestion[2])
+
+    def response(self, seat, asked_seats, answering_seat=None, card=None):
+        asked_mask = 0
+        for asked in asked_seats:
+            asked_mask |= 1 << asked
+        self.write(RESPONSE, seat, asked_mask, NONE if answering_seat is None else answering_seat,
+                   NONE if card is None else card)
+
+    def accusation(self, seat, accusation, correct):
+        self.write(ACCUSATION, seat, accusation[0], accusation[1], accusation[2], int(correct))
+
+    def game_ended(self, winner_seat, rounds):
+        self.write(GAME_END, winner_seat, value=rounds)
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GameLogReader:
+    """
+    Reads a game log through a memory map
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        size = self._file.seek(0, 2)
+        # A partly written last record (the writer was killed) is ignored
+        self._events_n = size // RECORD.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return self._events_n
+
+    def __iter__(self):
+        records = memoryview(self._map)[:self._events_n * RECORD.size]
+        for fields in RECORD.iter_unpack(records):
+            yield Event(*fields)
+
+    def games(self):
+        """
+        Yields the events of one game at a time
+        """
+        game = []
+        for event in self:
+            if event.kind == GAME_START:
+                game = []
+            game.append(event)
+            if event.kind == GAME_END:
+                yield game
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GameReplayer:
+    """
+    Feeds the events of recorded games back into players - the cards they were dealt, the locations they
+    moved to, the cards they were shown and the other players' suggestions - without running the game.
+    """
+
+    def __init__(self, player_factory, seats=None):
+        """
+        :param player_factory: function (seat, character, number of players) -> Player
+        :param seats: The seats to create players for (default: all of them)
+        """
+        self._player_factory = player_factory
+        self._seats = seats
+        self.hook_calls = 0
+        self.hook_time = 0.0
+        # Calls and seconds of every hook, by the hook's name
+        self.hook_stats = dict()
+
+    def replay(self, events):
+        """
+        Replays a single game
+        :param events: The events of the game, starting with its GAME_START
+        :return: The players, by seat (None for seats that weren't replayed)
+        """
+        players = []
+        started = False
+        suggestion = None
+        for event in events:
+            kind = event.kind
+            if kind == GAME_START:
+                players_n = event.seat
+                seats = range(players_n) if self._seats is None else self._seats
+                players = [self._player_factory(seat, CHARACTERS[seat], players_n) if seat in seats else None
+                           for seat in range(players_n)]
+                continue
+            if kind == DEAL:
+                if players[event.seat]:
+                    self._call(players[event.seat].add_card, CARDS[event.a])
+                continue
+            if not started:
+                started = True
+                for player in players:
+                    if player:
+                        self._call(player.game_started)
+
+            if kind == MOVE and players[event.seat]:
+                players[event.seat].set_location((event.a, event.b))
+            elif kind == SUGGESTION:
+                suggestion = (CARDS[event.a], CARDS[event.b], CARDS[event.c])
+                if players[event.seat]:
+                    players[event.seat].set_last_suggestion(suggestion)
+            elif kind == RESPONSE:
+                self._replay_response(players, event, suggestion)
+        return players
+
+    def _replay_response(self, players, event, suggestion):
+        players_n = len(players)
+        asker = event.seat
+        were_asked = [CHARACTERS[(asker + i) % players_n] for i in range(1, players_n)
+                      if event.a & (1 << ((asker + i) % players_n))]
+        was_showed = event.b != NONE
+        if players[asker]:
+            if was_showed:
+                self._call(players[asker].see_card, were_asked, CARDS[event.c])
+            else:
+                self._call(players[asker].see_card, None)
+        for seat in range(players_n):
+            if seat != asker and players[seat]:
+                self._call(players[seat].update_on_other_player_suggestion, suggestion, was_showed, were_asked)
+
+    def _call(self, hook, *args):
+        start = time.perf_counter()
+        hook(*args)
+        elapsed = time.perf_counter() - start
+        self.hook_time += elapsed
+        self.hook_calls += 1
+        stats = self.hook_stats.setdefault(hook.__name__, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def main():
+    import argparse
+    from clue import create_player
+    from util import RANDOM, PLANNING, BN2, DEFAULT_BOARD, NO_LIBRARY_BOARD
+
+    agent_types = {'r': RANDOM, 'p': PLANNING, 'bn2': BN2}
+    parser = argparse.ArgumentParser(description="Replays a game log into agents and measures their update cost")
+    parser.add_argument("log", help="game log file")
+    parser.add_argument("--agent", default='r', choices=list(agent_types), help="agent type to replay into")
+    parser.add_argument("--no-library", action="store_true", help="the log is of games without the Library")
+    args = parser.parse_args()
+    config = NO_LIBRARY_BOARD if args.no_library else DEFAULT_BOARD
+
+    agent_type = agent_types[args.agent]
+    replayer = GameReplayer(lambda seat, character, players_n: create_player(agent_type, character, players_n,
+                                                                             config=config))
+    games_n = 0
+    start = time.perf_counter()
+    with GameLogReader(args.log) as reader:
+        for game in reader.games():
+            replayer.replay(game)
+            games_n += 1
+    elapsed = time.perf_counter() - start
+    print("Replayed", games_n, "games:", replayer.hook_calls, "hook calls in %.3f seconds (%.0f calls/sec)"
+          % (replayer.hook_time, replayer.hook_calls / max(replayer.hook_time, 1e-9)))
+    print("Total time %.3f seconds" % elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Latency instrumentation of the agents - call counts and latency histograms of every Player hook and of the
+agents' internal hot spots (planning, search and Bayesian inference). Enabling it wraps the instrumented
+functions in place, and disabling it restores them, so a disabled instrumentation costs nothing at all.
+"""
+import functools
+import json
+import time
+
+import BNplayer
+import BNplayer2
+import player
+import search
+
+# Number of histogram buckets - bucket i counts the calls that took [2^(i-1), 2^i) nanoseconds
+BUCKETS = 48
+
+HOOKS = ("make_move_suggestion", "see_card", "update_on_other_player_suggestion", "make_accusation", "add_card",
+         "game_started")
+
+PLAYER_CLASSES = (player.Player, player.RandomPlayer, player.HumanPlayer, player.PlanningPlayer,
+                  BNplayer.BNPlayer, BNplayer2.BNPlayer2)
+
+
+class LatencyHistogram:
+    """
+    Call count and log2 latency histogram of one instrumented function
+    """
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        self.counts[min(ns.bit_length(), BUCKETS - 1)] += 1
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.calls += other.calls
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentile(self, percentile):
+        """
+        :return: An upper bound (the end of its bucket) of the latency percentile, in nanoseconds
+        """
+        rank = percentile / 100 * self.calls
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** i, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self):
+        # Trailing empty buckets are left out
+        last = max((i for i, count in enumerate(self.counts) if count), default=-1)
+        return {"calls": self.calls, "total_ns": self.total_ns, "max_ns": self.max_ns,
+                "counts": self.counts[:last + 1]}
+
+    @staticmethod
+    def from_dict(record):
+        histogram = LatencyHistogram()
+        histogram.counts[:len(record["counts"])] = record["counts"]
+        histogram.calls = record["calls"]
+        histogram.total_ns = record["total_ns"]
+        histogram.max_ns = record["max_ns"]
+        return histogram
+
+
+# Histograms of the instrumented functions, by name
+histograms = dict()
+# The original functions that enable() replaced: (owner, attribute, original)
+_originals = []
+
+
+def _timed(name, function):
+    histogram = histograms.setdefault(name, LatencyHistogram())
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.add(time.perf_counter_ns() - start)
+    return timed
+
+
+def _wrap(owner, attribute, name):
+    original = owner.__dict__[attribute]
+    _originals.append((owner, attribute, original))
+    setattr(owner, attribute, _timed(name, original))
+
+
+class TimedVariableElimination(BNplayer.VariableElimination):
+    """
+    VariableElimination whose queries are timed - replaces it in the BN player's module while enabled
+    """
+
+    def query(self, *args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return super().query(*args, **kwargs)
+        finally:
+            histograms["BNPlayer.VariableElimination.query"].add(time.perf_counter_ns() - start)
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def enable():
+    """
+    Wraps the Player hooks and the hot spots of the agents with timers (does nothing if already enabled)
+    """
+    if is_enabled():
+        return
+    for player_class in PLAYER_CLASSES:
+        for hook in HOOKS:
+            if hook in player_class.__dict__:
+                _wrap(player_class, hook, player_class.__name__ + "." + hook)
+    _wrap(player.PlanningPlayer, "create_plan", "PlanningPlayer.create_plan")
+    _wrap(player.PlanningPlayer, "repair_plan", "PlanningPlayer.repair_plan")
+    _wrap(BNplayer2.BNPlayer2, "update_p_of_parents_given_child", "BNPlayer2.update_p_of_parents_given_child")
+    # The planning player calls the search by the name it imported
+    timed_search = _timed("a_star_search", search.a_star_search)
+    for module in (search, player):
+        _originals.append((module, "a_star_search", module.a_star_search))
+        module.a_star_search = timed_search
+    histograms.setdefault("BNPlayer.VariableElimination.query", LatencyHistogram())
+    _originals.append((BNplayer, "VariableElimination", BNplayer.VariableElimination))
+    BNplayer.VariableElimination = TimedVariableElimination
+
+
+def disable():
+    """
+    Restores the original functions
+    """
+    while _originals:
+        owner, attribute, original = _originals.pop()
+        setattr(owner, attribute, original)
+
+
+def reset():
+    """
+    Clears the histograms (the wrapped functions keep recording into them)
+    """
+    for histogram in histograms.values():
+        histogram.__init__()
+
+
+def snapshot():
+    """
+    :return: The histograms of the functions that were called, as a JSON-serializable dictionary of name -> histogram
+    """
+    return {name: histogram.to_dict() for name, histogram in histograms.items() if histogram.calls}
+
+
+def merge_snapshots(total, snapshot):
+    """
+    Adds a snapshot to a dictionary of name -> LatencyHistogram
+    """
+    for name, record in snapshot.items():
+        total.setdefault(name, LatencyHistogram()).merge(LatencyHistogram.from_dict(record))
+    return total
+
+
+def summary(total):
+    """
+    :param total: Dictionary of name -> LatencyHistogram
+    :return: Lines of a table of the functions, from the one that took the most time
+    """
+    lines = ["%10s %11s %11s %11s %11s %11s  %s" % ("calls", "total (s)", "mean (ms)", "p50 (ms)", "p99 (ms)",
+                                                    "max (ms)", "function")]
+    for name, histogram in sorted(total.items(), key=lambda item: item[1].total_ns, reverse=True):
+        lines.append("%10d %11.3f %11.3f %11.3f %11.3f %11.3f  %s" %
+                     (histogram.calls, histogram.total_ns / 1e9, histogram.total_ns / histogram.calls / 1e6,
+                      histogram.percentile(50) / 1e6, histogram.percentile(99) / 1e6, histogram.max_ns / 1e6, name))
+    return lines
+
+
+class HookLog:
+    """
+    Takes the per-game histograms out of a tournament's results: writes every game's histograms to a file as
+    a JSON line, and the histograms of the whole tournament as the last line when closed
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'w')
+        self.total = dict()
+
+    def add(self, result):
+        """
+        Logs the histograms of a per-game result and removes them from it
+        """
+        hooks = result.pop("hooks")
+        merge_snapshots(self.total, hooks)
+        self._file.write(json.dumps({"game": result["game"], "hooks": hooks}))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.write(json.dumps({"tournament": {name: histogram.to_dict()
+                                                    for name, histogram in self.total.items()}}))
+        self._file.write("\n")
+        self._file.close()
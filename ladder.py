@@ -0,0 +1,245 @@
+"""
+Rating ladder of agent types and their variants (agent specs, such as bn2:accusation_threshold=0.95). The ladder
+consumes game results as a stream: every game updates the ratings of the agents that played it, by the Weng-Lin
+Bayesian rating of many-player games (a TrueSkill-like rating, with the Bradley-Terry model), and every agent keeps
+only its (mu, sigma) and its number of games. The ladder also picks the next games to play where the ratings are
+the most uncertain, so the games go where they are the most informative.
+"""
+import argparse
+import math
+import multiprocessing
+import queue
+import random
+import time
+
+from clue import parse_player
+from results_store import ResultsStore
+from tournament import STORE_BATCH_SIZE, create_pool, play_game
+from util import BN, HUMAN, parse_agent_spec
+
+# The prior rating of a new agent
+MU = 25.0
+SIGMA = MU / 3
+# Spread of the performance of an agent in a single game
+BETA = SIGMA / 2
+# Uncertainty added to a rating before every game, so sigma never collapses to zero
+TAU = SIGMA / 100
+# Lower bound of the factor a game shrinks an agent's variance by
+KAPPA = 0.0001
+
+
+class Rating:
+    """
+    The rating of an agent - its skill is believed to be normally distributed with mean mu and deviation sigma
+    """
+
+    def __init__(self, mu=MU, sigma=SIGMA):
+        self.mu = mu
+        self.sigma = sigma
+        self.games = 0
+
+    def conservative(self):
+        """
+        :return: A skill the agent has with high probability (mu - 3 sigma) - the ladder's order
+        """
+        return self.mu - 3 * self.sigma
+
+
+class Ladder:
+    """
+    Ratings of the agents, updated one game at a time
+    """
+
+    def __init__(self, beta=BETA, tau=TAU):
+        self.ratings = dict()
+        self.games = 0
+        self._beta = beta
+        self._tau = tau
+        # Number of games scheduled so far - rotates the seats of the scheduled games
+        self._scheduled = 0
+
+    def rating(self, agent):
+        if agent not in self.ratings:
+            self.ratings[agent] = Rating()
+        return self.ratings[agent]
+
+    def update(self, agent_types, winner_seat):
+        """
+        Updates the ratings by the result of a game: its winner ranks first and all the other seats tie second.
+        Seats of the same agent are not compared to each other, and an agent that sits in several seats gets
+        the updates of all of them
+        :param agent_types: The agent spec of each seat
+        """
+        ratings = [self.rating(agent) for agent in agent_types]
+        variances = [rating.sigma ** 2 + self._tau ** 2 for rating in ratings]
+        mu_deltas = dict.fromkeys(agent_types, 0.0)
+        variance_factors = dict.fromkeys(agent_types, 1.0)
+        for i, agent in enumerate(agent_types):
+            omega, delta = 0.0, 0.0
+            for q, opponent in enumerate(agent_types):
+                if opponent == agent:
+                    continue
+                c = math.sqrt(variances[i] + variances[q] + 2 * self._beta ** 2)
+                # Probability that seat i ranks above seat q
+                p = 1 / (1 + math.exp((ratings[q].mu - ratings[i].mu) / c))
+                score = 1.0 if i == winner_seat else 0.0 if q == winner_seat else 0.5
+                omega += variances[i] / c * (score - p)
+                delta += math.sqrt(variances[i]) / c * variances[i] / c ** 2 * p * (1 - p)
+            mu_deltas[agent] += omega
+            variance_factors[agent] *= max(1 - delta, KAPPA)
+        for agent in mu_deltas:
+            rating = self.rating(agent)
+            rating.mu += mu_deltas[agent]
+            # Games that tell nothing about an agent only add tau - a rating is never less certain than a new one
+            rating.sigma = min(math.sqrt((rating.sigma ** 2 + self._tau ** 2) * variance_factors[agent]), SIGMA)
+            rating.games += 1
+        self.games += 1
+
+    def add_result(self, result):
+        """
+        Updates the ratings by a per-game result (a dictionary tournament.play_game returns)
+        """
+        seats = 0
+        while "agent_" + str(seats) in result:
+            seats += 1
+        self.update([result["agent_" + str(seat)] for seat in range(seats)], result["winner_seat"])
+
+    def consume(self, results):
+        """
+        Updates the ratings by a stream of per-game results
+        """
+        for result in results:
+            self.add_result(result)
+        return self
+
+    def next_matchup(self, agents, seats, pending=None):
+        """
+        Picks the agents of the next game: the agent whose rating is the most uncertain, against the agents that
+        are the most evenly matched with it (by TrueSkill's match quality), weighted by their own uncertainty.
+        Games that were scheduled but have not finished yet count as if they already lowered the uncertainty.
+        The seats are rotated from one scheduled game to the next, so no agent keeps a seat's advantage.
+        :param agents: The agent specs to choose from (at least two)
+        :param seats: Number of seats of the game - agents are repeated if there are more seats than agents
+        :param pending: Dictionary of agent -> number of its scheduled games that have not finished (optional)
+        :return: The agent spec of each seat
+        """
+        pending = pending or dict()
+
+        def uncertainty(agent):
+            return self.rating(agent).sigma ** 2 / (1 + pending.get(agent, 0))
+
+        anchor = max(agents, key=uncertainty)
+        anchor_rating = self.rating(anchor)
+
+        def information(agent):
+            rating = self.rating(agent)
+            c2 = 2 * self._beta ** 2 + rating.sigma ** 2 + anchor_rating.sigma ** 2
+            quality = math.sqrt(2 * self._beta ** 2 / c2) * math.exp(-(rating.mu - anchor_rating.mu) ** 2 / (2 * c2))
+            return uncertainty(agent) * quality
+
+        others = sorted((agent for agent in agents if agent != anchor), key=information, reverse=True)
+        matchup = [anchor] + others[:seats - 1]
+        while len(matchup) < seats:
+            matchup.append(others[(len(matchup) - 1) % len(others)])
+        shift = self._scheduled % seats
+        self._scheduled += 1
+        return matchup[shift:] + matchup[:shift]
+
+    def leaderboard(self):
+        """
+        :return: Lines of the agents' ratings, from the best (by conservative rating) to the worst
+        """
+        lines = ["rank\tmu\tsigma\tmu-3sigma\tgames\tagent"]
+        ranked = sorted(self.ratings.items(), key=lambda item: item[1].conservative(), reverse=True)
+        for rank, (agent, rating) in enumerate(ranked, 1):
+            lines.append("%d\t%.2f\t%.2f\t%.2f\t\t%d\t%s" % (rank, rating.mu, rating.sigma, rating.conservative(),
+                                                              rating.games, agent))
+        return lines
+
+
+def run_ladder(agents, games_n, seed, seats=3, processes=None, ladder=None, store=None):
+    """
+    Plays games_n games over a pool of processes, choosing every game by the ladder's ratings as the results
+    stream in. Game i is seeded by (seed, i); the matchups depend on the order the games finish in.
+    :param agents: The agent specs to rate
+    :param seats: Number of seats of every game (3-6)
+    :param ladder: The Ladder to update (default: a new one)
+    :param store: A ResultsStore to append the per-game results to, in batches (optional)
+    :return: a tuple (Ladder, list of per-game results, elapsed wall time)
+    """
+    processes = processes or multiprocessing.cpu_count()
+    ladder = ladder or Ladder()
+    pending = dict.fromkeys(agents, 0)
+    done = queue.Queue()
+    results = []
+    next_game = 0
+    in_flight = 0
+    start = time.perf_counter()
+    with create_pool(processes) as pool:
+        while next_game < games_n or in_flight:
+            while next_game < games_n and in_flight < 2 * processes:
+                matchup = ladder.next_matchup(agents, seats, pending)
+                for agent in matchup:
+                    pending[agent] += 1
+                pool.apply_async(play_game, (next_game, matchup, seed),
+                                 callback=lambda result, matchup=matchup: done.put((matchup, result)),
+                                 error_callback=lambda error: done.put((None, error)))
+                next_game += 1
+                in_flight += 1
+
+            matchup, result = done.get()
+            in_flight -= 1
+            if matchup is None:
+                raise result
+            for agent in matchup:
+                pending[agent] -= 1
+            ladder.add_result(result)
+            results.append(result)
+            if store is not None and len(results) % STORE_BATCH_SIZE == 0:
+                store.append(results[-STORE_BATCH_SIZE:])
+    if store is not None and len(results) % STORE_BATCH_SIZE:
+        store.append(results[-(len(results) % STORE_BATCH_SIZE):])
+    return ladder, results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rates agent types and their variants on a ladder")
+    parser.add_argument("--agents", nargs="+",
+                        help="player types to rate, optionally with the parameters of a variant, e.g. "
+                             "p bn2 bn2:accusation_threshold=0.9 r")
+    parser.add_argument("--games", type=int, default=200, help="number of games to play")
+    parser.add_argument("--seats", type=int, default=3, help="number of seats of every game (3-6)")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="size of the process pool (default: number of cores)")
+    parser.add_argument("--seed", type=int, help="the ladder's seed (default: random)")
+    parser.add_argument("--store", metavar="DIR", help="directory of a results store to append the games to")
+    parser.add_argument("--from-store", metavar="DIR",
+                        help="rate the games of a results store (streamed one batch at a time) instead of playing")
+    args = parser.parse_args()
+
+    if args.from_store:
+        ladder = Ladder().consume(ResultsStore(args.from_store).iter_results())
+        print("Rated %d games" % ladder.games)
+        print("\n".join(ladder.leaderboard()))
+        return
+
+    if not args.agents or not 3 <= args.seats <= 6:
+        parser.error("give at least two --agents, and between 3 and 6 --seats")
+    try:
+        agents = [parse_player(agent) for agent in args.agents]
+    except ValueError as error:
+        parser.error(str(error))
+    if None in agents or len(set(agents)) < 2:
+        parser.error("give at least two different known --agents")
+    if any(parse_agent_spec(agent)[0] in (HUMAN, BN) for agent in agents):
+        parser.error("human players and the first BN player (which only plays seat 0 of 3) can't be rated")
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    print("Ladder seed:", seed)
+    store = ResultsStore(args.store) if args.store else None
+    ladder, results, elapsed = run_ladder(agents, args.games, seed, args.seats, args.processes, store=store)
+    print("Played %d games in %.2f seconds" % (len(results), elapsed))
+    print("\n".join(ladder.leaderboard()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Memory profiling of the agents, through tracemalloc. The memory an agent holds is the memory allocated inside its
+hooks that is still allocated - the game measures it around every hook call. Every N turns the profiler also
+snapshots the traced allocations, and it reports the allocation sites that grew the most over the game.
+With a memory budget, the game fails fast as soon as an agent holds more than the budget.
+"""
+import argparse
+import tracemalloc
+
+# Frames kept for every traced allocation - the allocation site and its callers
+TRACE_FRAMES = 4
+
+# Allocations of the profiling itself, left out of the snapshots
+SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                    tracemalloc.Filter(False, "<unknown>"))
+
+
+class MemoryBudgetExceeded(Exception):
+    """
+    An agent holds more memory than its budget
+    """
+
+
+class MemoryProfiler:
+    """
+    Follows the memory each seat's agent holds during a game
+    """
+
+    def __init__(self, agent_types, snapshot_every=None, budget=None):
+        """
+        :param agent_types: The type of the agent sitting at each seat
+        :param snapshot_every: Snapshot the traced allocations every this many turns (default: no snapshots)
+        :param budget: Bytes an agent may hold - more raises MemoryBudgetExceeded (default: no budget)
+        """
+        self._agent_types = agent_types
+        self._snapshot_every = snapshot_every
+        self._budget = budget
+        self.agent_memory = [0] * len(agent_types)
+        self.peak_agent_memory = [0] * len(agent_types)
+        self.turns = 0
+        # (turn, memory of every agent) at every snapshot
+        self.series = []
+        self._snapshots = []
+        self._running = False
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracing = True
+        self._running = True
+
+    def game_started(self):
+        """
+        Takes the first snapshot - once the game is set up, so the growth is the growth during the game
+        """
+        if self._snapshot_every:
+            self._snapshot()
+
+    def stop(self):
+        """
+        Takes the last snapshot, and stops tracing if the profiler started it (does nothing if already stopped)
+        """
+        if not self._running:
+            return
+        if self._snapshot_every and (not self.series or self.series[-1] != (self.turns, self.agent_memory)):
+            self._snapshot()
+        self._running = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def hook_started(self):
+        """
+        :return: The traced memory before an agent's hook is called
+        """
+        return tracemalloc.get_traced_memory()[0]
+
+    def hook_ended(self, seat, memory_before):
+        """
+        Charges the memory a hook call allocated (or freed) to its seat's agent
+        """
+        memory = self.agent_memory[seat] + tracemalloc.get_traced_memory()[0] - memory_before
+        self.agent_memory[seat] = memory
+        if memory > self.peak_agent_memory[seat]:
+            self.peak_agent_memory[seat] = memory
+            if self._budget is not None and memory > self._budget:
+                raise MemoryBudgetExceeded("Seat %d (%s) holds %.2f MB after %d turns, over its budget of %.2f MB" %
+                                           (seat, self._agent_types[seat], memory / 2 ** 20, self.turns,
+                                            self._budget / 2 ** 20))
+
+    def turn_ended(self):
+        self.turns += 1
+        if self._snapshot_every and self.turns % self._snapshot_every == 0:
+            self._snapshot()
+
+    def _snapshot(self):
+        self._snapshots.append(tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS))
+        self.series.append((self.turns, list(self.agent_memory)))
+
+    def top_growing_sites(self, limit=10):
+        """
+        :return: The limit allocation sites whose allocations grew the most between the first and the last snapshot,
+        as tracemalloc.StatisticDiff (traceback, size_diff, count_diff...)
+        """
+        if len(self._snapshots) < 2:
+            return []
+        differences = self._snapshots[-1].compare_to(self._snapshots[0], 'traceback')
+        return [difference for difference in differences if difference.size_diff > 0][:limit]
+
+    def report(self, limit=10):
+        """
+        :return: Lines of the memory of every agent at every snapshot, and of the top growing allocation sites
+        """
+        lines = ["turn\t" + "\t".join("%d:%s (KB)" % (seat, agent_type)
+                                      for seat, agent_type in enumerate(self._agent_types))]
+        for turn, memory in self.series:
+            lines.append("%d\t" % turn + "\t".join("%.1f" % (seat_memory / 1024) for seat_memory in memory))
+        lines.append("peak\t" + "\t".join("%.1f" % (seat_memory / 1024) for seat_memory in self.peak_agent_memory))
+        for difference in self.top_growing_sites(limit):
+            lines.append("+%.1f KB in %+d blocks, allocated at:" % (difference.size_diff / 1024,
+                                                                   difference.count_diff))
+            lines.extend("    " + line for line in difference.traceback.format(most_recent_first=True))
+        return lines
+
+
+def main():
+    from clue import ClueGame, parse_players
+
+    parser = argparse.ArgumentParser(description="Plays a game of a tournament and profiles the memory of its agents")
+    parser.add_argument("--players", required=True, help="player types separated by comma, e.g. p,bn2,r")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the tournament")
+    parser.add_argument("--game", type=int, default=0, help="index of the game in the tournament")
+    parser.add_argument("--every", type=int, default=10, help="snapshot the allocations every this many turns")
+    parser.add_argument("--top", type=int, default=10, help="number of growing allocation sites to report")
+    parser.add_argument("--budget", type=float, metavar="MB", help="fail as soon as an agent holds more than this")
+    args = parser.parse_args()
+
+    agent_types = parse_players(args.players)
+    profiler = MemoryProfiler(agent_types, args.every, args.budget * 2 ** 20 if args.budget else None)
+    try:
+        game = ClueGame(agent_types, turn_delay=0, seed=(args.seed, args.game), memory_profiler=profiler)
+        winner, rounds = game.run()
+        print("Game won by", winner.get_character(), "after", rounds, "rounds")
+    except MemoryBudgetExceeded as error:
+        print(error)
+    finally:
+        profiler.stop()
+        print("\n".join(profiler.report(args.top)))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,45 +5,182 @@ from proposition_layer import PropositionLayer
 from plan_graph_level import PlanGraphLevel
 from pgparser import PgParser
 from action import Action
+from proposition import Proposition
 
 from search import SearchProblem
 from search import a_star_search
 
 
 class PlanningProblem:
-    def __init__(self, domain_file, problem_file):
+    def __init__(self, domain_file, problem_file, config=util.DEFAULT_BOARD):
         """
-        Constructor
+        Constructor - parses the problem from a domain file and a problem file
+        :param config: The BoardConfig of the board the plan is for
         """
         p = PgParser(domain_file, problem_file)
-        self.actions, self.propositions = p.parse_actions_and_propositions()
-        # list of all the actions and list of all the propositions
-
+        actions, propositions = p.parse_actions_and_propositions()
         initial_state, goal = p.parse_problem()
+        self._set_up(actions, propositions, initial_state, goal, config)
+
+    @classmethod
+    def from_spec(cls, propositions, actions, initial_state, goal, config=util.DEFAULT_BOARD):
+        """
+        Builds the problem in memory, without domain and problem files. The problem is the same one PgParser
+        would parse from the files the spec describes (see dump)
+        :param propositions: The names of the propositions
+        :param actions: The actions, as tuples (name, precondition names, add names, delete names)
+        :param initial_state: The names of the propositions of the initial state
+        :param goal: The names of the goal propositions
+        :param config: The BoardConfig of the board the plan is for
+        """
+        by_name = dict()
+        for name in propositions:
+            by_name.setdefault(name, Proposition(name))
+        all_propositions = [by_name[name] for name in propositions]
+        # The parser keeps the propositions of an action in the order of the domain's propositions
+        order = {name: i for i, name in enumerate(propositions)}
+
+        def in_domain_order(names):
+            return [all_propositions[i] for i in sorted({order[name] for name in names if name in order})]
+
+        all_actions = []
+        for name, pre, add, delete in actions:
+            action = Action(name, in_domain_order(pre), in_domain_order(add), in_domain_order(delete))
+            for proposition_name in add:
+                by_name[proposition_name].add_producer(action)
+            all_actions.append(action)
+
+        problem = cls.__new__(cls)
+        problem._set_up(all_actions, all_propositions,
+                        [by_name.get(name) or Proposition(name) for name in initial_state],
+                        [by_name.get(name) or Proposition(name) for name in goal], config)
+        return problem
+
+    def _set_up(self, actions, propositions, initial_state, goal, config):
+        self.config = config
+        # list of all the actions and list of all the propositions
+        self.actions, self.propositions = actions, propositions
         # the initial state and the goal state are lists of propositions
         self.initialState = frozenset(initial_state)
         self.goal = frozenset(goal)
         for g in goal:
             if "found" not in g.name:
-                self.goal_loc = util.LOCATIONS_OF_ROOMS[util.Room[g.name]]
+                self.goal_loc = config.locations_of_rooms[util.Room[g.name]]
                 break
         self.create_noops()
         # creates noOps that are used to propagate existing propositions from one layer to the next
 
+        # The search's states are bit masks of propositions - every proposition gets a bit of its own
+        self.proposition_bits = dict()
+        for proposition in self.propositions:
+            self.proposition_bits.setdefault(proposition, 1 << len(self.proposition_bits))
+        self._initial_mask = self.mask_of(self.initialState)
+        self.goal_mask = self.mask_of(self.goal)
+        # (index, precondition mask, add mask, delete mask, action) of every action but the noOps
+        self._transitions = [(index, self.mask_of(act.get_pre()), self.mask_of(act.get_add()),
+                              self.mask_of(act.get_delete()), act)
+                             for index, act in enumerate(act for act in self.actions if not act.is_noop())]
+        self._create_watch_lists()
+        # Every question finds a single card (a _player proposition), and the murder action adds all the _murder
+        # propositions (see min_actions_to_goal)
+        self.player_mask = self.mask_of(p for p in self.propositions if p.name.endswith("_player"))
+        self.murder_mask = self.mask_of(p for p in self.propositions if p.name.endswith("_murder"))
+
         PlanGraphLevel.set_actions(self.actions)
         PlanGraphLevel.set_props(self.propositions)
         self.expanded = 0
 
+    def _create_watch_lists(self):
+        """
+        Indexes the transitions by their preconditions. The transitions that share their preconditions are grouped,
+        and every group is watched by one of its preconditions, the one the fewest groups need, so a state only checks
+        the groups whose watching proposition it holds. The groups that have no preconditions are always checked
+        """
+        groups = dict()
+        for transition in self._transitions:
+            groups.setdefault(transition[1], []).append(transition)
+        needed_by = util.Counter()
+        for pre in groups:
+            for bit in self._bits_of(pre):
+                needed_by[bit] += 1
+        watch_lists = dict()
+        self._unconditional = []
+        for pre, transitions in groups.items():
+            bits = self._bits_of(pre)
+            if bits:
+                watch_lists.setdefault(min(bits, key=lambda bit: needed_by[bit]), []).append((pre, transitions))
+            else:
+                self._unconditional.extend(transitions)
+        # (watching proposition bit, (preconditions, transitions) of the groups it watches)
+        self._watch_lists = list(watch_lists.items())
+
+    @staticmethod
+    def _bits_of(mask):
+        """
+        :return: The single bit masks a mask is made of, from the lowest
+        """
+        bits = []
+        while mask:
+            bit = mask & -mask
+            bits.append(bit)
+            mask ^= bit
+        return bits
+
+    def mask_of(self, propositions):
+        """
+        :return: The bit mask of the propositions - propositions that are not in the domain get bits of their own
+        """
+        mask = 0
+        for proposition in propositions:
+            if proposition not in self.proposition_bits:
+                self.proposition_bits[proposition] = 1 << len(self.proposition_bits)
+            mask |= self.proposition_bits[proposition]
+        return mask
+
+    def min_actions_to_goal(self, state):
+        """
+        Every question finds a single card, so every card that isn't found yet needs a question of its own, and
+        then the murder action and foundAll are still to take
+        :param state: A bit mask of propositions
+        :return: A lower bound of the number of actions from the state to the goal
+        """
+        return bin(self.player_mask & ~state).count("1") + (self.murder_mask & ~state != 0) + \
+            (self.goal_mask & ~state != 0)
+
+    def propositions_of(self, state):
+        """
+        :return: The propositions of a state (a bit mask), as a frozenset
+        """
+        return frozenset(proposition for proposition, bit in self.proposition_bits.items() if state & bit)
+
+    def dump(self, domain_file, problem_file):
+        """
+        Writes the problem to a domain file and a problem file, in the format PgParser parses (for debugging)
+        """
+        with open(domain_file, 'w') as domain:
+            domain.write("Propositions: \n")
+            domain.write("".join(proposition.name + " " for proposition in self.propositions))
+            domain.write("\nActions: \n")
+            for action in self.actions:
+                if not action.is_noop():
+                    domain.write("Name: %s\npre: %s\nadd: %s\ndelete: %s\n" %
+                                 (action.name, " ".join(p.name for p in action.pre),
+                                  " ".join(p.name for p in action.add), " ".join(p.name for p in action.delete)))
+        with open(problem_file, 'w') as problem:
+            problem.write("Initial state: " + "".join(p.name + " " for p in self.initialState))
+            problem.write("\nGoal state: " + " ".join(p.name for p in self.goal))
+
     def get_start_state(self):
-        "*** YOUR CODE HERE ***"
-        return self.initialState
+        """
+        :return: The initial state, as a bit mask of its propositions
+        """
+        return self._initial_mask
 
     def is_goal_state(self, state):
         """
-        Hint: you might want to take a look at goal_state_not_in_prop_payer function
+        :param state: A bit mask of propositions
         """
-        "*** YOUR CODE HERE ***"
-        return not self.goal_state_not_in_prop_layer(state)
+        return self.goal_mask & ~state == 0
 
     def get_successors(self, state):
         """
@@ -56,17 +193,20 @@ class PlanningProblem:
         For a list / set of propositions l and action a,
         a.all_preconds_in_list(l) returns true if the preconditions of a are in l
 
-        Note that a state *must* be hashable!! Therefore, you might want to represent a state as a frozenset
+        A state is a bit mask of its propositions (see proposition_bits), so an action applies if its
+        preconditions are all set, and its successor is the state with its add list set and its delete list cleared.
+        Only the actions watched by a proposition of the state are checked (see _create_watch_lists), and the
+        successors keep the order of the actions
         """
         self.expanded += 1
-        "*** YOUR CODE HERE ***"
-        all_successors = []
-        for act in self.actions:
-            if act.all_preconds_in_list(state) and not act.is_noop():
-                successor = set(act.get_add()).union(set(state))
-                successor = frozenset(successor.difference(act.get_delete()))
-                all_successors.append((successor, act, 1))
-        return all_successors
+        applicable = list(self._unconditional)
+        for bit, groups in self._watch_lists:
+            if state & bit:
+                for pre, transitions in groups:
+                    if pre & ~state == 0:
+                        applicable.extend(transitions)
+        applicable.sort()
+        return [((state | add) & ~delete, act, 1) for index, pre, add, delete, act in applicable]
 
     @staticmethod
     def get_cost_of_actions(actions):
@@ -110,7 +250,7 @@ def max_level(state, planning_problem):
     """
     "*** YOUR CODE HERE ***"
     prop_layer_init = PropositionLayer()  # create a new proposition layer
-    for prop in state:
+    for prop in planning_problem.propositions_of(state):
         prop_layer_init.add_proposition(prop)
     graph_layer = PlanGraphLevel()
     graph_layer.set_proposition_layer(prop_layer_init)
@@ -119,7 +259,7 @@ def max_level(state, planning_problem):
     lvl_number = 0
     while True:
         # check if reached goal
-        if planning_problem.is_goal_state(graph[-1].get_proposition_layer().get_propositions()):
+        if not planning_problem.goal_state_not_in_prop_layer(graph[-1].get_proposition_layer().get_propositions()):
             return lvl_number
         # check if we are stuck
         if is_fixed(graph, lvl_number):
@@ -138,7 +278,7 @@ def level_sum(state, planning_problem):
     """
     "*** YOUR CODE HERE ***"
     prop_layer_init = PropositionLayer()  # create a new proposition layer
-    for prop in state:
+    for prop in planning_problem.propositions_of(state):
         prop_layer_init.add_proposition(prop)
     graph_layer = PlanGraphLevel()
     graph_layer.set_proposition_layer(prop_layer_init)
@@ -180,17 +320,25 @@ def null_heuristic(*args, **kwargs):
     return 0
 
 
+def question_count_heuristic(asked_before, this_question, state, current_location, problem):
+    """
+    An admissible heuristic of the question plans - the problem's lower bound of the actions left to the goal
+    """
+    return problem.min_actions_to_goal(state)
+
+
 def repetition_heuristic(asked_before, this_question, state, current_location,
                          problem):
     if not this_question:
         return 0
 
+    config = problem.config
     if len(current_location) != 2:
-        current_location = util.LOCATIONS_OF_ROOMS[util.Room[current_location]]
-    succ_loc = util.LOCATIONS_OF_ROOMS[util.Room[this_question[2]]]
+        current_location = config.locations_of_rooms[util.Room[current_location]]
+    succ_loc = config.locations_of_rooms[util.Room[this_question[2]]]
 
-    cost = util.manhattan_distance_with_block(problem.goal_loc, succ_loc) + \
-           util.manhattan_distance_with_block(current_location, succ_loc)
+    cost = util.manhattan_distance_with_block(problem.goal_loc, succ_loc, config) + \
+           util.manhattan_distance_with_block(current_location, succ_loc, config)
 
     for q in asked_before:
         if q in this_question:
@@ -198,3 +346,48 @@ def repetition_heuristic(asked_before, this_question, state, current_location,
         else:
             cost += 5 * asked_before[q]
     return cost
+
+
+
+def random_problem(known_n, seed):
+    """
+    Sets up a planning player that knows known_n random cards (at least one card of every kind stays unknown) and
+    has guessed a murder triplate - for benchmarking and testing the search
+    :param seed: Seed of the random generators, as the seed of a game (see util.create_game_rngs)
+    :return: The player's PlanningProblem
+    """
+    # The planning player builds its problems from this module
+    from player import PlanningPlayer
+
+    rng, _ = util.create_game_rngs(seed)
+    character = util.CHARACTERS[0]
+    planning_player = PlanningPlayer(character, util.DEFAULT_BOARD.open_loc[character], rng)
+    kinds = (util.CHARACTERS, util.WEAPONS, util.DEFAULT_BOARD.rooms)
+    murder = [rng.choice(cards) for cards in kinds]
+    for card in rng.sample([card for cards in kinds for card in cards if card not in murder], known_n):
+        planning_player.add_card(card)
+    planning_player.choose_suspected_triplate()
+    return planning_player.create_planning_problem()
+
+
+def costs_to_goal(problem):
+    """
+    :return: Dictionary of every state reachable from the problem's start state -> the number of actions of the
+    shortest plan from it to the goal (the states the goal can't be reached from are left out)
+    """
+    predecessors = {problem.get_start_state(): []}
+    states = list(predecessors)
+    for state in states:
+        for successor, _, _ in problem.get_successors(state):
+            if successor not in predecessors:
+                predecessors[successor] = []
+                states.append(successor)
+            predecessors[successor].append(state)
+    costs = {state: 0 for state in predecessors if problem.is_goal_state(state)}
+    states = list(costs)
+    for state in states:
+        for predecessor in predecessors[state]:
+            if predecessor not in costs:
+                costs[predecessor] = costs[state] + 1
+                states.append(predecessor)
+    return costs
@@ -1,10 +1,12 @@
 from util import *
+from events import NO_EVENTS, SuggestionChosen, PlanningStarted, SuspectsExhausted
 from planning_problem import *
 from search import a_star_search
+from collections import OrderedDict
 from itertools import product
 import os
-
-RANDOM_PRINTS = False
+import time
+import numpy as np
 
 
 class Player:
@@ -12,11 +14,24 @@ class Player:
     Abstract class of a player in Clue game. Each sub class is a player type
     """
 
-    def __init__(self, character, start_location):
+    def __init__(self, character, start_location, rng=None, config=DEFAULT_BOARD):
+        """
+        :param character: The character the player plays
+        :param start_location: Where the player starts
+        :param rng: The random.Random the player draws its random choices from (the game's generator)
+        :param config: The BoardConfig of the game's board
+        """
         self._character = character
         self._last_suggestion = None
         self._cards = set()
         self._location = start_location
+        self._rng = rng if rng is not None else random.Random()
+        self._events = NO_EVENTS
+        self._config = config
+        # Work counters of the agent, reported with the game's results - every agent type adds its own
+        self._stats = dict()
+        # The time (by time.perf_counter) the current hook must return by - None: no deadline
+        self._deadline = None
 
     def set_location(self, loc):
         self._location = loc
@@ -27,6 +42,37 @@ class Player:
     def get_character(self):
         return self._character
 
+    def get_stats(self):
+        """
+        Returns the agent's work counters - a dictionary of counter name -> count
+        """
+        return dict(self._stats)
+
+    def set_deadline(self, deadline):
+        """
+        Sets the time (by time.perf_counter) the agent must return from its next hook by. Anytime agents
+        return the best answer they have found once the deadline passes
+        """
+        self._deadline = deadline
+
+    def out_of_time(self):
+        """
+        Returns True iff the deadline of the current hook has passed
+        """
+        return self._deadline is not None and time.perf_counter() >= self._deadline
+
+    def set_event_bus(self, events):
+        """
+        Sets the EventBus the player publishes its events to (the game's bus)
+        """
+        self._events = events
+
+    def set_last_suggestion(self, suggestion):
+        """
+        Sets the suggestion the player is answered on - used when a recorded game is replayed to the player
+        """
+        self._last_suggestion = suggestion
+
     def add_card(self, card):
         """
         Add a card to the player's hand
@@ -85,36 +131,32 @@ class Player:
 
 
 class RandomPlayer(Player):
-    def __init__(self, character, start_location):
-        super(RandomPlayer, self).__init__(character, start_location)
+    def __init__(self, character, start_location, rng=None, config=DEFAULT_BOARD):
+        super(RandomPlayer, self).__init__(character, start_location, rng, config)
         self._suspected_characters = set(CHARACTERS)
         self._suspected_weapons = set(WEAPONS)
-        self._suspected_rooms = set(ROOMS)
+        self._suspected_rooms = set(config.rooms)
         self._accusation = None
 
     def make_move_suggestion(self, possible_locations):
         relevant_room_locations = set()
-        for loc in possible_locations:
-            if loc in ROOMS_LOC:
-                if ROOMS_LOC[loc] in self._suspected_rooms:
-                    relevant_room_locations.add(loc)
+        for loc, room in self._config.rooms_loc.items():
+            if room in self._suspected_rooms and loc in possible_locations:
+                relevant_room_locations.add(loc)
         if not relevant_room_locations:
             # Then walk randomly
-            self._location = random.choice(possible_locations)
+            self._location = self._rng.choice(possible_locations)
             return self._location, None
         else:
             move = relevant_room_locations.pop()
 
-            suggested_weapon = random.choice(tuple(self._suspected_weapons))
+            suggested_weapon = self._rng.choice(tuple(self._suspected_weapons))
 
-            suggested_character = random.choice(tuple(self._suspected_characters))
+            suggested_character = self._rng.choice(tuple(self._suspected_characters))
 
-            suggested_room = ROOMS_LOC[move]
-            if RANDOM_PRINTS:
-                print("Suggested character:", suggested_character)
-                print("Suggested weapon:", suggested_weapon)
-                print("Suggested room:", suggested_room)
+            suggested_room = self._config.rooms_loc[move]
             self._last_suggestion = (suggested_character, suggested_weapon, suggested_room)
+            self._events.publish(SuggestionChosen, self._character, self._last_suggestion)
             self._location = move
             return move, (suggested_character, suggested_weapon, suggested_room)
 
@@ -130,7 +172,7 @@ class RandomPlayer(Player):
 
         # Sanity check:
         if not self._suspected_characters or not self._suspected_weapons or not self._suspected_rooms:
-            print("Player", self._character, "Of type", type(self).__name__, "has empty suspects set")
+            self._events.publish(SuspectsExhausted, self._character, type(self).__name__)
 
     def add_card(self, card):
         self._cards.add(card)
@@ -146,15 +188,15 @@ class RandomPlayer(Player):
 
 
 class HumanPlayer(Player):
-    def __init__(self, character, start_location):
-        super(HumanPlayer, self).__init__(character, start_location)
+    def __init__(self, character, start_location, rng=None, config=DEFAULT_BOARD):
+        super(HumanPlayer, self).__init__(character, start_location, rng, config)
         self._suspected_characters = set(CHARACTERS)
         self._suspected_weapons = set(WEAPONS)
-        self._suspected_rooms = set(ROOMS)
+        self._suspected_rooms = set(config.rooms)
         self.can_accuse = False
 
     def see_card(self, responders, card=None):
-        if card:
+        if card is not None:
             print("And showed us ", card)
         if not responders:
             print("not responder")
@@ -213,12 +255,12 @@ class HumanPlayer(Player):
         print("Your suspected rooms are: ", self._suspected_rooms)
 
         for loc in possible_locations:
-            if loc in ROOMS_LOC:
+            if loc in self._config.rooms_loc:
                 relevant_room_locations.add(loc)
 
         print("You can choose a room from the list, by typing the index beside it \n"
               "You can choose a location by typing the index beside it ")
-        print("Relevant Rooms:", [ROOMS_LOC[loc] for loc in relevant_room_locations])
+        print("Relevant Rooms:", [self._config.rooms_loc[loc] for loc in relevant_room_locations])
         while True:
             room_or_locations = input("Type 0 to choose from the possible locations; 1 - from room: ")
             if not room_or_locations.isdigit() or room_or_locations not in ['0', '1']:
@@ -234,8 +276,9 @@ class HumanPlayer(Player):
                 self._location = new_location
                 return new_location, None
             else:
-                if LOCATIONS_OF_ROOMS[ROOMS[chosen_location - 1]] in relevant_room_locations:
-                    new_location = ROOMS[chosen_location - 1]
+                rooms = self._config.rooms
+                if self._config.locations_of_rooms[rooms[chosen_location - 1]] in relevant_room_locations:
+                    new_location = rooms[chosen_location - 1]
                     break
                 else:
                     print("You can only choose a room you can reach!")
@@ -243,20 +286,62 @@ class HumanPlayer(Player):
         self._location = new_location
         # we are in a room
         suggestion = self.make_suggestion(new_location)
-        return LOCATIONS_OF_ROOMS[new_location], suggestion
+        return self._config.locations_of_rooms[new_location], suggestion
 
     def make_accusation(self):
         # option for same as the suggestion
         # choose if you don't want to accuse
         if self.can_accuse:
             print("You can now accuse")
-            print(ROOMS)
+            print(self._config.rooms)
             acc_loc = int(input("Type the index of the suspected location:  "))
-            acc_location = ROOMS[acc_loc - 1]
+            acc_location = self._config.rooms[acc_loc - 1]
             return self.make_suggestion(acc_location)
         return None
 
 
+class PlanCache:
+    """
+    Least recently used cache of complete plans, by the signature of their planning problem
+    """
+
+    def __init__(self, size=PLAN_CACHE_SIZE):
+        self._plans = OrderedDict()
+        self._size = size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, signature):
+        """
+        :return: The plan of the signature, or None if it is not cached
+        """
+        plan = self._plans.get(signature)
+        if plan is None:
+            self.misses += 1
+            return None
+        self._plans.move_to_end(signature)
+        self.hits += 1
+        return plan
+
+    def put(self, signature, plan):
+        self._plans[signature] = plan
+        self._plans.move_to_end(signature)
+        if len(self._plans) > self._size:
+            self._plans.popitem(last=False)
+
+    def clear(self):
+        self._plans.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._plans)
+
+
+# The plans of all the planning players of the process - the same problems come up in many games
+PLAN_CACHE = PlanCache()
+
+
 class PlanningPlayer(Player):
     """
     Online Planning Player. Makes a plan according to a guess of who the murder
@@ -267,14 +352,26 @@ class PlanningPlayer(Player):
     3. Aquired definite information from other player's questions.
     """
 
-    def __init__(self, character, start_location):
-        super().__init__(character, start_location)
-        import time
+    def __init__(self, character, start_location, rng=None, config=DEFAULT_BOARD, plan_dump_dir=None,
+                 plan_repair=True, plan_heuristic=True):
+        """
+        :param plan_dump_dir: Directory to write every plan's domain and problem files to, for debugging (optional)
+        :param plan_repair: Repair the plan when the deductions change, and search a new plan only if the repair
+        fails (otherwise every change searches a new plan)
+        :param plan_heuristic: Guide the plan search with question_count_heuristic (otherwise the search is
+        uniform-cost)
+        """
+        super().__init__(character, start_location, rng, config)
         self.game_number = time.time()
+        self._plan_dump_dir = plan_dump_dir
+        self._plan_repair = plan_repair
+        self._plan_heuristic = question_count_heuristic if plan_heuristic else null_heuristic
+        self._stats.update({"replans": 0, "plan_cache_hits": 0, "plan_repairs": 0, "replan_time": 0.0,
+                            "repair_time": 0.0})
 
         self._unknown_weapons = list(WEAPONS)
         self._unknown_characters = list(CHARACTERS)
-        self._unknown_rooms = list(ROOMS)
+        self._unknown_rooms = list(config.rooms)
 
         self._my_weapons = []
         self._my_characters = []
@@ -298,24 +395,28 @@ class PlanningPlayer(Player):
         self._suspected_triplate = None
         self._expect_to_find_in_question = ""
         self._need_to_create_plan = True
+        # True iff the search of the plan ran out of time, and the plan is only its beginning
+        self._plan_is_partial = False
+        # The suspected triplate the plan was made (or repaired) for
+        self._planned_triplate = None
 
     def make_move_suggestion(self, possible_locations):
         # We start by making a plan if we do not already have one
         if self._suspected_triplate is None:
             # Must be first round of the game
-            murder_room = random.choice(self._unknown_rooms)
-            murder_weapon = random.choice(self._unknown_weapons)
-            murder_character = random.choice(self._unknown_characters)
-            self._suspected_triplate = (
-                murder_character, murder_weapon, murder_room)
+            self.choose_suspected_triplate()
+            self.create_plan()
+        elif self._plan_is_partial and not self._plan:
+            # The beginning of the plan was followed - plan the rest
             self.create_plan()
 
         # print(self._character, " believes in ", self._suspected_triplate)
 
+        locations_of_rooms = self._config.locations_of_rooms
         # Choose the first question in the plan we can ask
         for question in self._plan:
-            if LOCATIONS_OF_ROOMS[question[2]] in possible_locations:
-                self._location = LOCATIONS_OF_ROOMS[question[2]]
+            if locations_of_rooms[question[2]] in possible_locations:
+                self._location = locations_of_rooms[question[2]]
                 self._last_suggestion = (question[0], question[1], question[2])
                 self._expect_to_find_in_question = question[3]
                 self._plan.remove(question)
@@ -323,13 +424,13 @@ class PlanningPlayer(Player):
 
         # We have found no suitable question with a close room, see if any of my_rooms are close
         for room in self._my_rooms:
-            if LOCATIONS_OF_ROOMS[room] in possible_locations:
+            if locations_of_rooms[room] in possible_locations:
                 # Now lets find a question that does not expect the room as an answer
                 for question in self._plan:
                     if question[3] not in ROOMS and (question[3] in CHARACTERS
                                                      or question[3] in WEAPONS):
                         # print("Had to use one of my own rooms ", room)
-                        self._location = LOCATIONS_OF_ROOMS[room]
+                        self._location = locations_of_rooms[room]
                         self._last_suggestion = (
                             question[0], question[1], room)
                         self._expect_to_find_in_question = question[3]
@@ -337,35 +438,33 @@ class PlanningPlayer(Player):
                         return self._location, self._last_suggestion
 
         # Find the question that is closest to us and move in it's direction
-        min_distance = 1000
         min_question = self._suspected_triplate
-        for question in self._plan:
-            distance = manhattan_distance_with_block(self._location, LOCATIONS_OF_ROOMS[question[2]])
-            if distance < min_distance:
-                min_distance = distance
-                min_question = question
+        if self._plan:
+            distances = distances_from(self._location, [locations_of_rooms[question[2]] for question in self._plan],
+                                       self._config)
+            min_question = self._plan[int(np.argmin(distances))]
 
         # Find the location which will make me closest to the closest question
-        min_distance = 1000
-        min_location = None
-        for location in possible_locations:
-            distance = manhattan_distance_with_block(location, LOCATIONS_OF_ROOMS[min_question[2]])
-            if distance < min_distance:
-                min_distance = distance
-                min_location = location
+        min_location = closest_location(locations_of_rooms[min_question[2]], possible_locations, self._config)
         self._location = min_location
         return min_location, None
 
+    def choose_suspected_triplate(self):
+        """
+        Guesses a murder triplate out of the unknown cards
+        """
+        murder_room = self._rng.choice(self._unknown_rooms)
+        murder_weapon = self._rng.choice(self._unknown_weapons)
+        murder_character = self._rng.choice(self._unknown_characters)
+        self._suspected_triplate = (
+            murder_character, murder_weapon, murder_room)
+
     def update_on_other_player_suggestion(self, suggestion, was_showed, responders):
         modified_suggestion = list(suggestion)
 
         if self._suspected_triplate is None:
             # Must be first round of the game
-            murder_room = random.choice(self._unknown_rooms)
-            murder_weapon = random.choice(self._unknown_weapons)
-            murder_character = random.choice(self._unknown_characters)
-            self._suspected_triplate = (
-                murder_character, murder_weapon, murder_room)
+            self.choose_suspected_triplate()
 
         if was_showed:
             player_who_answered = responders[-1]
@@ -470,6 +569,9 @@ class PlanningPlayer(Player):
 
     def see_card(self, responders, card=None):
         need_to_rebuild_plan = False
+        if self._suspected_triplate is None:
+            # Only happens when a recorded game is replayed to us
+            self.choose_suspected_triplate()
         if responders is None:
             # print("Planning player ", self.get_character(),
             #       " has been shown no card after asking ")
@@ -490,7 +592,7 @@ class PlanningPlayer(Player):
                 self._unknown_rooms.append(self._last_suggestion[2])
                 self._suspected_triplate = (self._suspected_triplate[0], self._suspected_triplate[1],
                                             self._last_suggestion[2])
-            self.create_plan()
+            self.replan()
             # Currently not updating the dictionaries, need to figure out how, or if
             return
         responder = responders[-1]
@@ -580,11 +682,11 @@ class PlanningPlayer(Player):
                         murder_weapon = self._suspected_triplate[1]
                         murder_character = self._suspected_triplate[0]
                         if card == murder_character:
-                            murder_character = random.choice(self._unknown_characters)
+                            murder_character = self._rng.choice(self._unknown_characters)
                         elif card == murder_weapon:
-                            murder_weapon = random.choice(self._unknown_weapons)
+                            murder_weapon = self._rng.choice(self._unknown_weapons)
                         else:
-                            murder_room = random.choice(self._unknown_rooms)
+                            murder_room = self._rng.choice(self._unknown_rooms)
 
                         self._suspected_triplate = (murder_character, murder_weapon,
                                                     murder_room)
@@ -592,17 +694,17 @@ class PlanningPlayer(Player):
             need_to_fix = new_dict
 
         if need_to_rebuild_plan:
-            self.create_plan()
+            self.replan()
 
     def add_card(self, card):
         self._cards.add(card)
-        if card in WEAPONS:
+        if is_weapon(card):
             self._unknown_weapons.remove(card)
             self._my_weapons.append(card)
-        if card in CHARACTERS:
+        if is_character(card):
             self._unknown_characters.remove(card)
             self._my_characters.append(card)
-        if card in ROOMS:
+        if is_room(card):
             self._unknown_rooms.remove(card)
             self._my_rooms.append(card)
 
@@ -610,52 +712,87 @@ class PlanningPlayer(Player):
         if len(self._unknown_rooms) == 1 and len(self._unknown_characters) == 1 and len(self._unknown_weapons) == 1:
             return self._unknown_characters[0], self._unknown_weapons[0], self._unknown_rooms[0]
 
+    def replan(self):
+        """
+        Rebuilds the plan after the deductions changed - repairs the current plan if it can, and searches a new
+        plan otherwise
+        """
+        start = time.perf_counter()
+        if self._plan_repair and self.repair_plan():
+            self._stats["plan_repairs"] += 1
+            self._stats["repair_time"] += time.perf_counter() - start
+        else:
+            self.create_plan()
+
+    def repair_plan(self):
+        """
+        Fits the rest of the plan to the current unknown cards and suspected triplate: the questions that would
+        find a card that is known by now (or is suspected now) are dropped, and a suspected card that was shown
+        is swapped for the new suspected card of its kind. The repaired plan is checked like the search would:
+        every question must still be about unknown cards only, every unknown card that is not suspected must
+        still be found, and the suspected triplate must be asked once. Every question finds one card, so a
+        repaired plan is as short as a searched one.
+        :return: True if the plan was repaired, False if it must be searched (there is no plan yet, only the
+        beginning of one, or a repair that fails the check)
+        """
+        if self._need_to_create_plan or self._plan_is_partial:
+            return False
+        triplate = self._suspected_triplate
+        # The unknown cards that are not suspected, which the plan must find
+        to_find = set(self._unknown_characters + self._unknown_weapons + self._unknown_rooms) - set(triplate)
+        plan = []
+        for question in self._plan:
+            if not question[3]:
+                plan.append(triplate + ("",))
+                continue
+            found = CARDS_BY_NAME[question[3]]
+            if found not in to_find:
+                continue
+            fixed = []
+            for kind, card in enumerate(question[:3]):
+                if card in to_find or card == triplate[kind]:
+                    fixed.append(card)
+                elif card == self._planned_triplate[kind]:
+                    # The suspected card that was swapped
+                    fixed.append(triplate[kind])
+                else:
+                    return False
+            plan.append(tuple(fixed) + (question[3],))
+            to_find.remove(found)
+        if to_find or sum(1 for question in plan if not question[3]) != 1:
+            return False
+        self._plan = plan
+        self._planned_triplate = triplate
+        return True
+
     def create_plan(self):
-        print("Planning player", self.get_character(), "certainly is planning something...")
+        start = time.perf_counter()
+        self._events.publish(PlanningStarted, self.get_character())
+        self._stats["replans"] += 1
+        self._need_to_create_plan = False
+        self._planned_triplate = self._suspected_triplate
 
         murder_room = self._suspected_triplate[2]
         murder_weapon = self._suspected_triplate[1]
         murder_character = self._suspected_triplate[0]
 
-        # Creating the plan
-
-        propositions = self.create_propositions()
-
-        actions = set(self.create_actions())
-
-        domain_file_name = str(self.game_number) + murder_character.name + "_" + murder_weapon.name \
-                           + "_" + murder_room.name + "_" + self._character.name + "_domain.txt"
-        domain_file = open(domain_file_name, 'w')
-        domain_file.write("Propositions: \n")
-        for proposition in propositions:
-            domain_file.write(proposition + " ")
-
-        domain_file.write("\nActions: \n")
-
-        for action in actions:
-            domain_file.write(action + "\n")
-
-        domain_file.close()
-
-        problem_file_name = str(self.game_number) + murder_character.name + "_" + \
-                            murder_weapon.name + "_" + murder_room.name + "_" + self._character.name + "_problem.txt"
-
-        problem_file = open(problem_file_name, 'w')
-
-        problem_file.write("Initial state: ")
-        for room in self._unknown_rooms:
-            problem_file.write(room.name + "_unknown ")
-        for character in self._unknown_characters:
-            problem_file.write(character.name + "_unknown ")
-        for weapon in self._unknown_weapons:
-            problem_file.write(weapon.name + "_unknown ")
-
-        problem_file.write("\nGoal state: found_character found_room found_weapon " + self._suspected_triplate[2].name)
-        problem_file.close()
+        signature = self.plan_signature()
+        plan = PLAN_CACHE.get(signature)
+        if plan is not None:
+            self._stats["plan_cache_hits"] += 1
+            self._plan = self.plan_from_signature_plan(plan)
+            self._plan_is_partial = False
+            self._stats["replan_time"] += time.perf_counter() - start
+            return
 
-        # As search problem
-        plan_problem = PlanningProblem(domain_file_name, problem_file_name)
-        written_plan = a_star_search(plan_problem, null_heuristic, self._location)
+        # Creating the plan
+        plan_problem = self.create_planning_problem()
+        if self._plan_dump_dir is not None:
+            file_name = os.path.join(self._plan_dump_dir, "%s_%s_%s_%s_%s_%d" % (
+                self.game_number, murder_character.name, murder_weapon.name, murder_room.name, self._character.name,
+                self._stats["replans"]))
+            plan_problem.dump(file_name + "_domain.txt", file_name + "_problem.txt")
+        written_plan = a_star_search(plan_problem, self._plan_heuristic, self._location, self._deadline)
 
         # print("Planning player ", self.get_character(), "plan found is: ")
         # for action in written_plan:
@@ -663,11 +800,9 @@ class PlanningPlayer(Player):
         # print(plan_problem.expanded)
         # print()
 
-        # Delete the files now that we have a plan
-        os.remove(domain_file_name)
-        os.remove(problem_file_name)
-
         self._plan = []
+        # A complete plan ends by finding the murder triplate
+        self._plan_is_partial = not any("foundAll" in action.name for action in written_plan)
 
         for action in written_plan:
             if "foundAll" not in action.name:
@@ -677,6 +812,59 @@ class PlanningPlayer(Player):
                 self._plan.append((Character[action_character],
                                    Weapon[action_weapon],
                                    Room[action_room], found))
+        # A partial plan depends on how far the search got before its deadline
+        if not self._plan_is_partial:
+            PLAN_CACHE.put(signature, self.plan_to_signature_plan(self._plan))
+        self._stats["replan_time"] += time.perf_counter() - start
+
+    def create_planning_problem(self):
+        """
+        :return: The PlanningProblem of finding the unknown cards, assuming the suspected triplate is the murder
+        """
+        propositions = self.create_propositions()
+
+        actions = self.create_actions()
+
+        initial_state = [card.name + "_unknown" for card in self._unknown_rooms + self._unknown_characters
+                         + self._unknown_weapons]
+        goal = ["found_character", "found_room", "found_weapon", self._suspected_triplate[2].name]
+
+        # As search problem
+        return PlanningProblem.from_spec(propositions, actions, initial_state, goal, self._config)
+
+    def plan_signature(self):
+        """
+        The canonical signature of the planning problem. The problem is built from the unknown cards in the
+        order of their lists, and neither the search nor its heuristic looks at the cards themselves, so
+        problems with as many unknown cards of each kind and the suspected triplate at the same positions
+        have the same plan, up to renaming the cards
+        :return: (heuristic of the search, number of unknown characters, weapons and rooms, positions of the
+        suspected triplate in them)
+        """
+        unknown = (self._unknown_characters, self._unknown_weapons, self._unknown_rooms)
+        return (self._plan_heuristic.__name__,) + tuple(len(cards) for cards in unknown) + \
+            tuple(cards.index(card) for cards, card in zip(unknown, self._suspected_triplate))
+
+    def plan_to_signature_plan(self, plan):
+        """
+        :return: The plan in the terms of its signature - every question as the positions of its cards in the
+        unknown cards, and the position in the question of the card it expects to find (-1: none)
+        """
+        names = [(character.name, weapon.name, room.name) for character, weapon, room, _ in plan]
+        return tuple((self._unknown_characters.index(character), self._unknown_weapons.index(weapon),
+                      self._unknown_rooms.index(room), question_names.index(found) if found else -1)
+                     for (character, weapon, room, found), question_names in zip(plan, names))
+
+    def plan_from_signature_plan(self, signature_plan):
+        """
+        :return: The plan of a plan in the terms of its signature, with the current unknown cards
+        """
+        plan = []
+        for character, weapon, room, found in signature_plan:
+            question = (self._unknown_characters[character], self._unknown_weapons[weapon],
+                        self._unknown_rooms[room])
+            plan.append(question + (question[found].name if found >= 0 else "",))
+        return plan
 
     def create_propositions(self):
         propositions = []
@@ -707,49 +895,30 @@ class PlanningPlayer(Player):
         return propositions
 
     def create_actions(self):
-
+        """
+        Creates the actions of the plan, as tuples (name, precondition names, add names, delete names)
+        """
         murder_character = self._suspected_triplate[0]
         murder_weapon = self._suspected_triplate[1]
         murder_room = self._suspected_triplate[2]
 
-        action_format = "Name: {character}_{weapon}_{room}_ \n" \
-                        "pre: {character} {weapon} {room} \n" \
-                        "add: {to_add}\ndelete: {to_delete}"
-
         # First action we add is murder combo
-        actions = [
-            action_format.format(character=murder_character.name + "_unknown",
-                                 weapon=murder_weapon.name + "_unknown",
-                                 room=murder_room.name + "_unknown",
-                                 to_add=murder_character.name + "_murder "
-                                        + murder_weapon.name + "_murder " +
-                                        murder_room.name + "_murder",
-                                 to_delete="")]
+        murder_unknown = [murder_character.name + "_unknown", murder_weapon.name + "_unknown",
+                          murder_room.name + "_unknown"]
+        actions = [("_".join(murder_unknown) + "_", murder_unknown,
+                    [murder_character.name + "_murder", murder_weapon.name + "_murder", murder_room.name + "_murder"],
+                    [])]
 
         # All possible combos- We assume we cannot learn from this the murder triplate
         actions.extend(self.create_action_combinations())
 
         # We got all the combinations from all the other rooms, all other
         # weapons and characters should be player, now we change to found
-        pre_found = "pre: "
-        to_add = "\nadd: found_weapon found_character found_room " + self._suspected_triplate[2].name
-        for character in self._unknown_characters:
-            if character == murder_character:
-                pre_found += character.name + "_murder "
-            else:
-                pre_found += character.name + "_player "
-        for weapon in self._unknown_weapons:
-            if weapon == murder_weapon:
-                pre_found += weapon.name + "_murder "
-            else:
-                pre_found += weapon.name + "_player "
-        for room in self._unknown_rooms:
-            if room == murder_room:
-                pre_found += room.name + "_murder "
-            else:
-                pre_found += room.name + "_player "
+        pre_found = [card.name + ("_murder" if card in self._suspected_triplate else "_player")
+                     for card in self._unknown_characters + self._unknown_weapons + self._unknown_rooms]
+        to_add = ["found_weapon", "found_character", "found_room", self._suspected_triplate[2].name]
 
-        actions.append("Name: foundAll\n" + pre_found + to_add + "\ndelete: ")
+        actions.append(("foundAll", pre_found, to_add, []))
         return actions
 
     def create_action_combinations(self):
@@ -768,40 +937,10 @@ class PlanningPlayer(Player):
             weapon_murder = combination[1] == self._suspected_triplate[1]
             room_murder = combination[2] == self._suspected_triplate[2]
 
-            name_one = combination[0].name + "_unknown_" + combination[1].name + \
-                       "_unknown_" + combination[2].name + "_unknown_" + combination[0].name
-            name_two = combination[0].name + "_unknown_" + combination[1].name + \
-                       "_unknown_" + combination[2].name + "_unknown_" + combination[1].name
-            name_three = combination[0].name + "_unknown_" + combination[1].name + \
-                         "_unknown_" + combination[2].name + "_unknown_" + combination[2].name
-
-            pre_one = combination[0].name + "_unknown " \
-                      + combination[1].name + "_unknown "
-            pre_two = combination[0].name + "_unknown " \
-                      + combination[1].name + "_unknown "
-            pre_three = combination[0].name + "_unknown " \
-                        + combination[1].name + "_unknown "
-
-            pre_one += combination[2].name + "_unknown"
-            pre_two += combination[2].name + "_unknown"
-            pre_three += combination[2].name + "_unknown"
-
-            add_one = combination[0].name + "_player"
-            del_one = combination[0].name + "_unknown"
-
-            add_two = combination[1].name + "_player"
-            del_two = combination[1].name + "_unknown"
-
-            add_three = combination[2].name + "_player"
-            del_three = combination[2].name + "_unknown"
-
-            if not character_murder:
-                actions.append("Name: " + name_one + "\npre: " + pre_one +
-                               "\nadd: " + add_one + "\ndelete: " + del_one)
-            if not weapon_murder:
-                actions.append("Name: " + name_two + "\npre: " + pre_two +
-                               "\nadd: " + add_two + "\ndelete: " + del_two)
-            if not room_murder:
-                actions.append("Name: " + name_three + "\npre: " + pre_three +
-                               "\nadd: " + add_three + "\ndelete: " + del_three)
+            pre = [card.name + "_unknown" for card in combination]
+            name = "_".join(pre) + "_"
+
+            for card, murder in zip(combination, (character_murder, weapon_murder, room_murder)):
+                if not murder:
+                    actions.append((name + card.name, pre, [card.name + "_player"], [card.name + "_unknown"]))
         return actions
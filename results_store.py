@@ -0,0 +1,316 @@
+"""
+Columnar on-disk store of tournament results - one row per game. Every append writes one batch: a directory
+with a .npy file per column, so loading reads (memory-maps) only the columns a query needs, even from
+millions of games. The aggregate views (win rate by seat, rounds percentiles, time per decision) are folded
+in on every append and kept next to the batches, so they never re-read the history.
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Seats of the widest game - games of fewer players leave the columns of the missing seats empty
+MAX_SEATS = 6
+
+# Per seat columns: name prefix -> (dtype, value of a missing seat, value of a seat whose agent doesn't report it).
+# An agent reports only the work counters of its own kind of work - the others are 0 for it
+SEAT_COLUMNS = {"agent_": (np.int16, -1, -1),
+                "wall_": (np.float64, np.nan, np.nan),
+                "cpu_": (np.float64, np.nan, np.nan),
+                "decisions_": (np.int32, -1, -1),
+                "replans_": (np.int32, -1, 0),
+                "inference_calls_": (np.int32, -1, 0),
+                "plan_cache_hits_": (np.int32, -1, 0),
+                "plan_repairs_": (np.int32, -1, 0),
+                "replan_time_": (np.float64, np.nan, 0.0),
+                "repair_time_": (np.float64, np.nan, 0.0),
+                "calls_": (np.int32, -1, -1),
+                "deadline_misses_": (np.int32, -1, -1),
+                "slowest_call_": (np.float64, np.nan, np.nan),
+                "peak_memory_": (np.int64, -1, -1)}
+
+# Game columns: name -> dtype. composition, winner_type and agent_i are codes of categories kept in the meta file
+GAME_COLUMNS = {"game": np.int64,
+                "seed": np.int64,
+                "composition": np.int32,
+                "players": np.int8,
+                "winner_seat": np.int8,
+                "winner_type": np.int16,
+                "rounds": np.int32,
+                "wall_time": np.float64,
+                "cpu_time": np.float64}
+
+COLUMNS = list(GAME_COLUMNS) + [prefix + str(seat) for prefix in SEAT_COLUMNS for seat in range(MAX_SEATS)]
+
+# Columns holding agent type codes
+AGENT_COLUMNS = ["winner_type"] + ["agent_" + str(seat) for seat in range(MAX_SEATS)]
+
+META_FILE = "meta.json"
+
+
+def write_json_atomically(path, value):
+    """
+    Writes a JSON file so that a reader (or a crash) sees either the old file or the new one, never a part of it
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as json_file:
+        json.dump(value, json_file)
+        json_file.flush()
+        os.fsync(json_file.fileno())
+    os.replace(temp_path, path)
+
+
+def percentiles_of_histogram(histogram, percentiles):
+    """
+    Nearest-rank percentiles of the values counted in a histogram
+    :param histogram: Dictionary of value -> count
+    :return: List of the percentiles' values
+    """
+    values = np.array(sorted(histogram), dtype=np.float64)
+    counts = np.cumsum([histogram[value] for value in sorted(histogram)])
+    if not len(values):
+        return [np.nan] * len(percentiles)
+    ranks = np.ceil(np.asarray(percentiles) / 100 * counts[-1]).clip(1, None)
+    return list(values[np.searchsorted(counts, ranks)])
+
+
+class ResultsStore:
+    """
+    The results of the games played into one directory, over any number of tournaments
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                self._meta = json.load(meta_file)
+        else:
+            self._meta = {"batches": [], "keys": [], "rows": 0, "agents": [], "compositions": [], "aggregates": {}}
+        # The code of every category value - its index in the meta file's list
+        self._codes = {categories: {value: code for code, value in enumerate(self._meta[categories])}
+                       for categories in ("agents", "compositions")}
+
+    def __len__(self):
+        return self._meta["rows"]
+
+    def _code(self, categories, value):
+        codes = self._codes[categories]
+        if value not in codes:
+            codes[value] = len(self._meta[categories])
+            self._meta[categories].append(value)
+        return codes[value]
+
+    def keys(self):
+        """
+        Returns the set of keys the batches were appended with
+        """
+        return set(self._meta.get("keys", []))
+
+    def append(self, results, key=None):
+        """
+        Appends a batch of per-game results (the dictionaries tournament.play_game returns) and folds them
+        into the aggregates. A batch is listed in the meta file only once all its columns are written, so a
+        crash in the middle of an append loses that batch and nothing else.
+        :param key: A key to record with the batch, in the same write (e.g. the id of a tournament's batch)
+        """
+        if not results:
+            return
+        rows = len(results)
+        columns = {name: np.empty(rows, dtype) for name, dtype in GAME_COLUMNS.items()}
+        for prefix, (dtype, missing, _) in SEAT_COLUMNS.items():
+            for seat in range(MAX_SEATS):
+                columns[prefix + str(seat)] = np.full(rows, missing, dtype)
+
+        for row, result in enumerate(results):
+            agent_types = [result["agent_" + str(seat)] for seat in range(MAX_SEATS)
+                           if "agent_" + str(seat) in result]
+            composition = ",".join(agent_types)
+            columns["game"][row] = result["game"]
+            columns["seed"][row] = result["seed"] if result["seed"] is not None else -1
+            columns["composition"][row] = self._code("compositions", composition)
+            columns["players"][row] = len(agent_types)
+            columns["winner_seat"][row] = result["winner_seat"]
+            columns["winner_type"][row] = self._code("agents", result["winner_type"])
+            columns["rounds"][row] = result["rounds"]
+            columns["wall_time"][row] = result["wall_time"]
+            columns["cpu_time"][row] = result["cpu_time"]
+            for seat, agent_type in enumerate(agent_types):
+                columns["agent_" + str(seat)][row] = self._code("agents", agent_type)
+                for prefix in list(SEAT_COLUMNS)[1:]:
+                    columns[prefix + str(seat)][row] = result.get(prefix + str(seat), SEAT_COLUMNS[prefix][2])
+            self._aggregate(composition, agent_types, result)
+
+        batch = "batch_%06d" % len(self._meta["batches"])
+        batch_path = os.path.join(self._directory, batch)
+        temp_path = batch_path + ".tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        for name, values in columns.items():
+            np.save(os.path.join(temp_path, name + ".npy"), values)
+        shutil.rmtree(batch_path, ignore_errors=True)
+        os.replace(temp_path, batch_path)
+        self._meta["batches"].append(batch)
+        if key is not None:
+            self._meta.setdefault("keys", []).append(key)
+        self._meta["rows"] += rows
+        write_json_atomically(os.path.join(self._directory, META_FILE), self._meta)
+
+    def _aggregate(self, composition, agent_types, result):
+        """
+        Folds the result of a game into the running aggregates of its composition
+        """
+        aggregate = self._meta["aggregates"].setdefault(composition, {
+            "games": 0, "wins": [0] * len(agent_types), "rounds": {}, "cpu": [0.0] * len(agent_types),
+            "decisions": [0] * len(agent_types), "replans": [0] * len(agent_types),
+            "inference_calls": [0] * len(agent_types), "calls": [0] * len(agent_types),
+            "deadline_misses": [0] * len(agent_types), "slowest_call": [0.0] * len(agent_types)})
+        aggregate["games"] += 1
+        aggregate["wins"][result["winner_seat"]] += 1
+        # JSON keys are strings
+        rounds = str(result["rounds"])
+        aggregate["rounds"][rounds] = aggregate["rounds"].get(rounds, 0) + 1
+        for seat in range(len(agent_types)):
+            aggregate["cpu"][seat] += result["cpu_" + str(seat)]
+            for counter in ("decisions", "replans", "inference_calls", "calls", "deadline_misses"):
+                aggregate[counter][seat] += result.get(counter + "_" + str(seat), 0)
+            aggregate["slowest_call"][seat] = max(aggregate["slowest_call"][seat],
+                                                  result.get("slowest_call_" + str(seat), 0))
+
+    def load(self, columns=None, batches=None):
+        """
+        Loads the games as a DataFrame - only the given columns are read. The codes of composition, winner_type
+        and agent_i are turned into categorical columns
+        :param columns: Names of the columns to load (default: all of them)
+        :param batches: Names of the batches to load (default: all of them)
+        """
+        columns = COLUMNS if columns is None else columns
+        batches = self._meta["batches"] if batches is None else batches
+        data = {}
+        for name in columns:
+            parts = [self._load_column(batch, name) for batch in batches]
+            values = np.concatenate(parts) if parts else np.empty(0, GAME_COLUMNS.get(name, np.float64))
+            if name == "composition":
+                values = pd.Categorical.from_codes(values, self._meta["compositions"])
+            elif name in AGENT_COLUMNS:
+                values = pd.Categorical.from_codes(values, self._meta["agents"])
+            data[name] = values
+        return pd.DataFrame(data)
+
+    def _load_column(self, batch, name):
+        """
+        Memory-maps a column of a batch. Columns added to the schema after the batch was written are filled with
+        the value of a missing seat
+        """
+        path = os.path.join(self._directory, batch, name + ".npy")
+        if os.path.exists(path):
+            return np.load(path, mmap_mode='r')
+        dtype, missing, _ = SEAT_COLUMNS[name.rstrip("0123456789")]
+        return np.full(len(np.load(os.path.join(self._directory, batch, "game.npy"), mmap_mode='r')), missing, dtype)
+
+    def iter_results(self):
+        """
+        Yields the games as per-game result dictionaries, like the ones tournament.play_game returns - one batch
+        is loaded at a time
+        """
+        for batch in self._meta["batches"]:
+            for record in self.load(batches=[batch]).to_dict('records'):
+                result = {name: record[name] for name in GAME_COLUMNS if name not in ("composition", "players")}
+                for prefix in SEAT_COLUMNS:
+                    for seat in range(record["players"]):
+                        result[prefix + str(seat)] = record[prefix + str(seat)]
+                yield result
+
+    def load_results(self):
+        """
+        Loads the games as per-game result dictionaries, like the ones tournament.play_game returns
+        """
+        return list(self.iter_results())
+
+    def win_rates(self):
+        """
+        :return: DataFrame of the win rate of every seat of every composition
+        """
+        rows = []
+        for composition, aggregate in self._meta["aggregates"].items():
+            for seat, agent_type in enumerate(composition.split(",")):
+                rows.append({"composition": composition, "seat": seat, "agent": agent_type,
+                             "games": aggregate["games"], "wins": aggregate["wins"][seat],
+                             "win_rate": aggregate["wins"][seat] / aggregate["games"]})
+        return pd.DataFrame(rows, columns=["composition", "seat", "agent", "games", "wins", "win_rate"])
+
+    def rounds_percentiles(self, percentiles=(50, 90, 99)):
+        """
+        :return: DataFrame of the percentiles of the game length (in rounds) of every composition
+        """
+        rows = []
+        for composition, aggregate in self._meta["aggregates"].items():
+            histogram = {int(rounds): count for rounds, count in aggregate["rounds"].items()}
+            row = {"composition": composition, "games": aggregate["games"]}
+            row.update(zip(["p" + str(percentile) for percentile in percentiles],
+                           percentiles_of_histogram(histogram, percentiles)))
+            rows.append(row)
+        return pd.DataFrame(rows, columns=["composition", "games"] + ["p" + str(p) for p in percentiles])
+
+    def time_per_decision(self):
+        """
+        :return: DataFrame of the CPU time per decision (a turn's move and suggestion) of every agent type,
+        with its replans and inference calls per decision
+        """
+        totals = {}
+        for composition, aggregate in self._meta["aggregates"].items():
+            for seat, agent_type in enumerate(composition.split(",")):
+                total = totals.setdefault(agent_type, {"agent": agent_type, "decisions": 0, "cpu": 0.0,
+                                                       "replans": 0, "inference_calls": 0})
+                total["decisions"] += aggregate["decisions"][seat]
+                total["cpu"] += aggregate["cpu"][seat]
+                total["replans"] += aggregate["replans"][seat]
+                total["inference_calls"] += aggregate["inference_calls"][seat]
+        table = pd.DataFrame(list(totals.values()),
+                             columns=["agent", "decisions", "cpu", "replans", "inference_calls"])
+        decisions = table["decisions"].where(table["decisions"] > 0)
+        table["ms_per_decision"] = 1000 * table["cpu"] / decisions
+        table["replans_per_decision"] = table["replans"] / decisions
+        table["inference_calls_per_decision"] = table["inference_calls"] / decisions
+        return table
+
+    def deadlines(self):
+        """
+        :return: DataFrame of the deadline misses of every agent type - the share of its hook calls that returned
+        after their deadline, and its slowest hook call
+        """
+        totals = {}
+        for composition, aggregate in self._meta["aggregates"].items():
+            for seat, agent_type in enumerate(composition.split(",")):
+                total = totals.setdefault(agent_type, {"agent": agent_type, "calls": 0, "deadline_misses": 0,
+                                                       "slowest_ms": 0.0})
+                total["calls"] += aggregate["calls"][seat]
+                total["deadline_misses"] += aggregate["deadline_misses"][seat]
+                total["slowest_ms"] = max(total["slowest_ms"], 1000 * aggregate["slowest_call"][seat])
+        table = pd.DataFrame(list(totals.values()), columns=["agent", "calls", "deadline_misses", "slowest_ms"])
+        table["miss_rate"] = table["deadline_misses"] / table["calls"].where(table["calls"] > 0)
+        return table
+
+    def summary(self):
+        """
+        :return: Lines describing the aggregates of the store
+        """
+        lines = ["%d games in %d batches" % (len(self), len(self._meta["batches"]))]
+        for table in (self.win_rates(), self.rounds_percentiles(), self.time_per_decision(), self.deadlines()):
+            lines.append(table.to_string(index=False))
+        return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prints the aggregates of a results store")
+    parser.add_argument("directory", help="directory of the results store")
+    args = parser.parse_args()
+    print("\n".join(ResultsStore(args.directory).summary()))
+
+
+if __name__ == '__main__':
+    main()
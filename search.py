@@ -2,6 +2,8 @@
 In search.py, you will implement generic search algorithms
 """
 
+import time
+
 import util
 
 
@@ -51,60 +53,67 @@ class SearchProblem:
 
 class Node:
     def __init__(self, state, cost, path, asked_before, location=None, action=None,
-                 this_question=None):
+                 this_question=None, config=util.DEFAULT_BOARD):
         self.state = state
         self.cost = cost
         if location:
             self.location = location
-        self.asked_before = dict()
-        # save the last asked question
-        for q in asked_before:
-            self.asked_before[q] = asked_before[q]
-
         self.last_question = this_question
         if action is not None:
             self.path = path + [action]
             if this_question:
                 # All previous question - doesn't matter at the end of the plan
+                self.asked_before = dict(asked_before)
                 for q in this_question:
-                    if q in asked_before:
-                        self.asked_before[q] += 1
-                    else:
-                        self.asked_before[q] = 1
-                self.location = util.LOCATIONS_OF_ROOMS[util.Room[this_question[2]]]
+                    self.asked_before[q] = asked_before.get(q, 0) + 1
+                self.location = config.locations_of_rooms[util.Room[this_question[2]]]
+                return
         else:
             self.path = path
+        # Nodes never change their asked questions, so a node that asked nothing shares its parent's
+        self.asked_before = asked_before
 
 
-def a_star_search(problem, heuristic, location):
+def a_star_search(problem, heuristic, location, deadline=None):
     """
     Search the node that has the lowest combined cost and heuristic first.
+    :param deadline: The time (by time.perf_counter) to stop searching at - the search then returns the path to
+    the deepest node it expanded, the beginning of a plan (None: search until a goal is found)
     """
     fringe = util.PriorityQueue()
     visited = set()
     first_state = problem.get_start_state()
     fringe.push(Node(first_state, 0, [], dict(), location), 0)
+    deepest_path = []
+    # The question every expanded action asks (None if it asks none), split out of its name once
+    questions = dict()
     while not fringe.isEmpty():
         current_node = fringe.pop()
         if current_node.state not in visited:
             if problem.is_goal_state(current_node.state):
                 return current_node.path
+            if deadline is not None:
+                if len(current_node.path) > len(deepest_path):
+                    deepest_path = current_node.path
+                if time.perf_counter() >= deadline:
+                    return deepest_path
             # Expand node
             visited.add(current_node.state)
             successors = problem.get_successors(current_node.state)
             asked_before = current_node.asked_before
             current_location = current_node.location
             for succ, action, cost in successors:
-                this_question, result = None, None
-                if "unknown" in action.name:
-                    name = action.name.split("_unknown_")
-                    this_question = name[0:3]
+                this_question = questions.get(action)
+                if this_question is None and action not in questions:
+                    if "unknown" in action.name:
+                        this_question = action.name.split("_unknown_")[0:3]
+                    questions[action] = this_question
                 accumulated_cost = current_node.cost + cost
                 heuristic_cost = heuristic(asked_before, this_question, succ,
                                            current_location, problem)
                 fringe.push(
                     Node(succ, accumulated_cost, current_node.path, asked_before,
-                         current_location, action, this_question),
+                         current_location, action, this_question, problem.config),
                     accumulated_cost + heuristic_cost)
     return None
 
@@ -0,0 +1,137 @@
+"""
+Sequential statistics of a tournament matchup - the estimates are updated after every finished game, and the
+matchup is stopped as soon as its result is decided, instead of after a fixed number of games.
+"""
+import math
+
+# z of a two sided 95% confidence interval
+Z_95 = 1.959964
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """
+    Wilson score confidence interval of a binomial proportion
+    :return: a tuple (low, high)
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+class RunningMean:
+    """
+    Mean and variance of a stream of values (Welford's algorithm)
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._squares = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._squares += delta * (value - self.mean)
+
+    def standard_error(self):
+        if self.n < 2:
+            return float('inf')
+        return math.sqrt(self._squares / (self.n - 1) / self.n)
+
+
+class SPRT:
+    """
+    Wald's sequential probability ratio test of a Bernoulli success probability: H0 p = p0 against H1 p = p1
+    """
+    ACCEPT_H0 = "H0"
+    ACCEPT_H1 = "H1"
+
+    def __init__(self, p0, p1, alpha=0.05, beta=0.05):
+        """
+        :param alpha: Probability of accepting H1 when H0 is true
+        :param beta: Probability of accepting H0 when H1 is true
+        """
+        self._success_llr = math.log(p1 / p0)
+        self._failure_llr = math.log((1 - p1) / (1 - p0))
+        self._upper = math.log((1 - beta) / alpha)
+        self._lower = math.log(beta / (1 - alpha))
+        self.llr = 0.0
+        self.decision = None
+
+    def add(self, success):
+        """
+        Adds a trial
+        :return: The decision (ACCEPT_H0 / ACCEPT_H1), or None while the test continues
+        """
+        if self.decision is None:
+            self.llr += self._success_llr if success else self._failure_llr
+            if self.llr >= self._upper:
+                self.decision = SPRT.ACCEPT_H1
+            elif self.llr <= self._lower:
+                self.decision = SPRT.ACCEPT_H0
+        return self.decision
+
+
+class MatchupMonitor:
+    """
+    Follows the games of one matchup: the win rate and the rounds-to-win of every seat. The matchup is decided
+    when the head-to-head SPRT between the first two seats (over the games one of them won) shows which of them
+    is stronger by at least delta, or when the confidence intervals of all the win rates are narrower than
+    ci_width.
+    """
+
+    def __init__(self, agent_types, delta=0.05, alpha=0.05, beta=0.05, ci_width=0.1, min_games=20):
+        """
+        :param agent_types: The type of the agent sitting at each seat
+        :param delta: Half width of the indifference zone of the head-to-head SPRT, around an even 0.5
+        :param ci_width: Target width of the 95% confidence interval of every seat's win rate
+        :param min_games: The matchup is never decided before this many games
+        """
+        self.agent_types = agent_types
+        self._ci_width = ci_width
+        self._min_games = min_games
+        self.games = 0
+        self.wins = [0] * len(agent_types)
+        self.rounds_to_win = [RunningMean() for _ in agent_types]
+        self._head_to_head = SPRT(0.5 - delta, 0.5 + delta, alpha, beta)
+        self.decision = None
+
+    def add(self, winner_seat, rounds):
+        """
+        Adds the result of a finished game
+        :return: The decision of the matchup, or None while it is undecided
+        """
+        self.games += 1
+        self.wins[winner_seat] += 1
+        self.rounds_to_win[winner_seat].add(rounds)
+        if winner_seat in (0, 1):
+            self._head_to_head.add(winner_seat == 0)
+        if self.decision is None and self.games >= self._min_games:
+            if self._head_to_head.decision == SPRT.ACCEPT_H1:
+                self.decision = "seat 0 (%s) is stronger than seat 1 (%s)" % tuple(self.agent_types[:2])
+            elif self._head_to_head.decision == SPRT.ACCEPT_H0:
+                self.decision = "seat 1 (%s) is stronger than seat 0 (%s)" % tuple(self.agent_types[1::-1])
+            elif max(high - low for low, high in self.win_rate_intervals()) <= self._ci_width:
+                self.decision = "win rates are known within %.3f" % self._ci_width
+        return self.decision
+
+    def win_rate_intervals(self):
+        return [wilson_interval(wins, self.games) for wins in self.wins]
+
+    def summary(self):
+        """
+        :return: Lines describing the estimates of the matchup
+        """
+        lines = [",".join(self.agent_types) + ": " + (self.decision or "undecided") +
+                 " after %d games" % self.games]
+        for seat, (low, high) in enumerate(self.win_rate_intervals()):
+            rounds = self.rounds_to_win[seat]
+            lines.append("  seat %d (%s): win rate %.3f [%.3f, %.3f], rounds to win %.2f +- %.2f" %
+                         (seat, self.agent_types[seat], self.wins[seat] / max(self.games, 1), low, high,
+                          rounds.mean, rounds.standard_error() if rounds.n > 1 else 0.0))
+        return lines
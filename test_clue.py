@@ -0,0 +1,74 @@
+"""
+Tests of the game engine
+"""
+import itertools
+import random
+import unittest
+
+from clue import *
+
+
+class AgentVariantTest(unittest.TestCase):
+    """
+    A variant of an agent type plays its games like the agent type itself
+    """
+
+    def test_bn_variant_game(self):
+        # The first BN player needs its own deal and its game_started() call, with or without parameters
+        game = ClueGame(parse_players("bn:accusation_entropy_threshold=0.1,r,r"), turn_delay=0, seed=(0, 0))
+        winner, rounds = game.run()
+        self.assertIsInstance(winner, BNPlayer)
+        self.assertGreater(rounds, 0)
+
+
+class AgentSpecTest(unittest.TestCase):
+    """
+    The parameters of a variant are checked against its agent's constructor, and converted to their types
+    """
+
+    def test_good_spec(self):
+        agent_types = parse_players("p:plan_repair=0:plan_heuristic=true,bn2:accusation_threshold=0.9,r")
+        self.assertEqual(agent_types, [PLANNING + ":plan_repair=0:plan_heuristic=true",
+                                       BN2 + ":accusation_threshold=0.9", RANDOM])
+        planning_player = create_player(agent_types[0], CHARACTERS[0], 3)
+        self.assertIs(planning_player._plan_repair, False)
+        self.assertEqual(planning_player._plan_heuristic, question_count_heuristic)
+        self.assertEqual(create_player(agent_types[1], CHARACTERS[1], 3)._accusation_threshold, 0.9)
+
+    def test_bad_spec(self):
+        for spec in ("r:foo=1", "p:plan_repair=maybe", "bn2:accusation_threshold=high", "p:character=1"):
+            with self.assertRaises(ValueError):
+                parse_player(spec)
+        with self.assertRaises(SystemExit):
+            parse_players("r:foo=1,r,r")
+
+
+class FirstRespondersTableTest(unittest.TestCase):
+    """
+    The first-responder table answers every suggestion like asking the players clockwise, one by one
+    """
+
+    def test_table_matches_linear_scan(self):
+        rng = random.Random(0)
+        for seats_n in range(2, len(CHARACTERS) + 1):
+            # Deal the cards, without an envelope, to the seats and to no one
+            hands = [0] * seats_n
+            for card in CARDS:
+                seat = rng.randrange(seats_n + 1)
+                if seat < seats_n:
+                    hands[seat] |= 1 << card
+            table = create_first_responders_table(hands)
+            self.assertEqual(table.shape, (seats_n, SUGGESTIONS_N))
+            for suggesting_seat in range(seats_n):
+                for suggestion in itertools.product(CHARACTERS, WEAPONS, ROOMS):
+                    responder = -1
+                    for i in range(1, seats_n):
+                        seat = (suggesting_seat + i) % seats_n
+                        if any(hands[seat] >> card & 1 for card in suggestion):
+                            responder = seat
+                            break
+                    self.assertEqual(table[suggesting_seat, suggestion_index(suggestion)], responder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests of the game log
+"""
+import os
+import tempfile
+import unittest
+
+from clue import *
+from game_log import *
+
+REPLAYED_HOOKS = ("see_card", "update_on_other_player_suggestion")
+
+
+def record_hooks(player, seat, calls):
+    """
+    Wraps the player's hooks that the replayer calls, to append every call to calls
+    """
+    for name in REPLAYED_HOOKS:
+        def recorded(*args, hook=getattr(player, name), name=name):
+            calls.append((seat, name, tuple(tuple(arg) if isinstance(arg, (list, tuple)) else arg
+                                            for arg in args)))
+            return hook(*args)
+        setattr(player, name, recorded)
+    return player
+
+
+class GameReplayerTest(unittest.TestCase):
+    """
+    A game read back from its log replays the events the players got during the game
+    """
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.log")
+            game_calls = []
+            with GameLogWriter(path) as event_log:
+                # The cards are dealt when the game is created
+                game = ClueGame([RANDOM] * 4, turn_delay=0, seed=(0, 0), event_log=event_log)
+                for seat, player in enumerate(game._players):
+                    record_hooks(player, seat, game_calls)
+                winner, rounds = game.run()
+
+            replay_calls = []
+
+            def create_recorded_player(seat, character, players_n):
+                # Like in the game, the calls are recorded from the start of the game, after the deal
+                player = create_player(RANDOM, character, players_n)
+
+                def game_started():
+                    record_hooks(player, seat, replay_calls)
+                player.game_started = game_started
+                return player
+            replayer = GameReplayer(create_recorded_player)
+            with GameLogReader(path) as reader:
+                games = list(reader.games())
+                self.assertEqual(len(games), 1)
+                events = games[0]
+                self.assertEqual((events[0].kind, events[0].seat), (GAME_START, 4))
+                self.assertEqual((events[-1].kind, events[-1].seat, events[-1].value),
+                                 (GAME_END, game._players.index(winner), rounds))
+                players = replayer.replay(events)
+
+        self.assertGreater(len(game_calls), 0)
+        self.assertEqual(replay_calls, game_calls)
+        for player, replayed in zip(game._players, players):
+            self.assertEqual(replayed.get_cards(), player.get_cards())
+            self.assertEqual(tuple(replayed.get_location()), tuple(player.get_location()))
+        self.assertEqual(sum(calls for calls, _ in replayer.hook_stats.values()), replayer.hook_calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
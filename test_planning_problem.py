@@ -0,0 +1,36 @@
+"""
+Tests of the planning player's search problem
+"""
+import unittest
+
+from planning_problem import costs_to_goal, null_heuristic, question_count_heuristic, random_problem
+from search import a_star_search
+from util import *
+
+
+class QuestionCountHeuristicTest(unittest.TestCase):
+    """
+    The heuristic never overestimates the cost to the goal, on every state of fixed-seed planning problems
+    """
+
+    # (number of cards the player knows, seed) of the problems
+    PROBLEMS = [(known_n, (0, known_n, i)) for known_n in (10, 12) for i in range(3)]
+
+    def test_admissible(self):
+        for known_n, seed in self.PROBLEMS:
+            problem = random_problem(known_n, seed)
+            costs = costs_to_goal(problem)
+            self.assertIn(problem.get_start_state(), costs)
+            for state, cost in costs.items():
+                self.assertLessEqual(problem.min_actions_to_goal(state), cost)
+
+    def test_plan_is_shortest(self):
+        location = DEFAULT_BOARD.open_loc[CHARACTERS[0]]
+        for known_n, seed in self.PROBLEMS:
+            shortest = a_star_search(random_problem(known_n, seed), null_heuristic, location)
+            plan = a_star_search(random_problem(known_n, seed), question_count_heuristic, location)
+            self.assertEqual(len(plan), len(shortest))
+
+
+if __name__ == '__main__':
+    unittest.main()
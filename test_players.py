@@ -0,0 +1,121 @@
+"""
+Tests of the agents' handling of the cards and of their plans
+"""
+import random
+import unittest
+
+from BNplayer2 import BNPlayer2
+from player import PLAN_CACHE, PlanningPlayer
+from util import *
+
+
+class CardIdZeroTest(unittest.TestCase):
+    """
+    Cards are integer ids, and the first card of every kind is falsy - a shown card or a deduced murder card must
+    still count as one
+    """
+
+    def setUp(self):
+        # A 3 player table seats the first 3 characters
+        self.player = BNPlayer2(CHARACTERS[2], DEFAULT_BOARD.open_loc[CHARACTERS[2]], 3, random.Random(0))
+
+    def test_first_card_is_id_zero(self):
+        self.assertEqual(CHARACTERS[0], 0)
+
+    def test_shown_card_zero_is_not_the_solution(self):
+        self.player._last_suggestion = (CHARACTERS[0], Weapon.Rope, Room.Hall)
+        self.player.see_card([CHARACTERS[1]], CHARACTERS[0])
+        self.assertIsNone(self.player.murder_char)
+        self.assertIsNone(self.player.make_accusation())
+
+    def test_accuses_with_murder_card_zero(self):
+        self.player.murder_char, self.player.murder_weapon, self.player.murder_room = \
+            CHARACTERS[0], Weapon.Rope, Room.Hall
+        self.assertEqual(self.player.make_accusation(), (CHARACTERS[0], Weapon.Rope, Room.Hall))
+
+
+def create_planning_player(known_cards, suspected_triplate):
+    """
+    A planning player that knows the cards and suspects the triplate, before its first plan
+    """
+    character = CHARACTERS[0]
+    player = PlanningPlayer(character, DEFAULT_BOARD.open_loc[character], random.Random(0))
+    for card in known_cards:
+        player.add_card(card)
+    player._suspected_triplate = suspected_triplate
+    return player
+
+
+# Known cards and suspected triplates of planning players - the second differs from the first by renaming cards
+KNOWN_CARDS = [CHARACTERS[1], CHARACTERS[2], WEAPONS[0], WEAPONS[3], Room.Hall, Room.Kitchen]
+SUSPECTED_TRIPLATE = (CHARACTERS[3], WEAPONS[1], Room.Library)
+RENAMED_KNOWN_CARDS = [CHARACTERS[4], CHARACTERS[5], WEAPONS[2], WEAPONS[5], Room.Study, Room.Lounge]
+RENAMED_SUSPECTED_TRIPLATE = (CHARACTERS[1], WEAPONS[0], Room.Library)
+
+
+class PlanTest(unittest.TestCase):
+    """
+    A plan asks only about unknown cards, finds every unknown card but the suspected triplate once, and asks
+    about the suspected triplate last - whether it was searched, taken from the plan cache or repaired
+    """
+
+    def setUp(self):
+        PLAN_CACHE.clear()
+
+    def assertValidPlan(self, player):
+        triplate = player._suspected_triplate
+        unknown = set(player._unknown_characters + player._unknown_weapons + player._unknown_rooms)
+        found = []
+        for question in player._plan:
+            self.assertLessEqual(set(question[:3]), unknown)
+            if question[3]:
+                self.assertIn(question[3], [card.name for card in question[:3]])
+                found.append(CARDS_BY_NAME[question[3]])
+        self.assertEqual(player._plan[-1], triplate + ("",))
+        self.assertEqual(sorted(found), sorted(unknown - set(triplate)))
+
+    def searched_plan(self, known_cards, suspected_triplate):
+        PLAN_CACHE.clear()
+        player = create_planning_player(known_cards, suspected_triplate)
+        player.create_plan()
+        return player._plan
+
+    def test_equivalent_states_share_signature(self):
+        player = create_planning_player(KNOWN_CARDS, SUSPECTED_TRIPLATE)
+        renamed = create_planning_player(RENAMED_KNOWN_CARDS, RENAMED_SUSPECTED_TRIPLATE)
+        self.assertEqual(player.plan_signature(), renamed.plan_signature())
+        other = create_planning_player(KNOWN_CARDS, (CHARACTERS[4],) + SUSPECTED_TRIPLATE[1:])
+        self.assertNotEqual(player.plan_signature(), other.plan_signature())
+
+        # The searched plans are the same, up to renaming the cards
+        player.create_plan()
+        PLAN_CACHE.clear()
+        renamed.create_plan()
+        self.assertEqual(player.plan_to_signature_plan(player._plan), renamed.plan_to_signature_plan(renamed._plan))
+
+    def test_cached_plan(self):
+        player = create_planning_player(KNOWN_CARDS, SUSPECTED_TRIPLATE)
+        player.create_plan()
+        renamed = create_planning_player(RENAMED_KNOWN_CARDS, RENAMED_SUSPECTED_TRIPLATE)
+        renamed.create_plan()
+        self.assertEqual(renamed.get_stats()["plan_cache_hits"], 1)
+        self.assertValidPlan(renamed)
+        self.assertEqual(renamed._plan, self.searched_plan(RENAMED_KNOWN_CARDS, RENAMED_SUSPECTED_TRIPLATE))
+
+    def test_repaired_plan(self):
+        # Another player is found to hold a card the plan would find, then a card of the suspected triplate
+        player = create_planning_player(KNOWN_CARDS, SUSPECTED_TRIPLATE)
+        player.create_plan()
+        known_cards = list(KNOWN_CARDS)
+        for card in (Room.Study, SUSPECTED_TRIPLATE[1]):
+            player.update_deductions({CHARACTERS[1]: {card}}, False)
+            known_cards.append(card)
+            self.assertValidPlan(player)
+            self.assertEqual(len(player._plan), len(self.searched_plan(known_cards, player._suspected_triplate)))
+        self.assertNotEqual(player._suspected_triplate[1], SUSPECTED_TRIPLATE[1])
+        self.assertEqual(player.get_stats()["plan_repairs"], 2)
+        self.assertEqual(player.get_stats()["replans"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
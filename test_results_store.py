@@ -0,0 +1,72 @@
+"""
+Tests of the results store
+"""
+import tempfile
+import unittest
+
+from results_store import *
+from tournament import play_game
+from util import PLANNING, RANDOM
+
+PLANNING_GAME = [PLANNING, RANDOM, RANDOM]
+RANDOM_GAME = [RANDOM] * 4
+
+
+class ResultsStoreTest(unittest.TestCase):
+    """
+    The aggregates folded into the meta file agree with the games stored in the batches, across reopening
+    """
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        store = ResultsStore(self._directory.name)
+        store.append([play_game(i, PLANNING_GAME, 0) for i in range(3)], key="first")
+        # A reopened store keeps coding the agents and compositions the way it did
+        store = ResultsStore(self._directory.name)
+        store.append([play_game(i, RANDOM_GAME, 0) for i in range(3)], key="second")
+        store.append([play_game(i, PLANNING_GAME, 1) for i in range(2)])
+        self.store = ResultsStore(self._directory.name)
+
+    def test_rows(self):
+        self.assertEqual(len(self.store), 8)
+        self.assertEqual(self.store.keys(), {"first", "second"})
+        games = self.store.load()
+        self.assertEqual(len(games), 8)
+        self.assertEqual(list(games["composition"]), [",".join(PLANNING_GAME)] * 3 + [",".join(RANDOM_GAME)] * 3
+                         + [",".join(PLANNING_GAME)] * 2)
+        self.assertEqual(list(games["agent_0"]), [PLANNING] * 3 + [RANDOM] * 3 + [PLANNING] * 2)
+
+    def test_aggregates_match_rows(self):
+        games = self.store.load()
+        win_rates = self.store.win_rates()
+        for _, row in win_rates.iterrows():
+            composition_games = games[games["composition"] == row["composition"]]
+            self.assertEqual(row["games"], len(composition_games))
+            self.assertEqual(row["wins"], (composition_games["winner_seat"] == row["seat"]).sum())
+        self.assertEqual(win_rates["wins"].sum(), len(games))
+
+        rounds = self.store.rounds_percentiles(percentiles=(100,)).set_index("composition")
+        for composition, composition_games in games.groupby("composition", observed=True):
+            self.assertEqual(rounds.loc[composition, "p100"], composition_games["rounds"].max())
+
+        time_per_decision = self.store.time_per_decision().set_index("agent")
+        for agent_type in (PLANNING, RANDOM):
+            for counter in ("decisions", "replans", "inference_calls"):
+                total = sum(games[counter + "_" + str(seat)][games["agent_" + str(seat)] == agent_type].sum()
+                            for seat in range(MAX_SEATS))
+                self.assertEqual(time_per_decision.loc[agent_type, counter], total)
+        self.assertGreater(time_per_decision.loc[PLANNING, "replans"], 0)
+
+    def test_seat_counters(self):
+        games = self.store.load()
+        # A random player makes no replans - it is 0 for its seat, and -1 for the seats of no one
+        self.assertTrue((games["replans_1"] == 0).all())
+        self.assertTrue((games["replan_time_1"] == 0.0).all())
+        self.assertEqual(list(games["replans_3"]), [-1] * 3 + [0] * 3 + [-1] * 2)
+        self.assertTrue(games["replans_5"].eq(-1).all())
+        self.assertTrue(games["wall_5"].isna().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Tests of the sequential statistics of a matchup
+"""
+import random
+import unittest
+
+from sequential import *
+
+MAX_GAMES = 1000
+
+
+def play_until_decided(monitor, win_probabilities, seed=0):
+    """
+    Adds games won by the seats with the given probabilities until the monitor decides the matchup
+    :return: The decision, or None if it wasn't decided within MAX_GAMES games
+    """
+    rng = random.Random(seed)
+    for _ in range(MAX_GAMES):
+        winner_seat = rng.choices(range(len(win_probabilities)), win_probabilities)[0]
+        decision = monitor.add(winner_seat, rng.randint(5, 30))
+        if decision:
+            return decision
+    return None
+
+
+class MatchupMonitorTest(unittest.TestCase):
+    """
+    A matchup stops as soon as the stronger of two clearly separated agents is known, or its win rates are
+    """
+
+    def test_stronger_first_seat(self):
+        monitor = MatchupMonitor(["planning", "random", "random"], min_games=20)
+        decision = play_until_decided(monitor, [0.8, 0.1, 0.1])
+        self.assertEqual(decision, "seat 0 (planning) is stronger than seat 1 (random)")
+        self.assertGreaterEqual(monitor.games, 20)
+        self.assertLess(monitor.games, 100)
+
+    def test_stronger_second_seat(self):
+        monitor = MatchupMonitor(["random", "planning", "random"], min_games=20)
+        decision = play_until_decided(monitor, [0.1, 0.8, 0.1])
+        self.assertEqual(decision, "seat 1 (planning) is stronger than seat 0 (random)")
+        self.assertLess(monitor.games, 100)
+
+    def test_never_before_min_games(self):
+        monitor = MatchupMonitor(["planning", "random"], min_games=50)
+        decision = play_until_decided(monitor, [1.0, 0.0])
+        self.assertEqual(monitor.games, 50)
+        self.assertIn("is stronger", decision)
+
+    def test_win_rates_known(self):
+        # Even first seats never separate - the matchup stops once the intervals are narrow enough
+        monitor = MatchupMonitor(["random", "random", "planning"], delta=0.01, ci_width=0.2)
+        decision = play_until_decided(monitor, [0.1, 0.1, 0.8])
+        self.assertEqual(decision, "win rates are known within 0.200")
+        for low, high in monitor.win_rate_intervals():
+            self.assertLessEqual(high - low, 0.2)
+
+    def test_wilson_interval(self):
+        low, high = wilson_interval(80, 100)
+        self.assertAlmostEqual(low, 0.7112, places=4)
+        self.assertAlmostEqual(high, 0.8666, places=4)
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Tests of the tournament runner
+"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from tournament import *
+from util import RANDOM
+
+MATCHUPS = [[RANDOM] * 3, [RANDOM] * 4]
+GAMES_N = 5
+BATCH_SIZE = 2
+SEED = 7
+
+
+def game_outcomes(store):
+    """
+    The outcome of every game in the store - everything but the times measured while it was played
+    """
+    return sorted((result["players"], result["game"], result["winner_seat"], result["rounds"])
+                  for result in store.load(["players", "game", "winner_seat", "rounds"]).to_dict('records'))
+
+
+class CheckpointTest(unittest.TestCase):
+    """
+    A checkpointed tournament resumes where it stopped, and only the tournament it was started with
+    """
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.directory = os.path.join(self._directory.name, "checkpoint")
+
+    def run_tournament(self, directory):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            _, store, played, _ = run_checkpointed_tournament(directory, MATCHUPS, GAMES_N, SEED, processes=1,
+                                                              batch_size=BATCH_SIZE)
+        return store, played, output.getvalue()
+
+    def test_resume(self):
+        # A tournament that stopped after its first batch and its last one
+        batches = create_schedule(MATCHUPS, GAMES_N, BATCH_SIZE)
+        _, store = load_checkpoint(self.directory, MATCHUPS, GAMES_N, SEED, BATCH_SIZE)
+        for batch_id in (0, len(batches) - 1):
+            m, games = batches[batch_id]
+            store.append(play_games(batch_id, games, MATCHUPS[m], SEED)[1], key=batch_id)
+
+        store, played, output = self.run_tournament(self.directory)
+        self.assertIn("Resuming: 2 of %d batches are completed" % len(batches), output)
+        self.assertEqual(played, GAMES_N * len(MATCHUPS) - len(batches[0][1]) - len(batches[-1][1]))
+        self.assertEqual(len(store), GAMES_N * len(MATCHUPS))
+        self.assertEqual(store.keys(), set(range(len(batches))))
+
+        # The same games as a tournament that never stopped
+        uninterrupted, _, _ = self.run_tournament(os.path.join(self._directory.name, "uninterrupted"))
+        self.assertEqual(game_outcomes(store), game_outcomes(uninterrupted))
+
+        # Nothing is left to play
+        store, played, _ = self.run_tournament(self.directory)
+        self.assertEqual((played, len(store)), (0, GAMES_N * len(MATCHUPS)))
+
+    def test_other_tournament(self):
+        load_checkpoint(self.directory, MATCHUPS, GAMES_N, SEED, BATCH_SIZE)
+        for matchups, games_n, seed, batch_size in ((MATCHUPS[:1], GAMES_N, SEED, BATCH_SIZE),
+                                                    (MATCHUPS, GAMES_N + 1, SEED, BATCH_SIZE),
+                                                    (MATCHUPS, GAMES_N, SEED + 1, BATCH_SIZE),
+                                                    (MATCHUPS, GAMES_N, SEED, BATCH_SIZE + 1)):
+            with self.assertRaises(CheckpointMismatch):
+                load_checkpoint(self.directory, matchups, games_n, seed, batch_size)
+        # A drawn seed resumes the checkpoint's seed
+        schedule, _ = load_checkpoint(self.directory, MATCHUPS, GAMES_N, SEED + 1, BATCH_SIZE, any_seed=True)
+        self.assertEqual(schedule["seed"], SEED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,497 @@
+"""
+Headless tournament runner - plays many Clue games in parallel, without printing and without pacing,
+and writes the result of each game to a csv file.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+
+from clue import ClueGame, parse_players
+from events import EventBus, ConsoleSink
+from game_log import GameLogWriter
+import instrumentation
+from memory_profile import MemoryBudgetExceeded, MemoryProfiler
+from results_store import ResultsStore, write_json_atomically
+from sequential import MatchupMonitor
+from util import CHARACTERS, HUMAN, parse_agent_spec
+
+
+# Number of games appended to a results store at once
+STORE_BATCH_SIZE = 1000
+
+# Number of games in a batch of a checkpointed tournament - the games of a batch are checkpointed together
+CHECKPOINT_BATCH_SIZE = 50
+
+# The file in a checkpoint directory that keeps the tournament's schedule
+SCHEDULE_FILE = "schedule.json"
+
+# Workers are started with a fixed string hash seed, so that nothing in a game depends on the process it runs in
+HASH_SEED = "0"
+
+
+def play_game(game_index, agent_types, seed, verbose=False, event_log_dir=None, decision_time=None,
+              instrument=False, memory_budget=None):
+    """
+    Plays a single headless game
+    :param game_index: Index of the game in the tournament - together with the tournament's seed it seeds the game
+    :param seed: The tournament's seed
+    :param verbose: Print the game (used for replaying a single game)
+    :param event_log_dir: Directory to record the game's events to - every worker appends to its own game log
+    :param decision_time: Seconds an agent has for each call of its hooks (default: no deadlines)
+    :param instrument: Record the latency histograms of the agents' hooks - returned in the result's "hooks"
+    :param memory_budget: Bytes an agent may hold - the game raises MemoryBudgetExceeded as soon as an agent holds
+    more, and the result gets the peak memory of every agent (default: no budget, and memory is not traced)
+    :return: Dictionary with the result of the game and the time spent by each agent
+    """
+    if instrument:
+        instrumentation.enable()
+        instrumentation.reset()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    event_log = None
+    if event_log_dir:
+        event_log = GameLogWriter(os.path.join(event_log_dir, "events_%d.bin" % os.getpid()))
+    events = EventBus(ConsoleSink()) if verbose else None
+    memory_profiler = MemoryProfiler(agent_types, budget=memory_budget) if memory_budget is not None else None
+    game = ClueGame(agent_types, events, turn_delay=0, seed=(seed, game_index), event_log=event_log,
+                    decision_time=decision_time, memory_profiler=memory_profiler)
+    winner, rounds = game.run()
+    if event_log:
+        event_log.close()
+    winner_seat = CHARACTERS.index(winner.get_character())
+    result = {"game": game_index,
+              "seed": seed,
+              "winner_seat": winner_seat,
+              "winner_type": agent_types[winner_seat],
+              "rounds": rounds,
+              "wall_time": time.perf_counter() - wall_start,
+              "cpu_time": time.process_time() - cpu_start}
+    agents_wall_time, agents_cpu_time = game.get_agent_times()
+    agents_stats = game.get_agent_stats()
+    for seat in range(len(agent_types)):
+        result["agent_" + str(seat)] = agent_types[seat]
+        result["wall_" + str(seat)] = agents_wall_time[seat]
+        result["cpu_" + str(seat)] = agents_cpu_time[seat]
+        for counter, count in agents_stats[seat].items():
+            result[counter + "_" + str(seat)] = count
+        if memory_profiler is not None:
+            result["peak_memory_" + str(seat)] = memory_profiler.peak_agent_memory[seat]
+    if instrument:
+        result["hooks"] = instrumentation.snapshot()
+    return result
+
+
+def _play_game_task(args):
+    return play_game(*args)
+
+
+def play_games(batch_id, games, agent_types, seed, event_log_dir=None, decision_time=None, instrument=False,
+               memory_budget=None):
+    """
+    Plays a batch of games of a checkpointed tournament
+    :param games: Indexes of the batch's games
+    :return: a tuple (batch_id, list of per-game results)
+    """
+    return batch_id, [play_game(i, agent_types, seed, False, event_log_dir, decision_time, instrument, memory_budget)
+                      for i in games]
+
+
+def _play_games_task(args):
+    return play_games(*args)
+
+
+def create_pool(processes):
+    """
+    Creates a pool of fresh worker processes (not forked, so they don't share the parent's random state)
+    """
+    os.environ["PYTHONHASHSEED"] = HASH_SEED
+    context = multiprocessing.get_context("spawn")
+    return context.Pool(processes)
+
+
+def run_tournament(agent_types, games_n, seed, processes=None, output=None, games=None, event_log_dir=None,
+                   store=None, decision_time=None, hook_log=None, memory_budget=None):
+    """
+    Plays headless games spread over a pool of processes. Game i is seeded by (seed, i), so every game
+    can be replayed on its own.
+    :param agent_types: The type of the agent sitting at each seat
+    :param games_n: Number of games to play
+    :param seed: The tournament's seed
+    :param processes: Size of the process pool (defaults to the number of cores)
+    :param output: Path of a csv file to write the per-game results to (optional)
+    :param games: Indexes of the games to play (defaults to range(games_n))
+    :param event_log_dir: Directory to record the games' events to (optional)
+    :param store: A ResultsStore to append the per-game results to, in batches, as the games finish (optional)
+    :param decision_time: Seconds an agent has for each call of its hooks (default: no deadlines)
+    :param hook_log: An instrumentation.HookLog to record the latency histograms of the agents' hooks to (optional)
+    :param memory_budget: Bytes an agent may hold - the tournament stops with MemoryBudgetExceeded as soon as an
+    agent of a game holds more (default: no budget)
+    :return: a tuple (list of per-game results, elapsed wall time)
+    """
+    processes = processes or multiprocessing.cpu_count()
+    games = range(games_n) if games is None else games
+    tasks = [(i, agent_types, seed, False, event_log_dir, decision_time, hook_log is not None, memory_budget)
+             for i in games]
+    results = []
+    start = time.perf_counter()
+    with create_pool(processes) as pool:
+        for result in pool.imap_unordered(_play_game_task, tasks):
+            if hook_log is not None:
+                hook_log.add(result)
+            results.append(result)
+            if store is not None and len(results) % STORE_BATCH_SIZE == 0:
+                store.append(results[-STORE_BATCH_SIZE:])
+    if store is not None and len(results) % STORE_BATCH_SIZE:
+        store.append(results[-(len(results) % STORE_BATCH_SIZE):])
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: result["game"])
+
+    if output:
+        write_results(output, results)
+    return results, elapsed
+
+
+def write_results(output, results):
+    """
+    Writes per-game results to a csv file (games of different numbers of players leave their missing
+    seats' columns empty)
+    """
+    fieldnames = list(dict.fromkeys(key for result in results for key in result))
+    with open(output, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def run_sequential_tournament(matchups, max_games, seed, processes=None, output=None, event_log_dir=None,
+                              store=None, decision_time=None, hook_log=None, memory_budget=None, **test_args):
+    """
+    Plays the games of several matchups over a pool of processes, and stops scheduling the games of a matchup
+    as soon as its MatchupMonitor decides it. Game i of every matchup is seeded by (seed, i), and the results
+    of a matchup are added to its monitor in the order of the games, so the decision doesn't depend on the
+    order the games happened to finish in.
+    :param matchups: List of matchups - the agent types of each matchup's seats
+    :param max_games: Maximum number of games of a matchup
+    :param store: A ResultsStore to append the counted per-game results to, in batches (optional)
+    :param decision_time: Seconds an agent has for each call of its hooks (default: no deadlines)
+    :param hook_log: An instrumentation.HookLog to record the latency histograms of the agents' hooks to (optional)
+    :param memory_budget: Bytes an agent may hold - the tournament stops with MemoryBudgetExceeded as soon as an
+    agent of a game holds more (default: no budget)
+    :param test_args: Arguments of the MatchupMonitors (delta, alpha, beta, ci_width, min_games)
+    :return: a tuple (list of MatchupMonitors, list of the counted per-game results, elapsed wall time)
+    """
+    processes = processes or multiprocessing.cpu_count()
+    monitors = [MatchupMonitor(agent_types, **test_args) for agent_types in matchups]
+    next_game = [0] * len(matchups)
+    # Finished games that wait for the games before them, by matchup
+    finished = [dict() for _ in matchups]
+    done = queue.Queue()
+    results = []
+    in_flight = 0
+    turn = 0
+    start = time.perf_counter()
+    with create_pool(processes) as pool:
+        while True:
+            # Keep every process busy, taking the games of the undecided matchups in turns
+            while in_flight < 2 * processes:
+                open_matchups = [m for m in range(len(matchups))
+                                 if monitors[m].decision is None and next_game[m] < max_games]
+                if not open_matchups:
+                    break
+                m = open_matchups[turn % len(open_matchups)]
+                turn += 1
+                pool.apply_async(play_game, (next_game[m], matchups[m], seed, False, event_log_dir, decision_time,
+                                             hook_log is not None, memory_budget),
+                                 callback=lambda result, m=m: done.put((m, result)),
+                                 error_callback=lambda error: done.put((None, error)))
+                next_game[m] += 1
+                in_flight += 1
+            if in_flight == 0:
+                break
+
+            m, result = done.get()
+            in_flight -= 1
+            if m is None:
+                raise result
+            if hook_log is not None:
+                hook_log.add(result)
+            finished[m][result["game"]] = result
+            # Games still running when their matchup is decided are not counted
+            while monitors[m].decision is None and monitors[m].games in finished[m]:
+                result = finished[m].pop(monitors[m].games)
+                results.append(result)
+                if store is not None and len(results) % STORE_BATCH_SIZE == 0:
+                    store.append(results[-STORE_BATCH_SIZE:])
+                if monitors[m].add(result["winner_seat"], result["rounds"]):
+                    print("\n".join(monitors[m].summary()))
+    elapsed = time.perf_counter() - start
+    if store is not None and len(results) % STORE_BATCH_SIZE:
+        store.append(results[-(len(results) % STORE_BATCH_SIZE):])
+
+    if output:
+        write_results(output, results)
+    return monitors, results, elapsed
+
+
+def create_schedule(matchups, games_n, batch_size):
+    """
+    Splits the games of every matchup into batches. The id of a batch is its index in the schedule
+    :return: List of (matchup index, range of the batch's game indexes)
+    """
+    return [(m, range(first, min(first + batch_size, games_n)))
+            for m in range(len(matchups)) for first in range(0, games_n, batch_size)]
+
+
+class CheckpointMismatch(Exception):
+    """
+    A checkpoint directory holds another tournament than the one asked for
+    """
+
+
+def load_checkpoint(directory, matchups, games_n, seed, batch_size=CHECKPOINT_BATCH_SIZE, any_seed=False):
+    """
+    Opens the checkpoint of a tournament, creating it if the directory has none. An existing checkpoint must be
+    of the same tournament - its matchups, number of games, seed and batch size - otherwise CheckpointMismatch
+    is raised.
+    :param any_seed: Resume an existing checkpoint whatever its seed (for a seed that was drawn, not asked for)
+    :return: a tuple (schedule dictionary, ResultsStore of the completed batches)
+    """
+    store = ResultsStore(directory)
+    schedule_path = os.path.join(directory, SCHEDULE_FILE)
+    if os.path.exists(schedule_path):
+        with open(schedule_path) as schedule_file:
+            schedule = json.load(schedule_file)
+        asked = ([list(agent_types) for agent_types in matchups], games_n, batch_size)
+        if (schedule["matchups"], schedule["games"], schedule["batch_size"]) != asked or \
+                (schedule["seed"] != seed and not any_seed):
+            players = " ".join(",".join(agent_types) for agent_types in schedule["matchups"])
+            raise CheckpointMismatch("The checkpoint in %s was started with --players %s --tournament %d --seed %d "
+                                     "--batch-size %d" % (directory, players, schedule["games"], schedule["seed"],
+                                                          schedule["batch_size"]))
+    else:
+        schedule = {"matchups": matchups, "games": games_n, "seed": seed, "batch_size": batch_size}
+        write_json_atomically(schedule_path, schedule)
+    return schedule, store
+
+
+def run_checkpointed_tournament(directory, matchups, games_n, seed, processes=None,
+                                batch_size=CHECKPOINT_BATCH_SIZE, event_log_dir=None, decision_time=None,
+                                hook_log=None, memory_budget=None, any_seed=False):
+    """
+    Plays the games of several matchups in batches, and checkpoints the tournament into directory. Every
+    finished batch is appended to the ResultsStore in the directory together with its id, in one atomic write,
+    so the store's keys are the checkpoint: a restart with the same directory plays only the batches that were
+    not completed, reading one key per completed batch. Game i of a matchup is seeded by (seed, i), so the seed
+    in the schedule is all the random state there is - the games of a batch that was running when the process
+    died are replayed from the start, with the same results. A game that crosses the memory budget stops the
+    tournament, and the batches completed before it stay checkpointed. A directory that holds the checkpoint of
+    another tournament raises CheckpointMismatch (see load_checkpoint).
+    :return: a tuple (schedule dictionary, ResultsStore, number of games played now, elapsed wall time)
+    """
+    processes = processes or multiprocessing.cpu_count()
+    schedule, store = load_checkpoint(directory, matchups, games_n, seed, batch_size, any_seed)
+    batches = create_schedule(schedule["matchups"], schedule["games"], schedule["batch_size"])
+    completed = store.keys()
+    tasks = [(batch_id, games, schedule["matchups"][m], schedule["seed"], event_log_dir, decision_time,
+              hook_log is not None, memory_budget)
+             for batch_id, (m, games) in enumerate(batches) if batch_id not in completed]
+    if completed:
+        print("Resuming: %d of %d batches are completed" % (len(completed), len(batches)))
+    played = 0
+    start = time.perf_counter()
+    if tasks:
+        with create_pool(processes) as pool:
+            for batch_id, results in pool.imap_unordered(_play_games_task, tasks):
+                if hook_log is not None:
+                    for result in results:
+                        hook_log.add(result)
+                store.append(results, key=batch_id)
+                played += len(results)
+    return schedule, store, played, time.perf_counter() - start
+
+
+def print_summary(agent_types, results, elapsed, processes, decision_time=None):
+    """
+    Prints the win rates of the tournament and its throughput (and the deadline misses, if the decisions had
+    deadlines, the replans of the planning agents, and the peak memory of the agents, if it was traced)
+    """
+    games_n = len(results)
+    print("Played", games_n, "games of", ",".join(agent_types), "on", processes, "processes")
+    for seat in range(len(agent_types)):
+        wins = sum(1 for result in results if result["winner_seat"] == seat)
+        cpu_time = sum(result["cpu_" + str(seat)] for result in results)
+        print("Seat", seat, "(" + agent_types[seat] + "): won", wins, "games (%.1f%%)," % (100 * wins / games_n),
+              "%.4f CPU seconds per game" % (cpu_time / games_n))
+        if decision_time is not None:
+            calls = sum(result["calls_" + str(seat)] for result in results)
+            misses = sum(result["deadline_misses_" + str(seat)] for result in results)
+            slowest = max(result["slowest_call_" + str(seat)] for result in results)
+            print("  %d of %d calls missed the %.1f ms deadline (%.2f%%), slowest call %.1f ms" %
+                  (misses, calls, 1000 * decision_time, 100 * misses / calls, 1000 * slowest))
+        plans = sum(result.get("replans_" + str(seat), 0) for result in results)
+        repairs = sum(result.get("plan_repairs_" + str(seat), 0) for result in results)
+        if plans:
+            hits = sum(result.get("plan_cache_hits_" + str(seat), 0) for result in results)
+            replan_time = sum(result.get("replan_time_" + str(seat), 0) for result in results)
+            repair_time = sum(result.get("repair_time_" + str(seat), 0) for result in results)
+            print("  %d plans searched (%d from the plan cache): %.2f plans/sec, %.3f ms average latency" %
+                  (plans, hits, plans / replan_time, 1000 * replan_time / plans))
+            if repairs:
+                print("  %d plans repaired: %.2f plans/sec, %.3f ms average latency" %
+                      (repairs, repairs / repair_time, 1000 * repair_time / repairs))
+        if "peak_memory_" + str(seat) in results[0]:
+            peak = max(result["peak_memory_" + str(seat)] for result in results)
+            print("  held at most %.2f MB" % (peak / 2 ** 20))
+    print("Average rounds: %.2f" % (sum(result["rounds"] for result in results) / games_n))
+    print_scaling([(processes, games_n, elapsed, sum(result["wall_time"] for result in results))])
+
+
+def print_scaling(runs):
+    """
+    Prints games/sec for each run - a list of (processes, games, elapsed time, total in-game wall time).
+    The speedup is the in-game wall time (what a single process would have needed) relative to the elapsed time.
+    """
+    print("processes\tgames/sec\tspeedup\tefficiency")
+    for processes, games_n, elapsed, games_time in runs:
+        speedup = games_time / elapsed
+        print("%d\t\t%.2f\t\t%.2f\t%.2f" % (processes, games_n / elapsed, speedup, speedup / processes))
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(prog="clue.py", description="Runs a headless Clue tournament")
+    parser.add_argument("--tournament", type=int, required=True, metavar="N", help="number of games to play")
+    parser.add_argument("--players", required=True, nargs="+",
+                        help="player types separated by comma, e.g. p,bn2,r (several matchups with --sequential)")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="size of the process pool (default: number of cores)")
+    parser.add_argument("--output", help="csv file to write the per-game results to")
+    parser.add_argument("--scaling", action="store_true",
+                        help="repeat the tournament on 1, 2, 4, ... processes and report games/sec for each")
+    parser.add_argument("--seed", type=int, help="the tournament's seed (default: random)")
+    parser.add_argument("--store", metavar="DIR",
+                        help="directory of a columnar results store to append the per-game results to")
+    parser.add_argument("--checkpoint", metavar="DIR",
+                        help="checkpoint the tournament into this directory (a results store), in batches of games, "
+                             "and resume it from there if it was stopped; several matchups can be given")
+    parser.add_argument("--batch-size", type=int, default=CHECKPOINT_BATCH_SIZE,
+                        help="number of games in a checkpointed batch (default: %d)" % CHECKPOINT_BATCH_SIZE)
+    parser.add_argument("--memory-budget", type=float, metavar="MB",
+                        help="trace the memory every agent holds, and stop the tournament as soon as an agent holds "
+                             "more than this (memory tracing slows the games down)")
+    parser.add_argument("--hooks", metavar="FILE",
+                        help="record latency histograms of the agents' hooks and hot spots - per game and for the "
+                             "whole tournament, as JSON lines")
+    parser.add_argument("--event-log", metavar="DIR", help="directory to record binary game logs to")
+    parser.add_argument("--replay", type=int, metavar="GAME",
+                        help="replay only the game with this index of the tournament, printing it")
+    parser.add_argument("--sequential", action="store_true",
+                        help="stop every matchup as soon as its result is decided (N is then the maximum number "
+                             "of games of a matchup)")
+    parser.add_argument("--delta", type=float, default=0.05,
+                        help="the head-to-head test decides which of the first two seats wins at least "
+                             "0.5 + delta of the games between them (default: 0.05)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="error rate of the head-to-head test")
+    parser.add_argument("--ci-width", type=float, default=0.1,
+                        help="a matchup is also decided once every seat's 95%% win rate interval is this narrow")
+    parser.add_argument("--min-games", type=int, default=20, help="minimum number of games of a matchup")
+    parser.add_argument("--decision-time", type=float, metavar="SECONDS",
+                        help="time budget of every agent decision - anytime agents return their best answer when it "
+                             "runs out, and the calls that take longer are counted as deadline misses (games then "
+                             "depend on timing, and no longer replay exactly from their seeds)")
+    args = parser.parse_args(arguments)
+
+    matchups = [parse_players(players) for players in args.players]
+    if any(parse_agent_spec(spec)[0] == HUMAN for agent_types in matchups for spec in agent_types):
+        print("Human players can't take part in a tournament")
+        return
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+    print("Tournament seed:", seed)
+    if args.event_log:
+        os.makedirs(args.event_log, exist_ok=True)
+    hook_log = instrumentation.HookLog(args.hooks) if args.hooks else None
+    try:
+        run_matchups(args, matchups, seed, hook_log)
+    except MemoryBudgetExceeded as error:
+        print("Tournament stopped:", error)
+    finally:
+        if hook_log is not None:
+            hook_log.close()
+            print("\n".join(instrumentation.summary(hook_log.total)))
+
+
+def run_matchups(args, matchups, seed, hook_log=None):
+    """
+    Runs the tournament the command line arguments describe, and prints its results
+    """
+    memory_budget = args.memory_budget * 2 ** 20 if args.memory_budget is not None else None
+    if args.checkpoint:
+        if args.sequential or args.store:
+            print("--checkpoint can't be used with --sequential or --store (the checkpoint is itself a results store)")
+            return
+        try:
+            schedule, store, played, elapsed = run_checkpointed_tournament(
+                args.checkpoint, matchups, args.tournament, seed, args.processes, args.batch_size, args.event_log,
+                args.decision_time, hook_log, memory_budget, any_seed=args.seed is None)
+        except CheckpointMismatch as error:
+            print(error)
+            sys.exit(2)
+        if schedule["seed"] != seed:
+            print("Tournament seed of the checkpoint:", schedule["seed"])
+        print("Played %d games in %.2f seconds" % (played, elapsed))
+        print("\n".join(store.summary()))
+        if args.output:
+            write_results(args.output, store.load_results())
+        return
+
+    store = ResultsStore(args.store) if args.store else None
+
+    if args.sequential:
+        monitors, results, elapsed = run_sequential_tournament(
+            matchups, args.tournament, seed, args.processes, args.output, args.event_log, store, args.decision_time,
+            hook_log, memory_budget, delta=args.delta, alpha=args.alpha, beta=args.alpha, ci_width=args.ci_width,
+            min_games=args.min_games)
+        for monitor in monitors:
+            if monitor.decision is None:
+                print("\n".join(monitor.summary()))
+        print("Played %d games of %d matchups in %.2f seconds (at most %d were needed without early stopping)" %
+              (len(results), len(matchups), elapsed, args.tournament * len(matchups)))
+        if store is not None:
+            print("\n".join(store.summary()))
+        return
+
+    if len(matchups) > 1:
+        print("Several matchups can only be played with --sequential")
+        return
+    agent_types = matchups[0]
+
+    if args.replay is not None:
+        with create_pool(1) as pool:
+            result = pool.apply(play_game, (args.replay, agent_types, seed, True, None, args.decision_time,
+                                            hook_log is not None, memory_budget))
+        if hook_log is not None:
+            hook_log.add(result)
+        print(result)
+        return
+
+    results, elapsed = run_tournament(agent_types, args.tournament, seed, args.processes, args.output,
+                                      event_log_dir=args.event_log, store=store, decision_time=args.decision_time,
+                                      hook_log=hook_log, memory_budget=memory_budget)
+    print_summary(agent_types, results, elapsed, args.processes, args.decision_time)
+    if store is not None:
+        print("\n".join(store.summary()))
+
+    if args.scaling:
+        runs = []
+        processes = 1
+        while processes <= args.processes:
+            results, elapsed = run_tournament(agent_types, args.tournament, seed, processes,
+                                              decision_time=args.decision_time)
+            runs.append((processes, len(results), elapsed, sum(result["wall_time"] for result in results)))
+            processes *= 2
+        print_scaling(runs)
+
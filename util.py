@@ -1,57 +1,182 @@
-from enum import Enum
+from enum import Enum, IntEnum
 import random
 import heapq
+import numpy as np
 
 RANDOM = "random"
 HUMAN = "human"
 PLANNING = "planning"
 BN2 = "bn2"
 BN = "bn"
-Character = Enum('Character', 'MissScarlett MrGreen ProfPlum ColonelMustard MrsPeacock MrsWhite')
-Weapon = Enum('Weapon', 'Candlestick Dagger LeadPipe Revolver Rope Wrench')
-Room = Enum('Room', 'Study Hall Lounge DinningRoom Kitchen BallRoom Conservatory BilliardRoom Library')
+
+
+def parse_agent_spec(spec):
+    """
+    Splits an agent spec into its agent type and the parameters of its variant. A spec is an agent type,
+    optionally followed by parameters separated by colons - e.g. "bn2:accusation_threshold=0.95"
+    :return: a tuple (agent type, dictionary of parameter name -> value, as a string - see
+    clue.agent_parameters)
+    """
+    agent_type, *params = spec.split(":")
+    return agent_type, dict(param.split("=", 1) for param in params)
+
+
+class Card(IntEnum):
+    """
+    Base class of the card enums. A card is its id - a dense small int (0..20) that is unique across the
+    categories: the characters, then the weapons, then the rooms. Cards hash and compare as ints (so sets of
+    cards iterate in the same order in every process) and can index NumPy arrays directly.
+    """
+    __str__ = Enum.__str__
+    __format__ = Enum.__format__
+
+
+Character = Card('Character', 'MissScarlett MrGreen ProfPlum ColonelMustard MrsPeacock MrsWhite', start=0)
+Weapon = Card('Weapon', 'Candlestick Dagger LeadPipe Revolver Rope Wrench', start=len(Character))
+Room = Card('Room', 'Study Hall Lounge DinningRoom Kitchen BallRoom Conservatory BilliardRoom Library',
+            start=len(Character) + len(Weapon))
 
 CHARACTERS = [character for character in Character]
 WEAPONS = [weapon for weapon in Weapon]
 ROOMS = [room for room in Room]
 
+# The id of the first card of each category
+CHARACTERS_OFFSET = 0
+WEAPONS_OFFSET = len(CHARACTERS)
+ROOMS_OFFSET = len(CHARACTERS) + len(WEAPONS)
+
+# CARDS[id] is the card with the id
+CARDS = CHARACTERS + WEAPONS + ROOMS
+CARD_IDS = {card: int(card) for card in CARDS}
+CARD_NAMES = [card.name for card in CARDS]
+CARDS_BY_NAME = {card.name: card for card in CARDS}
+# A hand of cards is an int bit mask - the card with id i is bit i
+CARD_BITS = {card: 1 << card for card in CARDS}
+
+# Every (character, weapon, room) suggestion has an index - its index in product(CHARACTERS, WEAPONS, ROOMS)
+SUGGESTIONS_N = len(CHARACTERS) * len(WEAPONS) * len(ROOMS)
+
+
+def is_character(card):
+    return card < WEAPONS_OFFSET
+
+
+def is_weapon(card):
+    return WEAPONS_OFFSET <= card < ROOMS_OFFSET
+
+
+def is_room(card):
+    return card >= ROOMS_OFFSET
+
+
+def suggestion_index(suggestion):
+    """
+    :return: The index (0..SUGGESTIONS_N - 1) of a (character, weapon, room) suggestion
+    """
+    character, weapon, room = suggestion
+    return (character * len(WEAPONS) + weapon - WEAPONS_OFFSET) * len(ROOMS) + room - ROOMS_OFFSET
+
+
 PLAYERS_SHORT = {Character.MissScarlett: 'S', Character.ColonelMustard: 'M',
                  Character.MrsPeacock: 'E', Character.MrsWhite: 'W',
                  Character.ProfPlum: 'P', Character.MrGreen: 'G'}
 
-BOARD_SIZE = 25
-EDGE_WIDTH = 9  # At least 3
 CUBE_SIZE = 12  # Maximum integer result of the cube
 
-# Just try to remove the obstacle:
-LOCATIONS = []
-
-for x in range(EDGE_WIDTH):
-    for i in [x, BOARD_SIZE - 1 - x]:
-        for j in range(BOARD_SIZE):
-            LOCATIONS.append((i, j))
-            LOCATIONS.append((j, i))
-
-OPEN_LOC = {Character.MissScarlett: (0, int((2 / 3) * BOARD_SIZE)),
-            Character.ColonelMustard: (BOARD_SIZE // 3, BOARD_SIZE - 1),
-            Character.MrsPeacock: (int((3 / 4) * BOARD_SIZE), 0), Character.ProfPlum: (BOARD_SIZE // 3, 0),
-            Character.MrsWhite: (BOARD_SIZE - 1, BOARD_SIZE // 3 * 2),
-            Character.MrGreen: (BOARD_SIZE - 1, BOARD_SIZE // 3)}
-
-ROOMS_LOC = {(0, 0): Room.Study, (EDGE_WIDTH - 2, BOARD_SIZE // 2): Room.Hall, (0, BOARD_SIZE - 1): Room.Lounge,
-             (BOARD_SIZE // 2, BOARD_SIZE - EDGE_WIDTH + 2): Room.DinningRoom,
-             (BOARD_SIZE - 1, BOARD_SIZE - 1): Room.Kitchen,
-             (BOARD_SIZE - EDGE_WIDTH + 2, BOARD_SIZE // 2): Room.BallRoom, (BOARD_SIZE - 1, 0): Room.Conservatory,
-             (BOARD_SIZE // 3 * 2, EDGE_WIDTH - 4): Room.BilliardRoom, (BOARD_SIZE // 2, EDGE_WIDTH - 3): Room.Library}
-
-LOCATIONS_OF_ROOMS = {Room.Study: (0, 0), Room.Hall: (EDGE_WIDTH - 2, BOARD_SIZE // 2),
-                      Room.Lounge: (0, BOARD_SIZE - 1),
-                      Room.DinningRoom: (BOARD_SIZE // 2, BOARD_SIZE - EDGE_WIDTH + 2),
-                      Room.Kitchen: (BOARD_SIZE - 1, BOARD_SIZE - 1),
-                      Room.BallRoom: (BOARD_SIZE - EDGE_WIDTH + 2, BOARD_SIZE // 2),
-                      Room.Conservatory: (BOARD_SIZE - 1, 0),
-                      Room.BilliardRoom: (BOARD_SIZE // 3 * 2, EDGE_WIDTH - 4),
-                      Room.Library: (BOARD_SIZE // 2, EDGE_WIDTH - 3)}
+PLAN_CACHE_SIZE = 4096  # Maximum number of plans the planning players of a process keep
+
+
+class BoardConfig:
+    """
+    The geometry of a board - a square with a block in its middle, so only a ring of width edge_width along
+    its edges can be walked on - and the tables generated from it: the locations, the opening location of
+    every character and the location of every room.
+    """
+
+    def __init__(self, board_size=25, edge_width=9, rooms=None):
+        """
+        :param board_size: Length of the board's side
+        :param edge_width: Width of the walkable ring (at least 4)
+        :param rooms: The rooms on the board, and in the game (default: all of them)
+        """
+        self.board_size = board_size
+        self.edge_width = edge_width
+        self.rooms = list(Room) if rooms is None else list(rooms)
+        self._base = self
+        self._distances = None
+
+        # Just try to remove the obstacle:
+        self.locations = []
+        seen = set()
+        for x in range(edge_width):
+            for i in [x, board_size - 1 - x]:
+                for j in range(board_size):
+                    for loc in [(i, j), (j, i)]:
+                        if loc not in seen:
+                            seen.add(loc)
+                            self.locations.append(loc)
+        self.location_index = {loc: i for i, loc in enumerate(self.locations)}
+
+        self.open_loc = {Character.MissScarlett: (0, int((2 / 3) * board_size)),
+                         Character.ColonelMustard: (board_size // 3, board_size - 1),
+                         Character.MrsPeacock: (int((3 / 4) * board_size), 0),
+                         Character.ProfPlum: (board_size // 3, 0),
+                         Character.MrsWhite: (board_size - 1, board_size // 3 * 2),
+                         Character.MrGreen: (board_size - 1, board_size // 3)}
+
+        all_locations_of_rooms = {Room.Study: (0, 0), Room.Hall: (edge_width - 2, board_size // 2),
+                                  Room.Lounge: (0, board_size - 1),
+                                  Room.DinningRoom: (board_size // 2, board_size - edge_width + 2),
+                                  Room.Kitchen: (board_size - 1, board_size - 1),
+                                  Room.BallRoom: (board_size - edge_width + 2, board_size // 2),
+                                  Room.Conservatory: (board_size - 1, 0),
+                                  Room.BilliardRoom: (board_size // 3 * 2, edge_width - 4),
+                                  Room.Library: (board_size // 2, edge_width - 3)}
+        self.locations_of_rooms = {room: all_locations_of_rooms[room] for room in Room if room in self.rooms}
+        self.rooms_loc = {loc: room for room, loc in self.locations_of_rooms.items()}
+
+    @property
+    def distances(self):
+        """
+        All-pairs distances between the board's locations, indexed by location_index (computed on first use)
+        """
+        if self._base._distances is None:
+            self._base._distances = compute_distance_matrix(self.locations, self.locations, self)
+        return self._base._distances
+
+    def without_room(self, room):
+        """
+        :return: A config of the same board without the room (it shares this config's distances)
+        """
+        config = BoardConfig(self.board_size, self.edge_width, [r for r in self.rooms if r != room])
+        config._base = self._base
+        return config
+
+
+DEFAULT_BOARD = BoardConfig()
+# The first BN player only knows how to play without the Library
+NO_LIBRARY_BOARD = DEFAULT_BOARD.without_room(Room.Library)
+
+# The tables of the default board
+BOARD_SIZE = DEFAULT_BOARD.board_size
+EDGE_WIDTH = DEFAULT_BOARD.edge_width
+LOCATIONS = DEFAULT_BOARD.locations
+LOCATION_INDEX = DEFAULT_BOARD.location_index
+OPEN_LOC = DEFAULT_BOARD.open_loc
+ROOMS_LOC = DEFAULT_BOARD.rooms_loc
+LOCATIONS_OF_ROOMS = DEFAULT_BOARD.locations_of_rooms
+
+
+def create_game_rngs(seed=None):
+    """
+    Creates the random generators of a single game. All the randomness of a game (dealing, dice and the
+    players' choices) is drawn from these generators, so a game can be replayed exactly from its seed.
+    :param seed: An int, or a sequence of ints such as (tournament seed, game index). None for a fresh seed
+    :return: a tuple (random.Random, np.random.Generator)
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    rng = random.Random(int(seed_sequence.generate_state(1, np.uint64)[0]))
+    return rng, np.random.default_rng(seed_sequence)
 
 
 def manhattan_distance(loc1, loc2):
@@ -396,41 +521,126 @@ def get_probability(value, distribution, values):
     return total
 
 
-def opposite_side_x_axis(loc1, loc2):
-    return is_in_right_side(loc1) and is_in_left_side(loc2) or \
-           is_in_right_side(loc2) and is_in_left_side(loc1)
+def opposite_side_x_axis(loc1, loc2, config=None):
+    return is_in_right_side(loc1, config) and is_in_left_side(loc2, config) or \
+           is_in_right_side(loc2, config) and is_in_left_side(loc1, config)
 
 
-def opposite_side_y_axis(loc1, loc2):
-    return is_in_up_side(loc1) and is_in_down_side(loc2) or \
-           is_in_up_side(loc2) and is_in_down_side(loc1)
+def opposite_side_y_axis(loc1, loc2, config=None):
+    return is_in_up_side(loc1, config) and is_in_down_side(loc2, config) or \
+           is_in_up_side(loc2, config) and is_in_down_side(loc1, config)
 
 
-def is_in_right_side(loc):
-    return EDGE_WIDTH <= loc[0] < BOARD_SIZE - EDGE_WIDTH <= loc[1]
+def is_in_right_side(loc, config=None):
+    config = config or DEFAULT_BOARD
+    return config.edge_width <= loc[0] < config.board_size - config.edge_width <= loc[1]
 
 
-def is_in_up_side(loc):
-    return loc[0] < EDGE_WIDTH <= loc[1] < BOARD_SIZE - EDGE_WIDTH
+def is_in_up_side(loc, config=None):
+    config = config or DEFAULT_BOARD
+    return loc[0] < config.edge_width <= loc[1] < config.board_size - config.edge_width
 
 
-def is_in_left_side(loc):
-    return BOARD_SIZE - EDGE_WIDTH > loc[0] >= EDGE_WIDTH > loc[1]
+def is_in_left_side(loc, config=None):
+    config = config or DEFAULT_BOARD
+    return config.board_size - config.edge_width > loc[0] >= config.edge_width > loc[1]
 
 
-def is_in_down_side(loc):
-    return loc[0] >= BOARD_SIZE - EDGE_WIDTH > loc[1] >= EDGE_WIDTH
+def is_in_down_side(loc, config=None):
+    config = config or DEFAULT_BOARD
+    return loc[0] >= config.board_size - config.edge_width > loc[1] >= config.edge_width
 
 
-def manhattan_distance_with_block(loc1, loc2):
-    if opposite_side_x_axis(loc1, loc2):
-        min_vertical = min((BOARD_SIZE - EDGE_WIDTH - loc1[0]) + (BOARD_SIZE - EDGE_WIDTH - loc2[0]),
-                           (loc1[0] - EDGE_WIDTH + 1) + (loc2[0] - EDGE_WIDTH + 1))
+def compute_manhattan_distance_with_block(loc1, loc2, config=None):
+    """
+    Manhattan distance that walks around the block in the middle of the board.
+    Use manhattan_distance_with_block, which looks the distance up in the board's distances
+    """
+    config = config or DEFAULT_BOARD
+    far_edge = config.board_size - config.edge_width
+    if opposite_side_x_axis(loc1, loc2, config):
+        min_vertical = min((far_edge - loc1[0]) + (far_edge - loc2[0]),
+                           (loc1[0] - config.edge_width + 1) + (loc2[0] - config.edge_width + 1))
         return min_vertical + abs(loc1[1] - loc2[1])
 
-    if opposite_side_y_axis(loc1, loc2):
-        min_vertical = min((BOARD_SIZE - EDGE_WIDTH - loc1[1]) + (BOARD_SIZE - EDGE_WIDTH - loc2[1]),
-                           (loc1[1] - EDGE_WIDTH + 1) + (loc2[1] - EDGE_WIDTH + 1))
+    if opposite_side_y_axis(loc1, loc2, config):
+        min_vertical = min((far_edge - loc1[1]) + (far_edge - loc2[1]),
+                           (loc1[1] - config.edge_width + 1) + (loc2[1] - config.edge_width + 1))
         return min_vertical + abs(loc1[0] - loc2[0])
 
     return manhattan_distance(loc1, loc2)
+
+
+def compute_distance_matrix(locations1, locations2, config=None):
+    """
+    Vectorized compute_manhattan_distance_with_block between every location of locations1 and every
+    location of locations2
+    :return: int16 array of shape (len(locations1), len(locations2))
+    """
+    config = config or DEFAULT_BOARD
+    edge, far_edge = config.edge_width, config.board_size - config.edge_width
+    a = np.asarray(locations1, dtype=np.int32).reshape(-1, 1, 2)
+    b = np.asarray(locations2, dtype=np.int32).reshape(1, -1, 2)
+    y1, x1, y2, x2 = a[..., 0], a[..., 1], b[..., 0], b[..., 1]
+
+    def right(y, x):
+        return (edge <= y) & (y < far_edge) & (far_edge <= x)
+
+    def up(y, x):
+        return (y < edge) & (edge <= x) & (x < far_edge)
+
+    def left(y, x):
+        return (far_edge > y) & (y >= edge) & (edge > x)
+
+    def down(y, x):
+        return (y >= far_edge) & (far_edge > x) & (x >= edge)
+
+    opposite_x = right(y1, x1) & left(y2, x2) | right(y2, x2) & left(y1, x1)
+    opposite_y = up(y1, x1) & down(y2, x2) | up(y2, x2) & down(y1, x1)
+    around_x = np.minimum(2 * far_edge - y1 - y2, y1 + y2 - 2 * edge + 2) + np.abs(x1 - x2)
+    around_y = np.minimum(2 * far_edge - x1 - x2, x1 + x2 - 2 * edge + 2) + np.abs(y1 - y2)
+    distances = np.where(opposite_x, around_x, np.where(opposite_y, around_y, np.abs(y1 - y2) + np.abs(x1 - x2)))
+    return distances.astype(np.int16)
+
+
+def location_indexes(locations, config=None):
+    """
+    :return: Array of the indexes (in the board's distances) of the given locations
+    """
+    if hasattr(locations, "indexes"):
+        # Already a view of location indexes (board.ReachableLocations)
+        return locations.indexes
+    location_index = (config or DEFAULT_BOARD).location_index
+    return np.fromiter((location_index[loc] for loc in locations), dtype=np.intp, count=len(locations))
+
+
+def manhattan_distance_with_block(loc1, loc2, config=None):
+    config = config or DEFAULT_BOARD
+    if loc1 in config.location_index and loc2 in config.location_index:
+        return int(config.distances[config.location_index[loc1], config.location_index[loc2]])
+    return compute_manhattan_distance_with_block(loc1, loc2, config)
+
+
+def distances_from(loc, locations, config=None):
+    """
+    One-to-many manhattan_distance_with_block
+    :return: Array of the distances from loc to each of the locations
+    """
+    config = config or DEFAULT_BOARD
+    return config.distances[config.location_index[loc]][location_indexes(locations, config)]
+
+
+def distances_between(locations1, locations2, config=None):
+    """
+    Many-to-many manhattan_distance_with_block
+    :return: Array of shape (len(locations1), len(locations2)) of the distances between the locations
+    """
+    config = config or DEFAULT_BOARD
+    return config.distances[np.ix_(location_indexes(locations1, config), location_indexes(locations2, config))]
+
+
+def closest_location(target, locations, config=None):
+    """
+    :return: The first of the locations that is closest to target
+    """
+    return locations[int(np.argmin(distances_from(target, locations, config)))]